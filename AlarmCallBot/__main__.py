@@ -1,11 +1,12 @@
 """Bot start module."""
 import argparse
-import logging.config
+import functools
+import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
 
 from .bot.Bot import AlarmCallBot
 from .configs import Config
+from .logs import setup_logging
 
 
 def parse_args() -> argparse.Namespace:
@@ -18,7 +19,34 @@ def parse_args() -> argparse.Namespace:
         choices=["testing", "production"],
         help="Environment to run bot",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="polling",
+        choices=["polling", "webhook"],
+        help="How to receive Telegram updates",
+    )
+    parser.add_argument(
+        "--webhook-url",
+        type=str,
+        help="Public HTTPS url of webhook, required in webhook mode",
+    )
+    parser.add_argument(
+        "--webhook-host",
+        type=str,
+        default="127.0.0.1",
+        help="Host for local webhook server to listen on",
+    )
+    parser.add_argument(
+        "--webhook-port",
+        type=int,
+        default=8443,
+        help="Port for local webhook server to listen on",
+    )
+    args = parser.parse_args()
+    if args.mode == "webhook" and args.webhook_url is None:
+        parser.error("--webhook-url is required in webhook mode")
+    return args
 
 
 if __name__ == "__main__":
@@ -35,31 +63,30 @@ if __name__ == "__main__":
         config = Config.ProdConfig()
 
     # Setup logging
-    os.makedirs(config.LOG_FILE_PATH, exist_ok=True)
-    rotating_file_handler = TimedRotatingFileHandler(
-        f"{config.LOG_FILE_PATH}/{config.LOG_FILE_NAME}",
-        when="midnight",
-        backupCount=30,
-    )
-    rotating_file_handler.setLevel(logging.INFO)
-    logging_handlers = []
-    if config.DEBUG:
-        logging_handlers.append(logging.StreamHandler())
-    logging_handlers.append(rotating_file_handler)
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=logging_handlers,
+    log_listener = setup_logging(
+        config.LOG_FILE_PATH, config.LOG_FILE_NAME, debug=config.DEBUG, queue_size=config.LOG_QUEUE_SIZE
     )
 
     logger = logging.getLogger(__name__)
 
-    logger.info(f"Starting bot with environment = {args.env}")
+    logger.info("Starting bot with environment = %s, mode = %s", args.env, args.mode)
     bot = AlarmCallBot(config=config)
+    if args.mode == "webhook":
+        start = functools.partial(
+            bot.start_webhook,
+            url=args.webhook_url,
+            host=args.webhook_host,
+            port=args.webhook_port,
+            secret_token=os.getenv("TELEGRAM_WEBHOOK_SECRET"),
+        )
+    else:
+        start = bot.start_polling
     try:
-        bot.start_polling()
-    except Exception as exc:
-        print(f"Unknown exception: {exc}")
-    logger.info("Start polling...")
-    bot.start_polling()
+        try:
+            start()
+        except Exception as exc:
+            print(f"Unknown exception: {exc}")
+        logger.info("Restarting in %s mode...", args.mode)
+        start()
+    finally:
+        log_listener.stop()
@@ -1,6 +1,7 @@
 """Alarm call bot class module."""
 import os
 import logging
+import threading
 
 import typing as tp
 
@@ -9,13 +10,39 @@ from datetime import datetime, timedelta
 import telebot
 from telebot import types
 
-from .. import db
+from .. import db, metrics
+from ..logs import CappedList
+from ..call_status import CallStatusTracker
+from ..compaction import CompactionJob
+from ..outbox import DialOutbox
+from ..storage.Utils import create_storage
 from ..configs import Config
 from ..zvonok_api.Api import ZvonokManager
-from .Utils import _, check_private_chat, parse_call_hours
+from ..zvonok_api.CircuitBreaker import CircuitBreaker
+from ..zvonok_api.Dispatcher import CallDispatcher
+from ..zvonok_api.RateLimiter import AdaptiveRateLimiter
+from ..zvonok_api.Sharding import ShardedZvonokManager
+from ..zvonok_api.Utils import CircuitOpenException
+from .Broadcast import Broadcast, Broadcaster, BroadcastReport
+from .Coalescer import AlertCoalescer
+from .Dispatcher import DispatchingTeleBot
+from .Reminders import DutyReminders
+from .Sender import ALERT, MessageSender
+from .Utils import TRANSLATOR, _, _f, check_private_chat, parse_call_hours
+
+if tp.TYPE_CHECKING:
+    from .Webhook import WebhookServer
 
 logger = logging.getLogger(__name__)
 
+HANDLER_SECONDS = metrics.Histogram(
+    "alarm_bot_handler_seconds", "Time of Telegram update handling in seconds.", ("handler",)
+)
+WAVE_SIZE = metrics.Histogram(
+    "alarm_bot_wave_size", "Number of phones dialed for an alert.", buckets=metrics.SIZE_BUCKETS
+)
+WAVE_SECONDS = metrics.Histogram("alarm_bot_wave_seconds", "Time of dialing all phones for an alert in seconds.")
+
 
 class ExceptionHandler(telebot.ExceptionHandler):
     """Telegram bot exception handler."""
@@ -30,7 +57,7 @@ class ExceptionHandler(telebot.ExceptionHandler):
         Returns:
             True value.
         """
-        logger.error(f"Unknown exception: {exception}")
+        logger.error("Unknown exception: %s", exception)
         return True
 
 
@@ -45,82 +72,166 @@ class AlarmCallBot:
     def __init__(self, config: tp.Union[Config.TestConfig, Config.ProdConfig]) -> None:
         """Alarm call bot constructor."""
         self.__config = config
-        self.__zvonok_manager = ZvonokManager(
-            public_api_key=config.ZVONOK_API_TOKEN,
-            campaign_id=config.ZVONOK_CAMPAIGN_ID,
-            api_host=config.ZVONOK_API_URI,
+        db.set_storage(create_storage(config.DB_STORAGE, config.DB_PATH))
+        db.init_db()
+        db.configure_phone_cache(
+            max_size=config.PHONE_CACHE_SIZE, ttl=config.PHONE_CACHE_TTL, negative_ttl=config.PHONE_CACHE_NEGATIVE_TTL
+        )
+        self.__alert_coalescer = AlertCoalescer(config.ALERT_COALESCE_WINDOW)
+        self.__stop_event = threading.Event()
+        self.__webhook_server: tp.Optional["WebhookServer"] = None
+        self.__metrics_server: tp.Optional[metrics.MetricsServer] = None
+        self.__compaction_job = CompactionJob(
+            interval=config.COMPACTION_INTERVAL,
+            batch_size=config.COMPACTION_BATCH_SIZE,
+            vacuum_every=config.COMPACTION_VACUUM_EVERY,
+            retention=config.HISTORY_RETENTION,
+        )
+        rate_limiter = AdaptiveRateLimiter(
+            rate=config.ZVONOK_RATE,
+            max_rate=config.ZVONOK_MAX_RATE,
+            concurrency=config.DIAL_CONCURRENCY,
+            max_concurrency=config.DIAL_CONCURRENCY,
+        )
+        circuit_breaker = CircuitBreaker(
+            failure_threshold=config.ZVONOK_FAILURE_THRESHOLD, reset_timeout=config.ZVONOK_RESET_TIMEOUT
+        )
+        self.__zvonok_manager = ShardedZvonokManager(
+            {
+                campaign_id: ZvonokManager(
+                    public_api_key=config.ZVONOK_API_TOKEN,
+                    campaign_id=campaign_id,
+                    api_host=config.ZVONOK_API_URI,
+                    pool_maxsize=config.DIAL_CONCURRENCY,
+                    timeout=config.ZVONOK_TIMEOUT,
+                    rate_limiter=rate_limiter,
+                    circuit_breaker=circuit_breaker,
+                )
+                for campaign_id in config.ZVONOK_CAMPAIGN_IDS or [config.ZVONOK_CAMPAIGN_ID]
+            },
+            strategy=config.ZVONOK_SHARDING,
+        )
+        self.__call_status_tracker = CallStatusTracker(
+            self.__zvonok_manager.check_call,
+            redial=lambda alert_id, phone, redial: self.__dial_outbox.redial(alert_id, phone, redial),
+            escalate=self.__escalate,
+            initial_delay=config.STATUS_CHECK_DELAY,
+            max_delay=config.STATUS_CHECK_MAX_DELAY,
+            max_workers=config.STATUS_CHECK_WORKERS,
+            max_redials=config.STATUS_MAX_REDIALS,
+            escalate_after=config.STATUS_ESCALATE_AFTER,
+        )
+        self.__dial_outbox = DialOutbox(
+            CallDispatcher(self.__zvonok_manager.create_call, max_workers=config.DIAL_CONCURRENCY),
+            max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+            retry_interval=config.OUTBOX_RETRY_INTERVAL,
+            max_age=config.OUTBOX_MAX_AGE,
+            track_calls=True,
+            campaign_for=self.__zvonok_manager.campaign_for,
+            on_dialed=lambda alert_id, phone: self.__call_status_tracker.watch(alert_id, [phone]),
         )
 
         TELEGRAM_API_TOKEN = os.getenv("TELEGRAM_API_TOKEN")
         if TELEGRAM_API_TOKEN is None:
             raise RuntimeError("Set TELEGRAM_API_TOKEN env. variable")
 
-        self.__bot = telebot.TeleBot(
-            TELEGRAM_API_TOKEN, exception_handler=ExceptionHandler
+        self.__bot = DispatchingTeleBot(
+            TELEGRAM_API_TOKEN,
+            n_workers=config.UPDATE_WORKERS,
+            queue_size=config.UPDATE_QUEUE_SIZE,
+            exception_handler=ExceptionHandler(),
         )
+        self.__sender = MessageSender(
+            self.__bot.send_message,
+            rate=config.TELEGRAM_RATE,
+            chat_interval=config.TELEGRAM_CHAT_INTERVAL,
+            n_workers=config.TELEGRAM_SEND_WORKERS,
+            max_attempts=config.TELEGRAM_SEND_ATTEMPTS,
+        )
+        self.__duty_reminders: tp.Optional[DutyReminders] = None
+        if config.DUTY_REMINDERS:
+            self.__duty_reminders = DutyReminders(
+                self.__sender, remind_before=config.DUTY_REMINDER_BEFORE, tick=config.TIMER_TICK
+            )
+        self.__broadcast_sender: tp.Optional[MessageSender] = None
+        self.__broadcaster: tp.Optional[Broadcaster] = None
+        if config.ALERT_BROADCAST and config.TELEGRAM_PAID_BROADCAST:
+            self.__broadcast_sender = MessageSender(
+                self.__bot.send_message,
+                rate=config.TELEGRAM_BROADCAST_RATE,
+                chat_interval=config.TELEGRAM_CHAT_INTERVAL,
+                n_workers=config.TELEGRAM_BROADCAST_WORKERS,
+                max_attempts=config.TELEGRAM_SEND_ATTEMPTS,
+            )
+            self.__broadcaster = Broadcaster(self.__broadcast_sender, {"allow_paid_broadcast": True})
+        elif config.ALERT_BROADCAST:
+            self.__broadcaster = Broadcaster(self.__sender)
 
         @self.__bot.message_handler(commands=["start"])
+        @HANDLER_SECONDS.labels("start").timed
         def start(message: telebot.types.Message) -> None:
             """Command /start handler.
 
             Args:
                 message: Telegram user message.
             """
-            if not check_private_chat(self.__bot, message):
+            if not check_private_chat(self.__sender, message):
                 return
-            logger.info(f"Start message from user with id = {message.from_user.id}")
-            self.__bot.send_message(
+            logger.info("Start message from user with id = %s", message.from_user.id)
+            language = TRANSLATOR.language_for(message.from_user)
+            self.__sender.submit(
                 message.chat.id,
-                _("To set the call for N hours when urgent search fee appears use */call N* command"),
+                _("To set the call for N hours when urgent search fee appears use */call N* command", language),
                 parse_mode="Markdown"
             )
 
         @self.__bot.message_handler(commands=["call"])
+        @HANDLER_SECONDS.labels("call").timed
         def call(message: telebot.types.Message) -> None:
             """Command /call N handler.
 
             Args:
                 message: Telegram user message.
             """
-            if not check_private_chat(self.__bot, message):
+            if not check_private_chat(self.__sender, message):
                 return
-            logger.info(f"Call message from user with id = {message.from_user.id}")
+            logger.info("Call message from user with id = %s", message.from_user.id)
+            language = TRANSLATOR.language_for(message.from_user)
             if db.get_phone(message.from_user.id) is None:
-                logger.info(
-                    f"No number saved for user with id = {message.from_user.id}"
-                )
-                self.__bot.send_message(
+                logger.info("No number saved for user with id = %s", message.from_user.id)
+                self.__sender.submit(
                     message.chat.id,
                     _("There is no information which phone to set call for."
-                      "Send your phone number with the command */number* in bot private messages"),
+                      "Send your phone number with the command */number* in bot private messages", language),
                     parse_mode="Markdown",
                 )
             else:
                 try:
-                    hours = parse_call_hours(message.text)
-                    logger.info(
-                        f"User with id = {message.from_user.id} add call for {hours} hours"
-                    )
+                    hours = parse_call_hours(message.text, language)
+                    logger.info("User with id = %s add call for %s hours", message.from_user.id, hours)
                 except Exception as e:
-                    logger.warning(f"Can't parse hours from message = {message.text}")
-                    self.__bot.send_message(
-                        message.chat.id, _("Error in command: {}").format(str(e))
+                    logger.warning("Can't parse hours from message = %s", message.text)
+                    self.__sender.submit(
+                        message.chat.id, _f("Error in command: {}", language, str(e))
                     )
                     return
 
                 date_created = datetime.now()
                 date_expired = date_created + timedelta(hours=hours)
                 logger.info(
-                    f"Creating call for user with id = {message.from_user.id}"
-                    f"until {date_expired.strftime('%m/%d/%Y, %H:%M')}"
+                    "Creating call for user with id = %s until %s",
+                    message.from_user.id, date_expired.strftime("%m/%d/%Y, %H:%M")
                 )
                 db.add_call(message.from_user.id, date_created, date_expired)
-                self.__bot.send_message(
+                if self.__duty_reminders is not None:
+                    self.__duty_reminders.schedule(message.from_user.id, date_expired)
+                self.__sender.submit(
                     message.chat.id,
-                    _("The call is set until ") + date_expired.strftime("%m/%d/%Y, %H:%M")
+                    _("The call is set until ", language) + date_expired.strftime("%m/%d/%Y, %H:%M")
                 )
 
         @self.__bot.channel_post_handler(content_types=["text"])
+        @HANDLER_SECONDS.labels("channel_post").timed
         def new_channel_post(message: telebot.types.Message) -> None:
             """Post handler in channels with alert.
 
@@ -128,58 +239,273 @@ class AlarmCallBot:
                 message: Telegram user message.
             """
             if message.chat.id not in self.__config.CHANNELS_WITH_ALERTS:
+                logger.info("Bot found message in chat with id = %s, but it's not in alerts channels", message.chat.id)
+                return
+            alert_id = f"{message.chat.id}:{message.message_id}"
+            users_on_duty = db.get_active_users(datetime.now())
+            broadcast = None
+            if self.__broadcaster is not None:
+                broadcast = self.__broadcaster.broadcast(
+                    alert_id, [user_id for user_id, _ in users_on_duty], message.text
+                )
+            phones_on_duty = list(dict.fromkeys(phone for _, phone in users_on_duty))
+            phones_to_call = self.__alert_coalescer.filter(phones_on_duty)
+            if len(phones_to_call) < len(phones_on_duty):
                 logger.info(
-                    f"Bot found message in chat with id = {message.chat.id}, but it's not in alerts channels"
+                    "Suppressed %s calls dialed within coalescing window", len(phones_on_duty) - len(phones_to_call)
+                )
+            logger.info(
+                "Setting calls for %s phones = (%s)",
+                len(phones_to_call), CappedList(phones_to_call, self.__config.LOG_MAX_PHONES)
+            )
+            report = self.__dial_outbox.submit_wave(alert_id, phones_to_call)
+            self.__alert_coalescer.release(report.failed)
+            WAVE_SIZE.observe(len(report.results))
+            WAVE_SECONDS.observe(report.duration)
+            logger.info(
+                "Calls wave finished in %.2fs: %s succeeded, %s failed",
+                report.duration, len(report.succeeded), len(report.failed)
+            )
+            if report.failed:
+                logger.warning(
+                    "Failed to set calls for %s phones = (%s)",
+                    len(report.failed), CappedList(report.failed, self.__config.LOG_MAX_PHONES)
+                )
+            deferred = {result.phone for result in report.results if isinstance(result.exception, CircuitOpenException)}
+            if deferred:
+                self.__notify_deferred(
+                    [user_id for user_id, phone in users_on_duty if phone in deferred], message.text, broadcast
                 )
-                return
-            phones_to_call = db.get_phones_to_call(datetime.now())
-            logger.info(f"Setting calls for phones = ({','.join(phones_to_call)})")
-            for phone in phones_to_call:
-                self.__zvonok_manager.create_call(phone)
 
         @self.__bot.message_handler(commands=["number"])
+        @HANDLER_SECONDS.labels("number").timed
         def set_phone(message: telebot.types.Message) -> None:
             """Command /number handler.
 
             Args:
                 message: Telegram user message.
             """
-            if not check_private_chat(self.__bot, message):
+            if not check_private_chat(self.__sender, message):
                 return
+            language = TRANSLATOR.language_for(message.from_user)
             if db.get_phone(message.from_user.id) is None:
-                logger.info(f"Get number from user with id = {message.from_user.id}")
+                logger.info("Get number from user with id = %s", message.from_user.id)
                 keyboard = types.ReplyKeyboardMarkup(row_width=1, resize_keyboard=True)
                 button_phone = types.KeyboardButton(
-                    text=_("Send phone number"), request_contact=True
+                    text=_("Send phone number", language), request_contact=True
                 )
                 keyboard.add(button_phone)
-                self.__bot.send_message(
+                self.__sender.submit(
                     message.chat.id,
-                    _("Send your phone number by clicking the button"),
+                    _("Send your phone number by clicking the button", language),
                     reply_markup=keyboard,
                 )
             else:
-                logger.info(
-                    f"Number from user with id = {message.from_user.id} already saved"
-                )
-                self.__bot.send_message(
-                    message.chat.id, _("Your phone number is already saved in the database")
+                logger.info("Number from user with id = %s already saved", message.from_user.id)
+                self.__sender.submit(
+                    message.chat.id, _("Your phone number is already saved in the database", language)
                 )
 
         @self.__bot.message_handler(content_types=["contact"])
+        @HANDLER_SECONDS.labels("contact").timed
         def contact(message: telebot.types.Message) -> None:
             """User contact handler.
 
             Args:
                 message: Telegram user message.
             """
-            logger.info(
-                f"Message with contact from user with id = {message.from_user.id}"
-            )
+            logger.info("Message with contact from user with id = %s", message.from_user.id)
+            language = TRANSLATOR.language_for(message.from_user)
             if message.contact is not None:
                 db.add_phone(message.from_user.id, message.contact.phone_number)
-                self.__bot.send_message(message.chat.id, _("Phone number successfully added!"))
+                self.__sender.submit(message.chat.id, _("Phone number successfully added!", language))
+
+    def __notify_deferred(self, user_ids: tp.List[int], text: str, broadcast: tp.Optional[Broadcast]) -> None:
+        """
+        Send alert to users whose calls are deferred while Zvonok API is unavailable.
+
+        Users the alert was broadcast to already get it only if their broadcast message failed.
+
+        Args:
+            user_ids: Users which calls are deferred.
+            text: Alert text.
+            broadcast: Broadcast of the alert, None if alerts are not broadcast.
+        """
+        logger.warning(
+            "Zvonok api is unavailable, calls of users with ids = (%s) are deferred",
+            CappedList(user_ids, self.__config.LOG_MAX_PHONES)
+        )
+        if broadcast is None:
+            self.__send_deferred(user_ids, text)
+            return
+
+        def on_done(report: BroadcastReport) -> None:
+            failed = set(report.failed)
+            self.__send_deferred([user_id for user_id in user_ids if user_id in failed], text)
+
+        broadcast.add_done_callback(on_done)
+
+    def __send_deferred(self, user_ids: tp.List[int], text: str) -> None:
+        """
+        Send alert with a note that calls are unavailable.
+
+        Args:
+            user_ids: Users to send to.
+            text: Alert text.
+        """
+        for user_id in user_ids:
+            self.__sender.submit(
+                user_id,
+                _f("Calls are unavailable now, new alert:\n{}", TRANSLATOR.user_language(user_id), text),
+                priority=ALERT,
+            )
+
+    def __escalate(self, phone: str, alert_ids: tp.List[str]) -> None:
+        """
+        Notify user who did not answer alert calls.
+
+        Args:
+            phone: Phone which did not answer.
+            alert_ids: Alerts the phone was dialed for.
+        """
+        logger.error("Nobody answered calls for phone = %s, alerts = (%s)", phone, CappedList(alert_ids))
+        user_id = db.get_user_id(phone)
+        if user_id is not None:
+            self.__sender.submit(
+                user_id,
+                _("You did not answer the alarm call, check the alerts channel", TRANSLATOR.user_language(user_id)),
+                priority=ALERT,
+            )
+
+    def __register_gauges(self) -> None:
+        """Register gauges of subscribers and queues of this bot."""
+        metrics.Gauge(
+            "alarm_bot_active_subscribers", "Number of users on duty.",
+            lambda: len(db.get_active_phones(datetime.now())),
+        )
+        metrics.Gauge(
+            "alarm_bot_write_queue_depth", "Number of records waiting to be written to database.",
+            db.get_write_queue_depth,
+        )
+        metrics.Gauge(
+            "alarm_bot_webhook_queue_depth", "Number of webhook updates waiting to be processed.",
+            lambda: self.__webhook_server.queue_depth if self.__webhook_server is not None else 0,
+        )
+        metrics.Gauge(
+            "alarm_bot_update_queue_depth", "Number of updates waiting in dispatcher lanes.",
+            lambda: self.__bot.dispatcher.queue_depth,
+        )
+        metrics.Gauge(
+            "alarm_bot_outgoing_queue_depth", "Number of Telegram messages waiting to be sent.",
+            lambda: self.__sender.queue_depth,
+        )
+        metrics.Gauge(
+            "alarm_bot_duty_reminders_pending", "Number of pending duty reminders.",
+            lambda: len(self.__duty_reminders) if self.__duty_reminders is not None else 0,
+        )
+        metrics.Gauge("alarm_bot_outbox_pending", "Number of dials waiting to be retried.", db.count_pending_dials)
+        metrics.Gauge(
+            "alarm_bot_tracked_calls", "Number of phones which call status is polled.",
+            lambda: len(self.__call_status_tracker),
+        )
+        rate_limiter = self.__zvonok_manager.rate_limiter
+        metrics.Gauge(
+            "zvonok_rate_limiter_queue_depth", "Number of requests waiting for the rate limiter.",
+            lambda: rate_limiter.queue_depth,
+        )
+        metrics.Gauge("zvonok_rate_limit", "Current Zvonok API requests per second limit.", lambda: rate_limiter.rate)
+        metrics.Gauge(
+            "zvonok_circuit_open", "1 if Zvonok API circuit is open.",
+            lambda: self.__zvonok_manager.circuit_breaker.state == CircuitBreaker.OPEN,
+        )
+
+    def __start_jobs(self) -> None:
+        """Start background jobs and warm up the alert path."""
+        if self.__config.DB_WRITE_BEHIND:
+            db.enable_write_behind(
+                batch_size=self.__config.DB_WRITE_BATCH_SIZE, flush_interval=self.__config.DB_WRITE_FLUSH_INTERVAL
+            )
+        threading.Thread(target=self.__zvonok_manager.warm_up, name="zvonok-warm-up", daemon=True).start()
+        if self.__config.METRICS_PORT is not None:
+            self.__register_gauges()
+            self.__metrics_server = metrics.MetricsServer(
+                host=self.__config.METRICS_HOST, port=self.__config.METRICS_PORT
+            )
+            self.__metrics_server.start()
+            logger.info("Serving metrics on %s:%s", self.__config.METRICS_HOST, self.__metrics_server.port)
+        self.__sender.start()
+        if self.__broadcast_sender is not None:
+            self.__broadcast_sender.start()
+        self.__bot.dispatcher.start()
+        if self.__duty_reminders is not None:
+            self.__duty_reminders.start()
+        self.__zvonok_manager.restore_campaigns(db.get_tracked_campaigns())
+        self.__call_status_tracker.start()
+        self.__dial_outbox.start()
+        self.__compaction_job.start()
+
+    def __stop_jobs(self) -> None:
+        """Stop background jobs and write all queued records."""
+        self.__bot.dispatcher.stop()
+        if self.__duty_reminders is not None:
+            self.__duty_reminders.stop()
+        self.__sender.stop()
+        if self.__broadcast_sender is not None:
+            self.__broadcast_sender.stop()
+        self.__compaction_job.stop()
+        self.__dial_outbox.stop()
+        self.__call_status_tracker.stop()
+        db.disable_write_behind()
+        if self.__metrics_server is not None:
+            self.__metrics_server.stop()
+            self.__metrics_server = None
 
     def start_polling(self):
-        """Start bot polling."""
-        self.__bot.polling(none_stop=True, interval=0)
+        """Start bot polling and background jobs."""
+        self.__start_jobs()
+        try:
+            self.__bot.polling(none_stop=True, interval=0)
+        finally:
+            self.__stop_jobs()
+
+    def start_webhook(self, url: str, host: str = "127.0.0.1", port: int = 8443,
+                      secret_token: tp.Optional[str] = None) -> None:
+        """
+        Register webhook and serve updates sent to it until stopped.
+
+        The server listens on plain HTTP, TLS should be terminated by a reverse proxy at url.
+
+        Args:
+            url: Public HTTPS url Telegram sends updates to.
+            host: Host for local server to listen on.
+            port: Port for local server to listen on.
+            secret_token: Secret token Telegram sends with every update.
+        """
+        from .Webhook import WebhookServer
+
+        self.__stop_event.clear()
+        self.__webhook_server = WebhookServer(
+            lambda update: self.__bot.process_new_updates([update]),
+            host=host,
+            port=port,
+            secret_token=secret_token,
+            # One worker keeps updates in order, handlers run in the dispatcher lanes.
+            n_workers=1,
+            queue_size=self.__config.WEBHOOK_QUEUE_SIZE,
+        )
+        self.__bot.remove_webhook()
+        self.__bot.set_webhook(url=url, secret_token=secret_token)
+        self.__start_jobs()
+        self.__webhook_server.start()
+        logger.info("Serving webhook on %s:%s", host, self.__webhook_server.port)
+        try:
+            self.__stop_event.wait()
+        finally:
+            self.__webhook_server.stop()
+            self.__bot.remove_webhook()
+            self.__stop_jobs()
+
+    def stop(self) -> None:
+        """Stop polling or webhook started in another thread."""
+        self.__bot.stop_polling()
+        self.__stop_event.set()
@@ -0,0 +1,161 @@
+"""Broadcast of alerts to users on duty by Telegram messages."""
+import logging
+import threading
+import time
+import typing as tp
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from .. import metrics
+from .Sender import ALERT, MessageSender
+from .Utils import TRANSLATOR, _f
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_SECONDS = metrics.Histogram(
+    "alarm_bot_broadcast_seconds", "Time from alert to the last broadcast message sent in seconds.",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+BROADCAST_SIZE = metrics.Histogram(
+    "alarm_bot_broadcast_size", "Number of users an alert is broadcast to.", buckets=metrics.SIZE_BUCKETS
+)
+
+
+@dataclass
+class BroadcastReport:
+    """
+    Report of a finished broadcast.
+
+    Attributes:
+        alert_id (str): Alert the broadcast was sent for.
+        sent (list): Users the message was sent to.
+        failed (list): Users the message was not sent to.
+        duration (float): Time from the broadcast start to the last finished message in seconds.
+    """
+
+    alert_id: str
+    sent: tp.List[int] = field(default_factory=list)
+    failed: tp.List[int] = field(default_factory=list)
+    duration: float = 0.0
+
+
+class Broadcast:
+    """
+    Broadcast in progress, finished when every message is sent or failed.
+
+    Arguments:
+        alert_id: Alert the broadcast is sent for.
+        user_ids: Users the message is sent to.
+        futures: Results of sending in the order of users.
+        on_done: Function called with the report when the broadcast is finished.
+    """
+
+    def __init__(self, alert_id: str, user_ids: tp.List[int], futures: tp.List[Future],
+                 on_done: tp.Optional[tp.Callable[[BroadcastReport], None]] = None) -> None:
+        """Start tracking results."""
+        self.__report = BroadcastReport(alert_id)
+        self.__start = time.perf_counter()
+        self.__left = len(futures)
+        self.__callbacks = [on_done] if on_done is not None else []
+        self.__lock = threading.Lock()
+        self.__done = threading.Event()
+        if not futures:
+            self.__finish()
+        for user_id, future in zip(user_ids, futures):
+            future.add_done_callback(lambda future, user_id=user_id: self.__on_result(user_id, future))
+
+    def __on_result(self, user_id: int, future: Future) -> None:
+        """Count the result of one message."""
+        ok = not future.cancelled() and future.exception() is None
+        with self.__lock:
+            (self.__report.sent if ok else self.__report.failed).append(user_id)
+            self.__left -= 1
+            finished = self.__left == 0
+        if finished:
+            self.__finish()
+
+    def __finish(self) -> None:
+        """Complete the report."""
+        self.__report.duration = time.perf_counter() - self.__start
+        with self.__lock:
+            self.__done.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            callback(self.__report)
+
+    def add_done_callback(self, callback: tp.Callable[[BroadcastReport], None]) -> None:
+        """
+        Call function with the report when the broadcast is finished, at once if it is finished already.
+
+        Arguments:
+            callback: Function called with the report.
+        """
+        with self.__lock:
+            if not self.__done.is_set():
+                self.__callbacks.append(callback)
+                return
+        callback(self.__report)
+
+    def wait(self, timeout: tp.Optional[float] = None) -> tp.Optional[BroadcastReport]:
+        """
+        Wait until the broadcast is finished.
+
+        Arguments:
+            timeout: Maximal number of seconds to wait, None to wait forever.
+
+        Returns:
+            report: Broadcast report, None if timeout passed first.
+        """
+        if not self.__done.wait(timeout):
+            return None
+        return self.__report
+
+
+class Broadcaster:
+    """
+    Sends alert text to users on duty as alert priority Telegram messages.
+
+    Messages are queued to the sender in one batch and sent in background, so
+    the broadcast runs concurrently with the dial wave. Its completion time is
+    logged and observed when the last message is sent.
+
+    Arguments:
+        sender: Queue of outgoing messages.
+        send_kwargs: Other send_message arguments of every message, e.g. allow_paid_broadcast.
+    """
+
+    def __init__(self, sender: MessageSender, send_kwargs: tp.Optional[tp.Dict[str, tp.Any]] = None) -> None:
+        """Save sender."""
+        self.__sender = sender
+        self.__send_kwargs = send_kwargs or {}
+
+    def broadcast(self, alert_id: str, user_ids: tp.Sequence[int], text: str) -> Broadcast:
+        """
+        Queue alert text to users.
+
+        Arguments:
+            alert_id: Alert id used in logs.
+            user_ids: Users to send to, each user gets text in the language saved for them.
+            text: Alert text.
+
+        Returns:
+            broadcast: Broadcast in progress.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        BROADCAST_SIZE.observe(len(user_ids))
+        logger.info("Broadcasting alert %s to %s users", alert_id, len(user_ids))
+        futures = self.__sender.submit_many(
+            ((user_id, _f("New alert:\n{}", TRANSLATOR.user_language(user_id), text)) for user_id in user_ids),
+            priority=ALERT,
+            **self.__send_kwargs,
+        )
+        return Broadcast(alert_id, user_ids, futures, on_done=self.__report)
+
+    @staticmethod
+    def __report(report: BroadcastReport) -> None:
+        """Log and observe finished broadcast."""
+        BROADCAST_SECONDS.observe(report.duration)
+        logger.info(
+            "Broadcast of alert %s finished in %.2fs: %s sent, %s failed",
+            report.alert_id, report.duration, len(report.sent), len(report.failed)
+        )
@@ -0,0 +1,85 @@
+"""Alert coalescing module."""
+import collections
+import threading
+import time
+import typing as tp
+
+from .. import metrics
+
+SUPPRESSED_DIALS = metrics.Counter(
+    "alarm_bot_suppressed_dials_total", "Number of dials suppressed by alert coalescing cooldown."
+)
+
+
+class AlertCoalescer:
+    """
+    Per-phone cooldown which merges bursts of alerts into one dial wave.
+
+    A phone dialed for an alert is not dialed again for the next window seconds,
+    so the first post of a burst dials everyone on duty at once and the following
+    posts dial only phones which were not dialed yet. Expired cooldowns are evicted
+    on every call in insertion order, which is expiry order for a constant window.
+
+    Arguments:
+        window: Cooldown of a dialed phone in seconds, 0 disables coalescing.
+        clock: Function returning current time in seconds.
+    """
+
+    def __init__(self, window: float, clock: tp.Callable[[], float] = time.monotonic) -> None:
+        """Create coalescer with no phones in cooldown."""
+        self.__window = window
+        self.__clock = clock
+        self.__cooldowns: tp.OrderedDict[str, float] = collections.OrderedDict()
+        self.__suppressed = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get number of phones in cooldown."""
+        return len(self.__cooldowns)
+
+    @property
+    def suppressed_dials(self) -> int:
+        """Total number of dials suppressed by cooldown."""
+        return self.__suppressed
+
+    def __evict(self, now: float) -> None:
+        """Drop cooldowns expired by now."""
+        while self.__cooldowns:
+            phone, expires = next(iter(self.__cooldowns.items()))
+            if expires > now:
+                return
+            del self.__cooldowns[phone]
+
+    def filter(self, phones: tp.Iterable[str]) -> tp.List[str]:
+        """
+        Get phones to dial for a new alert and put them into cooldown.
+
+        Arguments:
+            phones: Phones on duty.
+
+        Returns:
+            phones: Phones which are not in cooldown.
+        """
+        phones = list(phones)
+        if self.__window <= 0:
+            return phones
+        with self.__lock:
+            now = self.__clock()
+            self.__evict(now)
+            to_dial = [phone for phone in phones if phone not in self.__cooldowns]
+            for phone in to_dial:
+                self.__cooldowns[phone] = now + self.__window
+            self.__suppressed += len(phones) - len(to_dial)
+            SUPPRESSED_DIALS.inc(len(phones) - len(to_dial))
+            return to_dial
+
+    def release(self, phones: tp.Iterable[str]) -> None:
+        """
+        Remove cooldown of phones, e.g. which were not dialed because of errors.
+
+        Arguments:
+            phones: Phones to remove cooldown for.
+        """
+        with self.__lock:
+            for phone in phones:
+                self.__cooldowns.pop(phone, None)
@@ -0,0 +1,170 @@
+"""Ordered concurrent dispatcher of Telegram updates."""
+import logging
+import queue
+import threading
+import typing as tp
+
+import telebot
+
+logger = logging.getLogger(__name__)
+
+_USER_UPDATE_FIELDS = (
+    "message", "edited_message", "callback_query", "inline_query", "chosen_inline_result",
+    "shipping_query", "pre_checkout_query", "my_chat_member", "chat_member", "chat_join_request",
+)
+
+
+def get_update_user_id(update: telebot.types.Update) -> tp.Optional[int]:
+    """
+    Get id of the user who sent update.
+
+    Arguments:
+        update: Telegram update.
+
+    Returns:
+        user_id: User id, chat id if the sender is unknown, None for channel posts.
+    """
+    if update.channel_post is not None or update.edited_channel_post is not None:
+        return None
+    for name in _USER_UPDATE_FIELDS:
+        item = getattr(update, name, None)
+        if item is None:
+            continue
+        user = getattr(item, "from_user", None)
+        if user is not None:
+            return user.id
+        chat = getattr(item, "chat", None)
+        if chat is not None:
+            return chat.id
+    return update.update_id
+
+
+class UpdateDispatcher:
+    """
+    Dispatcher which processes updates of one user in order and of different users in parallel.
+
+    Updates are put into one of n_workers lanes by hash of the sender, every
+    lane is processed by its own thread, so a user's /number, contact and
+    /call are handled one after another. Channel posts go into a separate
+    priority lane with its own thread, so alerts never wait behind chat traffic.
+
+    Arguments:
+        process_update: Function which dispatches update to the bot handlers.
+        n_workers: Number of user lanes.
+        queue_size: Maximal number of updates waiting in one lane.
+    """
+
+    def __init__(self, process_update: tp.Callable[[telebot.types.Update], None], n_workers: int = 4,
+                 queue_size: int = 1000) -> None:
+        """Create lanes, updates are not processed until started."""
+        self.__process_update = process_update
+        self.__lanes: tp.List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(n_workers)]
+        self.__priority_lane: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.__workers: tp.List[threading.Thread] = []
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of updates waiting to be processed."""
+        return self.__priority_lane.qsize() + sum(lane.qsize() for lane in self.__lanes)
+
+    def submit(self, update: telebot.types.Update, block: bool = True) -> bool:
+        """
+        Put update into the lane of its sender.
+
+        Arguments:
+            update: Telegram update.
+            block: If True, wait while the lane is full, otherwise reject the update.
+
+        Returns:
+            accepted: False if the lane is full and block is False.
+        """
+        user_id = get_update_user_id(update)
+        lane = self.__priority_lane if user_id is None else self.__lanes[user_id % len(self.__lanes)]
+        try:
+            lane.put(update, block=block)
+        except queue.Full:
+            logger.warning("Updates lane is full, rejecting update with id = %s", update.update_id)
+            return False
+        return True
+
+    def __work(self, lane: queue.Queue) -> None:
+        """Process updates from the lane until None is received."""
+        while True:
+            update = lane.get()
+            if update is None:
+                return
+            try:
+                self.__process_update(update)
+            except Exception as exc:
+                logger.error("Failed to process update with id = %s: %s", update.update_id, exc)
+
+    def start(self) -> None:
+        """Start lane workers."""
+        if self.__workers:
+            return
+        self.__workers = [threading.Thread(
+            target=self.__work, args=(self.__priority_lane,), name="updates-priority", daemon=True
+        )]
+        self.__workers.extend(
+            threading.Thread(target=self.__work, args=(lane,), name=f"updates-{i}", daemon=True)
+            for i, lane in enumerate(self.__lanes)
+        )
+        for worker in self.__workers:
+            worker.start()
+
+    def stop(self) -> None:
+        """Process queued updates and stop workers."""
+        if not self.__workers:
+            return
+        self.__priority_lane.put(None)
+        for lane in self.__lanes:
+            lane.put(None)
+        for worker in self.__workers:
+            worker.join()
+        self.__workers = []
+
+
+class DispatchingTeleBot(telebot.TeleBot):
+    """
+    TeleBot which passes updates to UpdateDispatcher instead of its thread pool.
+
+    Handlers run in the dispatcher lanes, the polling thread only advances the
+    update offset and hands updates over, waiting while a lane is full.
+
+    Arguments:
+        token: Telegram bot token.
+        n_workers: Number of user lanes.
+        queue_size: Maximal number of updates waiting in one lane.
+        kwargs: Other TeleBot arguments.
+    """
+
+    def __init__(self, token: str, n_workers: int = 4, queue_size: int = 1000, **kwargs: tp.Any) -> None:
+        """Create bot and its dispatcher."""
+        super().__init__(token, threaded=False, **kwargs)
+        self.__dispatcher = UpdateDispatcher(self.process_update, n_workers=n_workers, queue_size=queue_size)
+
+    @property
+    def dispatcher(self) -> UpdateDispatcher:
+        """Dispatcher processing updates of the bot."""
+        return self.__dispatcher
+
+    def process_new_updates(self, updates: tp.List[telebot.types.Update]) -> None:
+        """
+        Put updates into dispatcher lanes.
+
+        Arguments:
+            updates: Updates received by polling or webhook.
+        """
+        for update in updates:
+            if update.update_id > self.last_update_id:
+                self.last_update_id = update.update_id
+            self.__dispatcher.submit(update)
+
+    def process_update(self, update: telebot.types.Update) -> None:
+        """
+        Run handlers of update in the calling thread.
+
+        Arguments:
+            update: Telegram update.
+        """
+        super().process_new_updates([update])
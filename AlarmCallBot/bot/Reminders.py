@@ -0,0 +1,122 @@
+"""Reminders about the end of users' duty."""
+import logging
+import threading
+import time
+import typing as tp
+from datetime import datetime
+
+from .. import db, metrics
+from ..timer_wheel import TimerWheel
+from .Sender import MessageSender
+from .Utils import TRANSLATOR, _, _f
+
+logger = logging.getLogger(__name__)
+
+REMINDERS = metrics.Counter(
+    "alarm_bot_duty_reminders_total", "Duty reminders fired by kind.", ("kind",)
+)
+
+WARNING = "warning"
+ENDED = "ended"
+
+
+class DutyReminders:
+    """
+    Timers which tell users that their duty is about to end and has ended.
+
+    Every user on duty has up to two timers in a timing wheel, a warning
+    remind_before seconds before the duty ends and the end of the duty, which
+    also deletes the expired calls of the user. A new call extending the duty
+    replaces both timers. At start timers are rebuilt from table 'calls',
+    reminders which became due while the bot was down are dropped instead of
+    being sent all at once.
+
+    Arguments:
+        sender: Queue of outgoing messages.
+        remind_before: Number of seconds before the end of duty to send the warning.
+        tick: Timing wheel resolution in seconds.
+        clock: Function which returns current time in seconds.
+    """
+
+    def __init__(self, sender: MessageSender, remind_before: float = 600.0, tick: float = 1.0,
+                 clock: tp.Callable[[], float] = time.time) -> None:
+        """Create stopped reminders."""
+        self.__sender = sender
+        self.__remind_before = remind_before
+        self.__clock = clock
+        self.__wheel = TimerWheel(tick=tick, clock=clock)
+        self.__duty_ends: tp.Dict[int, float] = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get number of pending reminders."""
+        return len(self.__wheel)
+
+    def schedule(self, user_id: int, date_expired: datetime) -> None:
+        """
+        Schedule reminders of a new call, calls ending before the current duty end are ignored.
+
+        Arguments:
+            user_id: Bot user id in Telegram.
+            date_expired: Call expiring time.
+        """
+        self.__schedule(user_id, date_expired.timestamp(), self.__clock())
+
+    def __schedule(self, user_id: int, duty_end: float, now: float) -> None:
+        """Replace timers of the user if the duty ends later."""
+        with self.__lock:
+            if duty_end <= self.__duty_ends.get(user_id, now):
+                return
+            self.__duty_ends[user_id] = duty_end
+        warning_at = duty_end - self.__remind_before
+        if warning_at > now:
+            self.__wheel.schedule((WARNING, user_id), warning_at, lambda: self.__warn(user_id, duty_end))
+        else:
+            self.__wheel.cancel((WARNING, user_id))
+        self.__wheel.schedule((ENDED, user_id), duty_end, lambda: self.__end(user_id, duty_end))
+
+    def __warn(self, user_id: int, duty_end: float) -> None:
+        """Tell the user that the duty ends soon."""
+        REMINDERS.labels(WARNING).inc()
+        minutes = max(1, round((duty_end - self.__clock()) / 60))
+        self.__sender.submit(
+            user_id, _f("Your duty ends in {} minutes", TRANSLATOR.user_language(user_id), minutes)
+        )
+
+    def __end(self, user_id: int, duty_end: float) -> None:
+        """Tell the user that the duty has ended and delete the expired calls."""
+        with self.__lock:
+            if self.__duty_ends.get(user_id) != duty_end:
+                return
+            del self.__duty_ends[user_id]
+        REMINDERS.labels(ENDED).inc()
+        logger.info("Duty of user with id = %s has ended", user_id)
+        self.__sender.submit(
+            user_id, _("Your duty has ended, send /call N to be on duty again", TRANSLATOR.user_language(user_id))
+        )
+        try:
+            db.delete_expired_user_calls(user_id, datetime.fromtimestamp(duty_end))
+        except Exception as exc:
+            logger.warning("Failed to delete expired calls of user with id = %s: %s", user_id, exc)
+
+    def fire_due(self) -> int:
+        """
+        Fire all due reminders in the calling thread.
+
+        Returns:
+            n_fired: Number of fired timers.
+        """
+        return self.__wheel.fire_due()
+
+    def start(self) -> None:
+        """Rebuild timers from database and start firing them."""
+        now = self.__clock()
+        duty_ends = db.get_duty_ends(datetime.fromtimestamp(now))
+        for user_id, duty_end in duty_ends:
+            self.__schedule(user_id, duty_end, now)
+        logger.info("Scheduled duty reminders of %s users", len(duty_ends))
+        self.__wheel.start()
+
+    def stop(self) -> None:
+        """Stop firing timers."""
+        self.__wheel.stop()
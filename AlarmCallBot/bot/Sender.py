@@ -0,0 +1,308 @@
+"""Rate limited queue of outgoing Telegram messages."""
+import heapq
+import itertools
+import logging
+import threading
+import time
+import typing as tp
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import telebot
+
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+MESSAGES = metrics.Counter(
+    "alarm_bot_outgoing_messages_total", "Outgoing Telegram messages by result.", ("result",)
+)
+
+ALERT = 0
+REPLY = 1
+
+
+class TokenBucket:
+    """
+    Token bucket which does not block, the caller waits for the delay returned.
+
+    Arguments:
+        rate: Number of tokens added per second.
+        burst: Maximal number of tokens.
+        clock: Monotonic time function.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: tp.Callable[[], float] = time.monotonic) -> None:
+        """Create full bucket."""
+        self.__rate = rate
+        self.__burst = burst
+        self.__clock = clock
+        self.__tokens = float(burst)
+        self.__updated = clock()
+
+    def take(self) -> float:
+        """
+        Take a token if there is one.
+
+        Returns:
+            delay: 0 if the token was taken, otherwise number of seconds until the next token.
+        """
+        now = self.__clock()
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+        if self.__tokens >= 1:
+            self.__tokens -= 1
+            return 0.0
+        return (1 - self.__tokens) / self.__rate
+
+
+@dataclass(order=True)
+class _OutgoingMessage:
+    """
+    Message waiting to be sent, ordered by priority and then by submission.
+
+    Attributes:
+        priority (int): ALERT or REPLY, lower is sent first.
+        seq (int): Submission number.
+        chat_id (int): Chat to send to.
+        text (str): Message text.
+        kwargs (dict): Other send_message arguments.
+        future (Future): Result of sending.
+        attempts (int): Number of failed attempts.
+    """
+
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    text: str = field(compare=False)
+    kwargs: tp.Dict[str, tp.Any] = field(compare=False, default_factory=dict)
+    future: Future = field(compare=False, default_factory=Future)
+    attempts: int = field(compare=False, default=0)
+
+
+def get_retry_after(exc: Exception) -> tp.Optional[float]:
+    """
+    Get delay requested by Telegram from exception of throttled request.
+
+    Arguments:
+        exc: Exception raised by send.
+
+    Returns:
+        retry_after: Number of seconds to wait, None if the request was not throttled.
+    """
+    if not isinstance(exc, telebot.apihelper.ApiTelegramException) or exc.error_code != 429:
+        return None
+    parameters = (exc.result_json or {}).get("parameters") or {}
+    return float(parameters.get("retry_after", 1))
+
+
+class MessageSender:
+    """
+    Queue of outgoing messages sent in background within Telegram limits.
+
+    Handlers submit messages and return at once. Messages are sent in order of
+    priority, so alerts go ahead of routine replies, and in submission order
+    within one priority. A global token bucket keeps the bot under the overall
+    rate limit and messages of one chat are spaced by chat_interval, while a
+    chat waiting for its turn does not hold messages to other chats. Throttled
+    messages are retried after the delay Telegram asks for, messages which
+    failed for other reasons are retried max_attempts times, except Telegram
+    client errors like a blocked bot, which are not retried.
+
+    Arguments:
+        send: Function which sends a message, e.g. TeleBot.send_message.
+        rate: Maximal number of messages per second.
+        burst: Maximal number of messages sent at once after idle time.
+        chat_interval: Minimal number of seconds between messages to one chat.
+        n_workers: Number of messages sent concurrently.
+        max_attempts: Number of attempts to send a message, throttled attempts are not counted.
+    """
+
+    def __init__(self, send: tp.Callable[..., tp.Any], rate: float = 30.0, burst: tp.Optional[float] = None,
+                 chat_interval: float = 1.0, n_workers: int = 8, max_attempts: int = 3) -> None:
+        """Create sender, messages are queued but not sent until started."""
+        self.__send = send
+        self.__bucket = TokenBucket(rate, burst if burst is not None else rate)
+        self.__chat_interval = chat_interval
+        self.__n_workers = n_workers
+        self.__max_attempts = max_attempts
+        self.__seq = itertools.count()
+        self.__queue: tp.List[_OutgoingMessage] = []
+        self.__parked: tp.Dict[int, tp.List[_OutgoingMessage]] = {}
+        self.__timers: tp.List[tp.Tuple[float, int]] = []
+        self.__chat_ready_at: tp.Dict[int, float] = {}
+        self.__sending: tp.Set[int] = set()
+        self.__in_flight = 0
+        self.__cond = threading.Condition()
+        self.__running = False
+        self.__thread: tp.Optional[threading.Thread] = None
+        self.__executor: tp.Optional[ThreadPoolExecutor] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of messages waiting to be sent."""
+        with self.__cond:
+            return len(self.__queue) + sum(len(messages) for messages in self.__parked.values())
+
+    def submit(self, chat_id: int, text: str, priority: int = REPLY, **kwargs: tp.Any) -> Future:
+        """
+        Queue message.
+
+        Arguments:
+            chat_id: Chat to send to.
+            text: Message text.
+            priority: ALERT or REPLY.
+            kwargs: Other send_message arguments, e.g. parse_mode or reply_markup.
+
+        Returns:
+            future: Result of send, the sent message or the exception of the last attempt.
+        """
+        message = _OutgoingMessage(priority, next(self.__seq), chat_id, text, kwargs)
+        with self.__cond:
+            self.__push(message)
+            self.__cond.notify_all()
+        return message.future
+
+    def submit_many(self, messages: tp.Iterable[tp.Tuple[int, str]], priority: int = REPLY,
+                    **kwargs: tp.Any) -> tp.List[Future]:
+        """
+        Queue a batch of messages at once.
+
+        Arguments:
+            messages: Pairs (chat_id, text).
+            priority: ALERT or REPLY.
+            kwargs: Other send_message arguments of every message.
+
+        Returns:
+            futures: Results of send in the order of messages.
+        """
+        batch = [_OutgoingMessage(priority, next(self.__seq), chat_id, text, kwargs) for chat_id, text in messages]
+        with self.__cond:
+            for message in batch:
+                self.__push(message)
+            self.__cond.notify_all()
+        return [message.future for message in batch]
+
+    def __push(self, message: _OutgoingMessage) -> None:
+        """Queue message, park it behind earlier messages of its chat if they wait."""
+        parked = self.__parked.get(message.chat_id)
+        if parked is not None:
+            parked.append(message)
+        else:
+            heapq.heappush(self.__queue, message)
+
+    def __park(self, message: _OutgoingMessage) -> None:
+        """Hold message until its chat is ready, wake up then unless a message of the chat is being sent."""
+        chat_id = message.chat_id
+        if chat_id not in self.__parked:
+            self.__parked[chat_id] = []
+            if chat_id not in self.__sending:
+                heapq.heappush(self.__timers, (self.__chat_ready_at[chat_id], chat_id))
+        self.__parked[chat_id].append(message)
+
+    def __unpark_due(self, now: float) -> tp.Optional[float]:
+        """Return messages of ready chats to the queue, get the time of the next timer."""
+        while self.__timers and self.__timers[0][0] <= now:
+            _, chat_id = heapq.heappop(self.__timers)
+            if chat_id in self.__sending or self.__chat_ready_at.get(chat_id, 0.0) > now:
+                continue
+            for message in self.__parked.pop(chat_id, []):
+                heapq.heappush(self.__queue, message)
+        return self.__timers[0][0] if self.__timers else None
+
+    def __schedule(self) -> None:
+        """Pass messages to workers as limits allow until stopped."""
+        with self.__cond:
+            while self.__running:
+                now = time.monotonic()
+                next_timer = self.__unpark_due(now)
+                timeout = None if next_timer is None else max(0.0, next_timer - now)
+                if not self.__queue or self.__in_flight >= self.__n_workers:
+                    self.__cond.wait(timeout)
+                    continue
+                message = self.__queue[0]
+                if message.chat_id in self.__sending or self.__chat_ready_at.get(message.chat_id, 0.0) > now:
+                    self.__park(heapq.heappop(self.__queue))
+                    continue
+                delay = self.__bucket.take()
+                if delay > 0:
+                    self.__cond.wait(delay if timeout is None else min(delay, timeout))
+                    continue
+                heapq.heappop(self.__queue)
+                self.__in_flight += 1
+                self.__sending.add(message.chat_id)
+                self.__chat_ready_at[message.chat_id] = now + self.__chat_interval
+                self.__executor.submit(self.__deliver, message)
+
+    def __retry_delay(self, message: _OutgoingMessage, exc: Exception) -> tp.Optional[float]:
+        """Get delay before the next attempt to send message, None if it failed for good."""
+        retry_after = get_retry_after(exc)
+        if retry_after is not None:
+            MESSAGES.labels("throttled").inc()
+            logger.warning("Telegram throttled message to chat with id = %s for %ss", message.chat_id, retry_after)
+            return retry_after
+        message.attempts += 1
+        if isinstance(exc, telebot.apihelper.ApiTelegramException) or message.attempts >= self.__max_attempts:
+            MESSAGES.labels("failed").inc()
+            logger.error("Failed to send message to chat with id = %s: %s", message.chat_id, exc)
+            message.future.set_exception(exc)
+            return None
+        logger.warning("Failed to send message to chat with id = %s, retrying: %s", message.chat_id, exc)
+        return self.__chat_interval
+
+    def __deliver(self, message: _OutgoingMessage) -> None:
+        """Send message, queue it again if it should be retried."""
+        retry_after = None
+        try:
+            result = self.__send(message.chat_id, message.text, **message.kwargs)
+        except Exception as exc:
+            retry_after = self.__retry_delay(message, exc)
+        else:
+            MESSAGES.labels("sent").inc()
+            message.future.set_result(result)
+        chat_id = message.chat_id
+        with self.__cond:
+            self.__in_flight -= 1
+            self.__sending.discard(chat_id)
+            if retry_after is not None:
+                self.__chat_ready_at[chat_id] = max(self.__chat_ready_at[chat_id], time.monotonic() + retry_after)
+                self.__parked.setdefault(chat_id, []).insert(0, message)
+            if chat_id in self.__parked:
+                heapq.heappush(self.__timers, (self.__chat_ready_at[chat_id], chat_id))
+            self.__cond.notify_all()
+
+    def start(self) -> None:
+        """Start sending queued messages in background."""
+        if self.__thread is not None:
+            return
+        self.__running = True
+        self.__executor = ThreadPoolExecutor(max_workers=self.__n_workers, thread_name_prefix="sender")
+        self.__thread = threading.Thread(target=self.__schedule, name="sender", daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Send queued messages and stop.
+
+        Arguments:
+            timeout: Maximal number of seconds to wait for queued messages, the rest is dropped.
+        """
+        if self.__thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        with self.__cond:
+            while (self.__queue or self.__parked or self.__in_flight) and time.monotonic() < deadline:
+                self.__cond.wait(deadline - time.monotonic())
+            dropped = self.__queue + [message for messages in self.__parked.values() for message in messages]
+            if dropped:
+                logger.warning("Dropping %s unsent messages", len(dropped))
+            for message in dropped:
+                message.future.cancel()
+            self.__queue = []
+            self.__parked = {}
+            self.__running = False
+            self.__cond.notify_all()
+        self.__thread.join()
+        self.__executor.shutdown(wait=True)
+        self.__thread = None
+        self.__executor = None
@@ -0,0 +1,239 @@
+"""Translations with per-user language."""
+import collections
+import gettext
+import locale
+import logging
+import os
+import threading
+import typing as tp
+
+import telebot
+
+logger = logging.getLogger(__name__)
+
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "po")
+DEFAULT_LANGUAGE = "en"
+
+
+def _normalize(language_code: str) -> tp.Tuple[str, str]:
+    """
+    Normalize language code.
+
+    Arguments:
+        language_code: IETF language tag from Telegram, e.g. 'pt-br', or locale name, e.g. 'ru_RU.UTF-8'.
+
+    Returns:
+        codes: Full code, e.g. 'pt_BR', and primary language, e.g. 'pt'.
+    """
+    code = language_code.split(".")[0].replace("-", "_")
+    primary, _, region = code.partition("_")
+    primary = primary.lower()
+    return (f"{primary}_{region.upper()}" if region else primary), primary
+
+
+class Translator:
+    """
+    Translator which loads compiled catalogs once and picks the language per user.
+
+    Catalogs are loaded on the first lookup, so importing the bot does not read
+    them. Translated messages are memoized per language, so a repeated lookup
+    costs two dict gets, and formatted messages are kept in an LRU cache by
+    language, message and arguments, so e.g. an alert broadcast to thousands
+    of users is formatted once per language. The language of a user is taken from language_code Telegram sends
+    with every message and remembered in an LRU cache, so messages sent to the
+    user outside of a handler, e.g. alert notifications, use it too. Languages
+    without a catalog fall back to the default language.
+
+    Arguments:
+        domain: Catalog domain, name of .mo files.
+        locale_dir: Directory with compiled catalogs in <locale>/LC_MESSAGES/<domain>.mo.
+        default_language: Language of users with unknown language, None for the server locale.
+        max_users: Number of the latest users whose language is remembered.
+        max_formatted: Number of the latest formatted messages remembered.
+    """
+
+    def __init__(self, domain: str = "bot", locale_dir: str = LOCALE_DIR,
+                 default_language: tp.Optional[str] = None, max_users: int = 10000,
+                 max_formatted: int = 1024) -> None:
+        """Save settings, catalogs are loaded on first use."""
+        self.__domain = domain
+        self.__locale_dir = locale_dir
+        self.__default_language = default_language
+        self.__catalogs: tp.Optional[tp.Dict[str, gettext.NullTranslations]] = None
+        self.__messages: tp.Dict[str, tp.Dict[str, str]] = {}
+        self.__resolved: tp.Dict[str, str] = {}
+        self.__default = DEFAULT_LANGUAGE
+        self.__load_lock = threading.Lock()
+        self.__max_users = max_users
+        self.__users: tp.OrderedDict[int, str] = collections.OrderedDict()
+        self.__max_formatted = max_formatted
+        self.__formatted: tp.OrderedDict[tp.Tuple[tp.Optional[str], str, tp.Tuple[tp.Any, ...]], str] = (
+            collections.OrderedDict()
+        )
+        self.__lock = threading.Lock()
+
+    def __load(self) -> tp.Dict[str, gettext.NullTranslations]:
+        """Load all compiled catalogs of the domain once."""
+        catalogs = self.__catalogs
+        if catalogs is not None:
+            return catalogs
+        with self.__load_lock:
+            if self.__catalogs is not None:
+                return self.__catalogs
+            catalogs = {DEFAULT_LANGUAGE: gettext.NullTranslations()}
+            if os.path.isdir(self.__locale_dir):
+                for name in sorted(os.listdir(self.__locale_dir)):
+                    path = os.path.join(self.__locale_dir, name, "LC_MESSAGES", f"{self.__domain}.mo")
+                    if not os.path.isfile(path):
+                        continue
+                    with open(path, "rb") as mo_file:
+                        catalog = gettext.GNUTranslations(mo_file)
+                    code, primary = _normalize(name)
+                    catalogs[code] = catalog
+                    catalogs.setdefault(primary, catalog)
+            else:
+                logger.warning("No compiled translations found in %s", self.__locale_dir)
+            default_language = self.__default_language
+            if default_language is None:
+                default_language = locale.getlocale()[0]
+            if default_language:
+                self.__default = self.__match(catalogs, default_language)
+            self.__messages = {language: {} for language in catalogs}
+            self.__catalogs = catalogs
+            return catalogs
+
+    def __match(self, catalogs: tp.Dict[str, gettext.NullTranslations], language_code: str) -> str:
+        """Get language with catalog for the language code, the default language if there is none."""
+        code, primary = _normalize(language_code)
+        if code in catalogs:
+            return code
+        if primary in catalogs:
+            return primary
+        return self.__default
+
+    @property
+    def default_language(self) -> str:
+        """Language of users with unknown language."""
+        self.__load()
+        return self.__default
+
+    @property
+    def languages(self) -> tp.List[str]:
+        """Languages with catalogs."""
+        return sorted(self.__load())
+
+    def resolve(self, language_code: tp.Optional[str]) -> str:
+        """
+        Get language with catalog for the language code given.
+
+        Arguments:
+            language_code: Language code, e.g. 'ru' or 'ru-RU'.
+
+        Returns:
+            language: Language with catalog, the default language if there is none.
+        """
+        if not language_code:
+            return self.default_language
+        language = self.__resolved.get(language_code)
+        if language is None:
+            language = self.__match(self.__load(), language_code)
+            self.__resolved[language_code] = language
+        return language
+
+    def gettext(self, text: str, language: tp.Optional[str] = None) -> str:
+        """
+        Translate message.
+
+        Arguments:
+            text: Message to translate.
+            language: Language returned by resolve, None or unknown for the default language.
+
+        Returns:
+            translation: Translated message or the message itself if there is no translation.
+        """
+        messages = self.__messages.get(language) if language is not None else None
+        if messages is None:
+            catalogs = self.__load()
+            if language not in catalogs:
+                language = self.__default
+            messages = self.__messages[language]
+        translation = messages.get(text)
+        if translation is None:
+            translation = self.__load()[language].gettext(text)
+            messages[text] = translation
+        return translation
+
+    def format(self, text: str, language: tp.Optional[str], *args: tp.Any) -> str:
+        """
+        Translate message and fill its {} fields.
+
+        Arguments:
+            text: Message to translate, a str.format template.
+            language: Language returned by resolve, None or unknown for the default language.
+            args: Hashable values of the fields.
+
+        Returns:
+            message: Formatted translation.
+        """
+        key = (language, text, args)
+        with self.__lock:
+            message = self.__formatted.get(key)
+            if message is not None:
+                self.__formatted.move_to_end(key)
+                return message
+        message = self.gettext(text, language).format(*args)
+        with self.__lock:
+            self.__formatted[key] = message
+            if len(self.__formatted) > self.__max_formatted:
+                self.__formatted.popitem(last=False)
+        return message
+
+    def remember(self, user_id: int, language_code: tp.Optional[str]) -> str:
+        """
+        Save language of the user.
+
+        Arguments:
+            user_id: Telegram user id.
+            language_code: Language code of the user sent by Telegram.
+
+        Returns:
+            language: Language to use for the user.
+        """
+        language = self.resolve(language_code)
+        with self.__lock:
+            self.__users[user_id] = language
+            self.__users.move_to_end(user_id)
+            if len(self.__users) > self.__max_users:
+                self.__users.popitem(last=False)
+        return language
+
+    def user_language(self, user_id: int) -> str:
+        """
+        Get language of the user saved before.
+
+        Arguments:
+            user_id: Telegram user id.
+
+        Returns:
+            language: Saved language or the default language.
+        """
+        with self.__lock:
+            language = self.__users.get(user_id)
+            if language is None:
+                return self.default_language
+            self.__users.move_to_end(user_id)
+            return language
+
+    def language_for(self, user: tp.Optional[telebot.types.User]) -> str:
+        """
+        Get language for the message sender and remember it.
+
+        Arguments:
+            user: Message sender, None for channel posts.
+
+        Returns:
+            language: Language to use for the user.
+        """
+        if user is None:
+            return self.default_language
+        return self.remember(user.id, user.language_code)
@@ -2,52 +2,77 @@
 import re
 import telebot
 import logging
-import locale
-import gettext
+import typing as tp
+
+from .Sender import MessageSender
+from .Translations import Translator
 
 
 logger = logging.getLogger(__name__)
 
+TRANSLATOR = Translator()
+
 
-LOCALES = {
-    ("ru_RU", "UTF-8"): gettext.translation("bot", "po", ["ru_RU.UTF-8"], fallback=True),
-    ("en_US", "UTF-8"): gettext.NullTranslations(),
-}
+def _(text: str, language: tp.Optional[str] = None) -> str:
+    """
+    Translate message.
 
+    Arguments:
+        text: Message to translate.
+        language: Language of the user, None for the default language.
+    """
+    return TRANSLATOR.gettext(text, language)
 
-def _(text: str) -> str:
-    return LOCALES[locale.getlocale()].gettext(text)
 
+def _f(text: str, language: tp.Optional[str], *args: tp.Any) -> str:
+    """
+    Translate message and fill its {} fields, formatted messages are cached.
 
-def parse_call_hours(message: str) -> int:
+    Arguments:
+        text: Message to translate.
+        language: Language of the user, None for the default language.
+        args: Values of the fields.
+    """
+    return TRANSLATOR.format(text, language, *args)
+
+
+def parse_call_hours(message: str, language: tp.Optional[str] = None) -> int:
     """
     Parse hours from /call message.
 
     Arguments:
         message: Telegram message in format '/call N'.
+        language: Language of error messages.
 
     Returns:
         hours: N in message, the number of hours during which bot can call the user.
     """
     matcher = re.match(r"/call[\s]*(\d+)", message)
     if matcher is None:
-        raise ValueError(_("The message must match the pattern /call hours"))
+        raise ValueError(_("The message must match the pattern /call hours", language))
     hours = int(matcher.group(1))
     if not hours > 0:
-        raise ValueError(_("Number of hours must be greater than 0"))
+        raise ValueError(_("Number of hours must be greater than 0", language))
 
     return hours
 
 
-def check_private_chat(bot: telebot.TeleBot, message: telebot.types.Message) -> bool:
-    """Check if user sends message in bot private chat."""
+def check_private_chat(sender: MessageSender, message: telebot.types.Message) -> bool:
+    """
+    Check if user sends message in bot private chat, queue a hint to the chat otherwise.
+
+    Arguments:
+        sender: Queue of outgoing messages.
+        message: Telegram user message.
+    """
     if message.chat.type != "private":
-        logger.debug(
-            f"Message /number was sent in public chat from user with id = {message.from_user.id}"
-        )
-        bot.send_message(
+        logger.debug("Message /number was sent in public chat from user with id = %s", message.from_user.id)
+        sender.submit(
             message.chat.id,
-            _("To add a phone number write the command /number in a private message to the bot"),
+            _(
+                "To add a phone number write the command /number in a private message to the bot",
+                TRANSLATOR.language_for(message.from_user),
+            ),
         )
         return False
     return True
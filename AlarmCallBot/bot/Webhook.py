@@ -0,0 +1,180 @@
+"""Webhook server for Telegram updates."""
+import collections
+import json
+import logging
+import queue
+import threading
+import typing as tp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import telebot
+
+logger = logging.getLogger(__name__)
+
+
+class _UpdateIdFilter:
+    """
+    Bounded set of seen update ids.
+
+    Arguments:
+        max_size: Number of the latest update ids to remember.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Create empty filter."""
+        self.__max_size = max_size
+        self.__seen: tp.OrderedDict[int, None] = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def add(self, update_id: int) -> bool:
+        """
+        Remember update id.
+
+        Arguments:
+            update_id: Telegram update id.
+
+        Returns:
+            new: False if the update id was already seen.
+        """
+        with self.__lock:
+            if update_id in self.__seen:
+                return False
+            self.__seen[update_id] = None
+            if len(self.__seen) > self.__max_size:
+                self.__seen.popitem(last=False)
+            return True
+
+    def discard(self, update_id: int) -> None:
+        """
+        Forget update id, so the update is accepted again.
+
+        Arguments:
+            update_id: Telegram update id.
+        """
+        with self.__lock:
+            self.__seen.pop(update_id, None)
+
+
+class WebhookServer:
+    """
+    Local HTTP server which receives Telegram updates sent to the bot webhook.
+
+    Updates are deduplicated by update_id, put into a bounded queue and
+    processed by worker threads, so the server answers Telegram at once. When
+    the queue is full the server answers 503 and Telegram delivers the update later.
+
+    Arguments:
+        process_update: Function which dispatches update to the bot handlers.
+        host: Host to listen on.
+        port: Port to listen on, 0 to pick a free one.
+        secret_token: If set, requests without the same X-Telegram-Bot-Api-Secret-Token header are rejected.
+        n_workers: Number of threads processing updates.
+        queue_size: Maximal number of updates waiting to be processed.
+        dedup_size: Number of the latest update ids remembered for deduplication.
+    """
+
+    def __init__(self, process_update: tp.Callable[[telebot.types.Update], None], host: str = "127.0.0.1",
+                 port: int = 8443, secret_token: tp.Optional[str] = None, n_workers: int = 4,
+                 queue_size: int = 1000, dedup_size: int = 10000) -> None:
+        """Create server, it does not accept updates until started."""
+        self.__process_update = process_update
+        self.__secret_token = secret_token
+        self.__n_workers = n_workers
+        self.__queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.__update_ids = _UpdateIdFilter(dedup_size)
+        self.__workers: tp.List[threading.Thread] = []
+        self.__server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self.__server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        """Port the server listens on."""
+        return self.__server.server_address[1]
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of updates waiting to be processed."""
+        return self.__queue.qsize()
+
+    def __make_handler(self) -> tp.Type[BaseHTTPRequestHandler]:
+        """Create request handler class bound to this server."""
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Webhook request handler."""
+
+            def do_POST(self) -> None:
+                """Receive update."""
+                status = webhook.receive(
+                    self.headers.get("X-Telegram-Bot-Api-Secret-Token"),
+                    self.rfile.read(int(self.headers.get("Content-Length", 0))),
+                )
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: tp.Any) -> None:
+                """Log request into debug log instead of stderr."""
+                logger.debug(format % args)
+
+        return Handler
+
+    def receive(self, secret_token: tp.Optional[str], body: bytes) -> int:
+        """
+        Accept update sent by Telegram.
+
+        Arguments:
+            secret_token: Value of X-Telegram-Bot-Api-Secret-Token header.
+            body: Request body.
+
+        Returns:
+            status: HTTP status code to respond with.
+        """
+        if self.__secret_token is not None and secret_token != self.__secret_token:
+            return 403
+        try:
+            update = json.loads(body)
+            update_id = update["update_id"]
+        except (ValueError, KeyError, TypeError):
+            return 400
+        if not self.__update_ids.add(update_id):
+            logger.info("Skip duplicate update with id = %s", update_id)
+            return 200
+        try:
+            self.__queue.put_nowait(update)
+        except queue.Full:
+            self.__update_ids.discard(update_id)
+            logger.warning("Updates queue is full, rejecting update with id = %s", update_id)
+            return 503
+        return 200
+
+    def __work(self) -> None:
+        """Process updates from the queue until None is received."""
+        while True:
+            update = self.__queue.get()
+            if update is None:
+                return
+            try:
+                self.__process_update(telebot.types.Update.de_json(update))
+            except Exception as exc:
+                logger.error("Failed to process update with id = %s: %s", update.get("update_id"), exc)
+
+    def start(self) -> None:
+        """Start workers and serve requests in a background thread."""
+        self.__workers = [
+            threading.Thread(target=self.__work, name=f"webhook-worker-{i}", daemon=True)
+            for i in range(self.__n_workers)
+        ]
+        self.__workers.append(threading.Thread(target=self.__server.serve_forever, name="webhook", daemon=True))
+        for worker in self.__workers:
+            worker.start()
+
+    def stop(self) -> None:
+        """Stop serving requests, process queued updates and stop workers."""
+        self.__server.shutdown()
+        self.__server.server_close()
+        for _ in range(self.__n_workers):
+            self.__queue.put(None)
+        for worker in self.__workers:
+            worker.join()
+        self.__workers = []
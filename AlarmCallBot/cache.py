@@ -0,0 +1,113 @@
+"""Bounded read-through cache with expiring entries."""
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+
+from . import metrics
+
+CACHE_LOOKUPS = metrics.Counter(
+    "alarm_bot_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+
+K = tp.TypeVar("K")
+V = tp.TypeVar("V")
+
+
+class TTLCache(tp.Generic[K, V]):
+    """
+    LRU cache which entries expire after ttl seconds.
+
+    None values, e.g. a user without a phone, are cached too but expire after
+    the shorter negative_ttl, so a value saved elsewhere is picked up soon even
+    if invalidation is missed. When max_size entries are cached, the least
+    recently used one is evicted. A value loaded while the key is invalidated
+    is not cached, so a lookup racing with an update never keeps the old value.
+
+    Arguments:
+        name: Cache name used as the metrics label.
+        max_size: Maximal number of cached keys.
+        ttl: Number of seconds a value is cached.
+        negative_ttl: Number of seconds a None value is cached.
+        clock: Monotonic time function.
+    """
+
+    def __init__(self, name: str, max_size: int = 10000, ttl: float = 300.0, negative_ttl: float = 30.0,
+                 clock: tp.Callable[[], float] = time.monotonic) -> None:
+        """Create empty cache."""
+        self.__hits = CACHE_LOOKUPS.labels(name, "hit")
+        self.__misses = CACHE_LOOKUPS.labels(name, "miss")
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__negative_ttl = negative_ttl
+        self.__clock = clock
+        self.__entries: "OrderedDict[K, tp.Tuple[float, tp.Optional[V]]]" = OrderedDict()
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get number of cached keys, expired ones included until they are looked up or evicted."""
+        return len(self.__entries)
+
+    def configure(self, max_size: int, ttl: float, negative_ttl: float) -> None:
+        """
+        Change cache limits and drop cached values.
+
+        Arguments:
+            max_size: Maximal number of cached keys.
+            ttl: Number of seconds a value is cached.
+            negative_ttl: Number of seconds a None value is cached.
+        """
+        with self.__lock:
+            self.__max_size = max_size
+            self.__ttl = ttl
+            self.__negative_ttl = negative_ttl
+        self.clear()
+
+    def get_or_load(self, key: K, load: tp.Callable[[K], tp.Optional[V]]) -> tp.Optional[V]:
+        """
+        Get cached value, load and cache it if it is missing or expired.
+
+        Arguments:
+            key: Key to look up.
+            load: Function which reads the value of key from the source.
+
+        Returns:
+            value: Cached or loaded value.
+        """
+        now = self.__clock()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.__entries.move_to_end(key)
+                self.__hits.inc()
+                return entry[1]
+            generation = self.__generation
+        self.__misses.inc()
+        value = load(key)
+        with self.__lock:
+            if generation != self.__generation or self.__max_size <= 0:
+                return value
+            ttl = self.__ttl if value is not None else self.__negative_ttl
+            self.__entries[key] = (self.__clock() + ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: K) -> None:
+        """
+        Drop cached value of key, the next lookup loads it from the source.
+
+        Arguments:
+            key: Changed key.
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__generation += 1
+
+    def clear(self) -> None:
+        """Drop all cached values."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__generation += 1
@@ -0,0 +1,237 @@
+"""Call status tracking module."""
+import heapq
+import logging
+import threading
+import time
+import typing as tp
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from . import db
+from .zvonok_api.Utils import parse_call_status
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _TrackedPhone:
+    """
+    Status tracking state of one phone.
+
+    Attributes:
+        alert_ids (list): Alerts the phone was dialed for.
+        started_at (float): Time of the first dial in clock seconds.
+        due (float): Time of the next status check in clock seconds.
+        delay (float): Delay before the next status check in seconds.
+        checks (int): Number of status checks made.
+        redials (int): Number of redials made.
+        in_flight (bool): True while status check is in progress.
+    """
+
+    alert_ids: tp.List[str] = field(default_factory=list)
+    started_at: float = 0.0
+    due: float = 0.0
+    delay: float = 0.0
+    checks: int = 0
+    redials: int = 0
+    in_flight: bool = False
+
+
+class CallStatusTracker:
+    """
+    Scheduler which polls status of dialed calls until they are answered.
+
+    Status of every dialed phone is checked after initial_delay seconds, the
+    delay is doubled after every check up to max_delay. Checks for the same
+    phone are coalesced, so a phone dialed for several alerts is checked once,
+    and at most max_workers checks are in flight. A call finished without answer
+    is redialed up to max_redials times, and if the phone is not answered within
+    escalate_after seconds, escalate is called. Outcomes are saved into
+    call_status table, so tracking is resumed after restart.
+
+    Arguments:
+        check: Function which returns check call response for the phone given, e.g. ZvonokManager.check_call.
+        redial: Function which dials the phone again, called with the first alert id of the phone,
+            the phone and the number of the redial, e.g. DialOutbox.redial.
+        escalate: Function called with the phone and its alert ids when nobody answered.
+        initial_delay: Number of seconds between dial and the first status check.
+        max_delay: Maximal number of seconds between status checks.
+        max_workers: Maximal number of status checks in flight.
+        max_redials: Maximal number of redials of a phone.
+        escalate_after: Number of seconds after the first dial to escalate unanswered phone.
+        clock: Function which returns current time in seconds.
+    """
+
+    def __init__(self, check: tp.Callable[[str], tp.Any], redial: tp.Callable[[str, str, int], tp.Any],
+                 escalate: tp.Callable[[str, tp.List[str]], None], initial_delay: float = 30.0,
+                 max_delay: float = 240.0, max_workers: int = 4, max_redials: int = 1,
+                 escalate_after: float = 600.0, clock: tp.Callable[[], float] = time.time) -> None:
+        """Create stopped tracker."""
+        self.__check = check
+        self.__redial = redial
+        self.__escalate = escalate
+        self.__initial_delay = initial_delay
+        self.__max_delay = max_delay
+        self.__max_workers = max_workers
+        self.__max_redials = max_redials
+        self.__escalate_after = escalate_after
+        self.__clock = clock
+        self.__phones: tp.Dict[str, _TrackedPhone] = {}
+        self.__heap: tp.List[tp.Tuple[float, str]] = []
+        self.__condition = threading.Condition()
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="call-status")
+        self.__stopped = True
+        self.__thread: tp.Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        """Get number of tracked phones."""
+        with self.__condition:
+            return len(self.__phones)
+
+    def __schedule(self, phone: str, tracked: _TrackedPhone, due: float) -> None:
+        """Schedule status check of the phone, stale heap entries are skipped when popped."""
+        tracked.due = due
+        heapq.heappush(self.__heap, (due, phone))
+        self.__condition.notify()
+
+    def __add(self, alert_id: str, phone: str, started_at: float, checks: int = 0, redials: int = 0) -> None:
+        """Start tracking the phone or add the alert to the phone already tracked."""
+        tracked = self.__phones.get(phone)
+        if tracked is not None:
+            if alert_id not in tracked.alert_ids:
+                tracked.alert_ids.append(alert_id)
+            return
+        tracked = _TrackedPhone([alert_id], started_at, delay=self.__initial_delay, checks=checks, redials=redials)
+        self.__phones[phone] = tracked
+        self.__schedule(phone, tracked, max(started_at + self.__initial_delay, self.__clock()))
+
+    def track(self, alert_id: str, phones: tp.Iterable[str]) -> None:
+        """
+        Start tracking status of calls dialed for an alert.
+
+        Arguments:
+            alert_id: Alert id.
+            phones: Dialed phones.
+        """
+        phones = list(phones)
+        db.add_tracked_calls(alert_id, phones, datetime.fromtimestamp(self.__clock()))
+        self.watch(alert_id, phones)
+
+    def watch(self, alert_id: str, phones: tp.Iterable[str]) -> None:
+        """
+        Start polling status of calls already saved as tracked, e.g. by DialOutbox with track_calls.
+
+        Arguments:
+            alert_id: Alert id.
+            phones: Dialed phones.
+        """
+        now = self.__clock()
+        with self.__condition:
+            for phone in phones:
+                self.__add(alert_id, phone, now)
+
+    def __pop_due(self) -> tp.List[str]:
+        """Pop phones which status should be checked now and mark them in flight."""
+        now = self.__clock()
+        phones = []
+        while self.__heap and self.__heap[0][0] <= now:
+            due, phone = heapq.heappop(self.__heap)
+            tracked = self.__phones.get(phone)
+            if tracked is None or tracked.in_flight or tracked.due != due:
+                continue
+            tracked.in_flight = True
+            phones.append(phone)
+        return phones
+
+    def __check_phone(self, phone: str) -> None:
+        """Check status of the phone and decide whether to wait, redial or escalate."""
+        try:
+            answered = parse_call_status(self.__check(phone))
+        except Exception as exc:
+            logger.warning("Failed to check call for phone = %s: %s", phone, exc)
+            answered = None
+        redial = escalate = False
+        with self.__condition:
+            tracked = self.__phones[phone]
+            tracked.in_flight = False
+            tracked.checks += 1
+            now = self.__clock()
+            if answered:
+                state = db.CALL_ANSWERED
+            elif now - tracked.started_at >= self.__escalate_after or (
+                answered is False and tracked.redials >= self.__max_redials
+            ):
+                state = db.CALL_UNANSWERED
+                escalate = True
+            else:
+                state = db.CALL_TRACKING
+                if answered is False:
+                    redial = True
+                    tracked.redials += 1
+                    tracked.delay = self.__initial_delay
+                self.__schedule(phone, tracked, now + tracked.delay)
+                tracked.delay = min(tracked.delay * 2, self.__max_delay)
+            if state != db.CALL_TRACKING:
+                del self.__phones[phone]
+            checks, redials, alert_ids = tracked.checks, tracked.redials, list(tracked.alert_ids)
+        db.update_call_status(phone, state, checks, redials)
+        if redial:
+            logger.info("Call for phone = %s was not answered, redialing", phone)
+            try:
+                self.__redial(alert_ids[0], phone, redials)
+            except Exception as exc:
+                logger.warning("Failed to redial phone = %s: %s", phone, exc)
+        if escalate:
+            logger.warning("Calls for phone = %s were not answered, escalating", phone)
+            try:
+                self.__escalate(phone, alert_ids)
+            except Exception as exc:
+                logger.error("Failed to escalate unanswered phone = %s: %s", phone, exc)
+
+    def __submit_due(self) -> tp.List[Future]:
+        """Submit status checks of due phones to workers."""
+        return [self.__executor.submit(self.__check_phone, phone) for phone in self.__pop_due()]
+
+    def check_due(self) -> int:
+        """
+        Check status of all due phones and wait for the checks to finish.
+
+        Returns:
+            n_checked: Number of checked phones.
+        """
+        with self.__condition:
+            futures = self.__submit_due()
+        wait(futures)
+        return len(futures)
+
+    def __run(self) -> None:
+        """Submit status checks when they are due until stopped."""
+        with self.__condition:
+            while not self.__stopped:
+                self.__submit_due()
+                timeout = max(0.0, self.__heap[0][0] - self.__clock()) if self.__heap else None
+                self.__condition.wait(timeout)
+
+    def start(self) -> None:
+        """Resume tracking saved in database and start polling in a background thread."""
+        if self.__thread is not None:
+            return
+        with self.__condition:
+            for alert_id, phone, started_at, checks, redials in db.get_tracked_calls():
+                self.__add(alert_id, phone, started_at, checks, redials)
+            self.__stopped = False
+        self.__thread = threading.Thread(target=self.__run, name="call-status", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the checks in flight to finish."""
+        if self.__thread is None:
+            return
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+        self.__thread.join()
+        self.__thread = None
+        self.__executor.shutdown(wait=True)
+        self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="call-status")
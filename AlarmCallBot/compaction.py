@@ -0,0 +1,116 @@
+"""Background compaction of calls table."""
+import logging
+import threading
+import time
+import typing as tp
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompactionStats:
+    """
+    Result of one compaction run.
+
+    Attributes:
+        deleted_rows (int): Number of expired calls deleted.
+        merged_rows (int): Number of active calls removed by merging them per user.
+        deleted_dials (int): Number of finished dials deleted from outbox.
+        deleted_statuses (int): Number of finished call statuses deleted.
+        reclaimed_bytes (int): Number of bytes returned to the file system by vacuum.
+        duration (float): Run duration in seconds.
+    """
+
+    deleted_rows: int = 0
+    merged_rows: int = 0
+    deleted_dials: int = 0
+    deleted_statuses: int = 0
+    reclaimed_bytes: int = 0
+    duration: float = 0.0
+
+
+class CompactionJob:
+    """
+    Background job which periodically compacts calls table.
+
+    Every run deletes expired calls, old finished dials and call statuses, and
+    merges active calls of every user in small batches, so handlers writing to
+    the database wait at most for one batch.
+    Every vacuum_every runs free pages are returned to the file system with
+    incremental vacuum.
+
+    Arguments:
+        interval: Number of seconds between runs.
+        batch_size: Maximal number of rows or users processed in one transaction.
+        vacuum_every: Run incremental vacuum every N runs.
+        vacuum_pages: Maximal number of pages freed by one vacuum.
+        retention: Number of seconds finished dials and call statuses are kept.
+    """
+
+    def __init__(self, interval: float = 3600.0, batch_size: int = 500, vacuum_every: int = 24,
+                 vacuum_pages: int = 1000, retention: float = 86400.0) -> None:
+        """Create stopped job."""
+        self.__interval = interval
+        self.__batch_size = batch_size
+        self.__vacuum_every = vacuum_every
+        self.__vacuum_pages = vacuum_pages
+        self.__retention = retention
+        self.__n_runs = 0
+        self.__stop_event = threading.Event()
+        self.__thread: tp.Optional[threading.Thread] = None
+
+    def run_once(self) -> CompactionStats:
+        """
+        Compact calls table once.
+
+        Returns:
+            stats: Compaction results.
+        """
+        start = time.monotonic()
+        now = datetime.now()
+        stats = CompactionStats()
+        stats.deleted_rows = db.delete_expired_calls(now, self.__batch_size)
+        stats.merged_rows = db.merge_active_calls(now, self.__batch_size)
+        stats.deleted_dials = db.delete_finished_dials(now - timedelta(seconds=self.__retention), self.__batch_size)
+        stats.deleted_statuses = db.delete_finished_call_statuses(
+            now - timedelta(seconds=self.__retention), self.__batch_size
+        )
+        self.__n_runs += 1
+        if self.__n_runs % self.__vacuum_every == 0:
+            stats.reclaimed_bytes = db.incremental_vacuum(self.__vacuum_pages)
+        stats.duration = time.monotonic() - start
+        logger.info(
+            "Calls compaction finished in %.2fs: deleted %s rows, merged %s rows, "
+            "deleted %s dials and %s call statuses, reclaimed %s bytes",
+            stats.duration, stats.deleted_rows, stats.merged_rows,
+            stats.deleted_dials, stats.deleted_statuses, stats.reclaimed_bytes
+        )
+        return stats
+
+    def __run(self) -> None:
+        """Run compaction until stopped."""
+        while not self.__stop_event.wait(self.__interval):
+            try:
+                self.run_once()
+            except Exception as exc:
+                logger.error("Calls compaction failed: %s", exc)
+
+    def start(self) -> None:
+        """Start job in a daemon thread."""
+        if self.__thread is not None:
+            return
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name="calls-compaction", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop job and wait for the current run to finish."""
+        if self.__thread is None:
+            return
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__thread = None
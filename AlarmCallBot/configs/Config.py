@@ -13,17 +13,114 @@ class BaseConfig:
         ZVONOK_API_URI (str): URI of call request server.
         ZVONOK_API_TOKEN (str): Zvonok API public key.
         ZVONOK_CAMPAIGN_ID (str): Zvonok campaign ID.
+        ZVONOK_CAMPAIGN_IDS (list): Zvonok campaign IDs calls of a wave are spread across,
+            empty to dial in ZVONOK_CAMPAIGN_ID only.
+        ZVONOK_SHARDING (str): Strategy choosing campaign of a call, 'hash' of the phone or 'least_loaded'.
+        ZVONOK_TIMEOUT (float): Timeout of one Zvonok API request attempt in seconds.
+        ZVONOK_RATE (float): Initial number of Zvonok API requests per second.
+        ZVONOK_MAX_RATE (float): Maximal number of Zvonok API requests per second.
+        ZVONOK_FAILURE_THRESHOLD (int): Number of consecutive failed Zvonok API requests which open the circuit.
+        ZVONOK_RESET_TIMEOUT (float): Number of seconds Zvonok API circuit stays open before probing.
+        DIAL_CONCURRENCY (int): Maximal number of calls created concurrently during an alert.
+        OUTBOX_MAX_ATTEMPTS (int): Maximal number of attempts to dial a phone for one alert.
+        OUTBOX_RETRY_INTERVAL (float): Number of seconds between retries of failed dials.
+        OUTBOX_MAX_AGE (float): Number of seconds after an alert its failed or deferred dials are not retried.
+        STATUS_CHECK_DELAY (float): Number of seconds between dial and the first call status check.
+        STATUS_CHECK_MAX_DELAY (float): Maximal number of seconds between call status checks.
+        STATUS_CHECK_WORKERS (int): Maximal number of call status checks in flight.
+        STATUS_MAX_REDIALS (int): Maximal number of redials of a phone which did not answer.
+        STATUS_ESCALATE_AFTER (float): Number of seconds after dial to escalate unanswered phone.
+        HISTORY_RETENTION (float): Number of seconds finished dials and call statuses are kept.
         CHANNELS_WITH_ALERTS (set): IDs of Telegram channels, where new posts will raise alerts.
+        ALERT_COALESCE_WINDOW (float): Number of seconds a dialed phone is not dialed again for new alerts,
+            0 disables coalescing.
         LOG_FILE_NAME (str): Log filename.
+        LOG_QUEUE_SIZE (int): Maximal number of log records waiting to be written, new records are dropped when full.
+        LOG_MAX_PHONES (int): Maximal number of phones shown in one log record.
+        DB_STORAGE (str): Storage engine, 'sqlite' or 'memory', which keeps nothing after the bot stops.
+        DB_PATH (str): Database file path of the sqlite storage engine.
+        PHONE_CACHE_SIZE (int): Maximal number of users which phones are cached, 0 to disable the cache.
+        PHONE_CACHE_TTL (float): Number of seconds a user phone is cached.
+        PHONE_CACHE_NEGATIVE_TTL (float): Number of seconds absence of a user phone is cached.
+        DB_WRITE_BEHIND (bool): If True, calls and phones are written to database in batches by a background thread.
+        DB_WRITE_BATCH_SIZE (int): Maximal number of records written in one transaction in write-behind mode.
+        DB_WRITE_FLUSH_INTERVAL (float): Maximal number of seconds a record waits to be written in write-behind mode.
+        TELEGRAM_RATE (float): Maximal number of Telegram messages sent per second.
+        TELEGRAM_CHAT_INTERVAL (float): Minimal number of seconds between Telegram messages to one chat.
+        TELEGRAM_SEND_WORKERS (int): Number of Telegram messages sent concurrently.
+        TELEGRAM_SEND_ATTEMPTS (int): Number of attempts to send a Telegram message, throttling is not counted.
+        ALERT_BROADCAST (bool): If True, alert text is sent to users on duty by Telegram messages along with calls.
+        TELEGRAM_PAID_BROADCAST (bool): If True, alert messages are sent as paid broadcast, which Telegram
+            allows above the free rate limit, with their own rate and workers.
+        TELEGRAM_BROADCAST_RATE (float): Maximal number of paid broadcast messages sent per second.
+        TELEGRAM_BROADCAST_WORKERS (int): Number of paid broadcast messages sent concurrently.
+        DUTY_REMINDERS (bool): If True, users are told when their duty is about to end and when it has ended.
+        DUTY_REMINDER_BEFORE (float): Number of seconds before the end of duty to send the reminder.
+        TIMER_TICK (float): Resolution of duty reminder timers in seconds.
+        UPDATE_WORKERS (int): Number of lanes processing updates of different users in parallel.
+        UPDATE_QUEUE_SIZE (int): Maximal number of updates waiting in one lane.
+        WEBHOOK_QUEUE_SIZE (int): Maximal number of updates received by webhook waiting to be processed.
+        COMPACTION_INTERVAL (float): Number of seconds between calls table compactions.
+        COMPACTION_BATCH_SIZE (int): Maximal number of rows compacted in one transaction.
+        COMPACTION_VACUUM_EVERY (int): Run incremental vacuum every N compactions.
+        METRICS_HOST (str): Host for metrics server to listen on.
+        METRICS_PORT (int | None): Port for metrics server to listen on, None disables metrics server.
 
     """
 
     ZVONOK_API_URI: str
     ZVONOK_API_TOKEN: tp.Optional[str] = os.getenv("ZVONOK_API_TOKEN")
     ZVONOK_CAMPAIGN_ID: str = "270119321"
-
+    ZVONOK_CAMPAIGN_IDS: tp.List[str] = field(default_factory=list)
+    ZVONOK_SHARDING: str = "hash"
+    ZVONOK_TIMEOUT: float = 10.0
+    ZVONOK_RATE: float = 20.0
+    ZVONOK_MAX_RATE: float = 100.0
+    ZVONOK_FAILURE_THRESHOLD: int = 5
+    ZVONOK_RESET_TIMEOUT: float = 30.0
+    DIAL_CONCURRENCY: int = 32
+
+    OUTBOX_MAX_ATTEMPTS: int = 3
+    OUTBOX_RETRY_INTERVAL: float = 5.0
+    OUTBOX_MAX_AGE: float = 900.0
+    STATUS_CHECK_DELAY: float = 30.0
+    STATUS_CHECK_MAX_DELAY: float = 240.0
+    STATUS_CHECK_WORKERS: int = 4
+    STATUS_MAX_REDIALS: int = 1
+    STATUS_ESCALATE_AFTER: float = 600.0
+    HISTORY_RETENTION: float = 86400.0
     CHANNELS_WITH_ALERTS: set = field(default_factory=lambda: {-1002194118218})
+    ALERT_COALESCE_WINDOW: float = 60.0
     LOG_FILE_NAME: str = "alarm_call_bot.log"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_MAX_PHONES: int = 10
+    DB_STORAGE: str = "sqlite"
+    DB_PATH: str = "calls.db"
+    PHONE_CACHE_SIZE: int = 10000
+    PHONE_CACHE_TTL: float = 300.0
+    PHONE_CACHE_NEGATIVE_TTL: float = 30.0
+    DB_WRITE_BEHIND: bool = False
+    DB_WRITE_BATCH_SIZE: int = 100
+    DB_WRITE_FLUSH_INTERVAL: float = 0.05
+    TELEGRAM_RATE: float = 30.0
+    TELEGRAM_CHAT_INTERVAL: float = 1.0
+    TELEGRAM_SEND_WORKERS: int = 8
+    TELEGRAM_SEND_ATTEMPTS: int = 3
+    ALERT_BROADCAST: bool = True
+    TELEGRAM_PAID_BROADCAST: bool = False
+    TELEGRAM_BROADCAST_RATE: float = 1000.0
+    TELEGRAM_BROADCAST_WORKERS: int = 32
+    DUTY_REMINDERS: bool = True
+    DUTY_REMINDER_BEFORE: float = 600.0
+    TIMER_TICK: float = 1.0
+    UPDATE_WORKERS: int = 8
+    UPDATE_QUEUE_SIZE: int = 1000
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    COMPACTION_INTERVAL: float = 3600.0
+    COMPACTION_BATCH_SIZE: int = 500
+    COMPACTION_VACUUM_EVERY: int = 24
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: tp.Optional[int] = 9464
 
 
 @dataclass
@@ -1,56 +1,212 @@
 """Database managing module."""
 import sqlite3
 import datetime
-import argparse
+import contextlib
+import threading
 import typing as tp
 
-__connection = None
+from . import metrics
+from .cache import TTLCache
+from .duty_index import ActiveDutyIndex
+from .storage.Base import (  # noqa: F401
+    CALL_ANSWERED, CALL_TRACKING, CALL_UNANSWERED, DIAL_DONE, DIAL_FAILED, DIAL_IN_FLIGHT, DIAL_PENDING, Storage
+)
+from .storage.SQLite import BUSY_TIMEOUT, SCHEMA_VERSION, SQLiteStorage, get_schema_version, migrate  # noqa: F401
+from .write_behind import Record, WriteBehindQueue
+
+DB_PATH = "calls.db"
+
+__storage: tp.Optional[Storage] = None
+__storage_is_default = True
+__storage_lock = threading.Lock()
+__active_index = ActiveDutyIndex()
+__write_queue: tp.Optional[WriteBehindQueue] = None
+__pending_phones_lock = threading.Lock()
+__pending_phones: tp.Dict[int, str] = {}
+__phone_cache: TTLCache[int, str] = TTLCache("phone")
+
+QUERY_SECONDS = metrics.Histogram(
+    "alarm_bot_duty_query_seconds", "Time of phones to call lookup in seconds.", ("source",)
+)
+
+
+def get_storage() -> Storage:
+    """Get storage engine, sqlite3 database DB_PATH unless set_storage() set another one."""
+    global __storage
+    storage = __storage
+    if storage is None:
+        with __storage_lock:
+            if __storage is None:
+                __storage = SQLiteStorage(DB_PATH)
+            storage = __storage
+    return storage
+
+
+def set_storage(storage: tp.Optional[Storage]) -> None:
+    """
+    Replace storage engine, the previous one is closed.
+
+    Call init_db() afterwards to create tables and load the active duty index.
+
+    Arguments:
+        storage: New storage engine, None for sqlite3 database DB_PATH.
+    """
+    global __storage, __storage_is_default
+    with __storage_lock:
+        if __storage is not None:
+            __storage.close()
+        __storage = storage
+        __storage_is_default = storage is None
+    __phone_cache.clear()
+
+
+def _sqlite() -> SQLiteStorage:
+    """Get storage engine, which must be sqlite3 one."""
+    storage = get_storage()
+    if not isinstance(storage, SQLiteStorage):
+        raise TypeError(f"Storage {storage.NAME!r} has no sqlite3 connections")
+    return storage
 
 
 def get_connection() -> sqlite3.Connection:
-    """Get connection to sqlite3 database 'calls.db'."""
-    global __connection
-    if __connection is None:
-        __connection = sqlite3.connect("calls.db", check_same_thread=False)
-    return __connection
+    """Get connection of the current thread to sqlite3 database DB_PATH, 'calls.db' by default."""
+    return _sqlite().get_connection()
+
+
+def close_connection() -> None:
+    """Close connections of all threads and drop cached phones, the next get_connection() calls open new ones."""
+    global __storage
+    with __storage_lock:
+        if __storage is not None:
+            __storage.close()
+            if __storage_is_default:
+                # reopened at DB_PATH, which may have changed
+                __storage = None
+    __phone_cache.clear()
+
+
+@contextlib.contextmanager
+def transaction() -> tp.Iterator[sqlite3.Cursor]:
+    """
+    Run statements in one write transaction of the current thread connection.
+
+    The transaction takes the write lock at start, commits on exit and rolls back on exception.
+    Transactions can not be nested.
+
+    Yields:
+        cursor: Cursor to execute statements with.
+    """
+    with _sqlite().transaction() as c:
+        yield c
+
+
+def _to_epoch(date: datetime.datetime) -> int:
+    """Convert datetime into integer epoch seconds, naive datetime is treated as local time."""
+    return int(date.timestamp())
+
+
+def _now() -> int:
+    """Get current time in epoch seconds."""
+    return _to_epoch(datetime.datetime.now())
 
 
 def init_db(force: bool = False) -> None:
     """
-    Initiate sqlite3 database 'calls.db'.
+    Initiate storage, sqlite3 database 'calls.db' by default, and migrate it to the latest schema.
 
-    Database consists of two tables:
+    Database consists of four tables:
         calls (user_id, date_created, date_expired),
-        phones (user_id, phone).
+        phones (user_id, phone),
+        dial_outbox (alert_id, phone, state, attempts, last_error, updated_at),
+        call_status (alert_id, phone, state, checks, redials, started_at, updated_at).
+    Call dates are stored as integer epoch seconds.
 
     Arguments:
         force: It True, drops tables before creating, it they exist. Default: False.
     """
-    conn = get_connection()
-    c = conn.cursor()
+    get_storage().init(force)
     if force:
-        c.execute("DROP TABLE IF EXISTS calls")
-        c.execute("DROP TABLE IF EXISTS phones")
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS calls (
-              id INTEGER PRIMARY KEY,
-              user_id INTEGER NOT NULL,
-              date_created TIMESTAMP,
-              date_expired TIMESTAMP
-        )
+        __phone_cache.clear()
+    rebuild_active_index()
+
+
+def rebuild_active_index() -> None:
+    """Load non-expired calls and all phones from database into the in-memory active duty index."""
+    storage = get_storage()
+    __active_index.rebuild(storage.get_duty_ends(_now()), storage.get_phones())
+
+
+def get_duty_ends(time: datetime.datetime) -> tp.List[tp.Tuple[int, int]]:
     """
-    )
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS phones (
-              id INTEGER PRIMARY KEY,
-              user_id INTEGER NOT NULL,
-              phone TEXT
-        )
+    Get the latest expiry of every user with non-expired calls.
+
+    Arguments:
+        time: Current datetime.
+
+    Returns:
+        duty_ends: Pairs (user_id, date_expired), date_expired is epoch seconds.
     """
+    return get_storage().get_duty_ends(_to_epoch(time))
+
+
+def _write_records(records: tp.List[Record]) -> None:
+    """
+    Write batch of queued calls and phones in one transaction.
+
+    Arguments:
+        records: Pairs ("call", (user_id, date_created, date_expired)) or ("phone", (user_id, phone)).
+    """
+    get_storage().write(
+        [values for kind, values in records if kind == "call"],
+        [values for kind, values in records if kind == "phone"],
     )
-    conn.commit()
+    with __pending_phones_lock:
+        for kind, values in records:
+            if kind == "phone" and __pending_phones.get(values[0]) == values[1]:
+                del __pending_phones[values[0]]
+
+
+def enable_write_behind(batch_size: int = 100, flush_interval: float = 0.05) -> None:
+    """
+    Make add_call and add_phone queue records and return immediately.
+
+    Queued records are written by a single writer thread, one transaction per batch.
+    Phones are visible to get_phone and calls and phones to get_active_phones right away.
+
+    Arguments:
+        batch_size: Maximal number of records in one transaction.
+        flush_interval: Maximal number of seconds a record waits in the queue.
+    """
+    global __write_queue
+    if __write_queue is not None:
+        return
+    __write_queue = WriteBehindQueue(_write_records, batch_size=batch_size, flush_interval=flush_interval)
+    __write_queue.start()
+
+
+def disable_write_behind() -> None:
+    """Write all queued records and make add_call and add_phone write synchronously again."""
+    global __write_queue
+    if __write_queue is None:
+        return
+    __write_queue.stop()
+    __write_queue = None
+
+
+def is_write_behind_enabled() -> bool:
+    """Check whether add_call and add_phone queue records."""
+    return __write_queue is not None
+
+
+def get_write_queue_depth() -> int:
+    """Get number of records waiting to be written in write-behind mode, 0 if it is disabled."""
+    return __write_queue.depth if __write_queue is not None else 0
+
+
+def flush_writes() -> None:
+    """Wait until all queued records are written."""
+    if __write_queue is not None:
+        __write_queue.flush()
 
 
 def add_call(user_id: int, date_created: datetime.datetime, date_expired: datetime.datetime) -> None:
@@ -62,46 +218,78 @@ def add_call(user_id: int, date_created: datetime.datetime, date_expired: dateti
         date_created: Call creating time.
         date_expired: Call expiring time.
     """
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO calls (user_id, date_created, date_expired) VALUES (?, ?, ?)",
-        (user_id, date_created, date_expired),
-    )
-    conn.commit()
+    values = (user_id, _to_epoch(date_created), _to_epoch(date_expired))
+    if __write_queue is not None:
+        __write_queue.put(("call", values))
+    else:
+        get_storage().write([values], [])
+    __active_index.add_call(user_id, values[2])
 
 
 def add_phone(user_id: int, phone: str) -> None:
     """
-    Add user phone into table 'phones'.
+    Add user phone into table 'phones', replace saved phone if there is one.
 
     Arguments:
         user_id: Bot user id in Telegram.
         phone: Bot user phone in Telegram.
     """
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("INSERT INTO phones (user_id, phone) VALUES (?, ?)", (user_id, phone))
-    conn.commit()
+    if __write_queue is not None:
+        with __pending_phones_lock:
+            __pending_phones[user_id] = phone
+        __write_queue.put(("phone", (user_id, phone)))
+    else:
+        get_storage().write([], [(user_id, phone)])
+    __phone_cache.invalidate(user_id)
+    __active_index.add_phone(user_id, phone)
+
+
+def configure_phone_cache(max_size: int = 10000, ttl: float = 300.0, negative_ttl: float = 30.0) -> None:
+    """
+    Set limits of the get_phone cache and drop cached phones.
+
+    Arguments:
+        max_size: Maximal number of cached users, 0 to disable the cache.
+        ttl: Number of seconds a phone is cached.
+        negative_ttl: Number of seconds absence of a phone is cached.
+    """
+    __phone_cache.configure(max_size, ttl, negative_ttl)
 
 
 def get_phone(user_id: int) -> tp.Optional[str]:
     """
     Get user phone by his Telegram id.
 
+    Phones are read through an LRU cache, which add_phone invalidates.
+
     Arguments:
         user_id: Bot user id in Telegram.
 
     Returns:
         phone: User phone in Telegram.
     """
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT phone FROM phones WHERE user_id=?", (user_id,))
-    res = c.fetchall()
-    if len(res) == 0:
-        return None
-    return res[0][0]
+    with __pending_phones_lock:
+        if user_id in __pending_phones:
+            return __pending_phones[user_id]
+    return __phone_cache.get_or_load(user_id, _select_phone)
+
+
+def _select_phone(user_id: int) -> tp.Optional[str]:
+    """Read user phone from table 'phones'."""
+    return get_storage().get_phone(user_id)
+
+
+def get_user_id(phone: str) -> tp.Optional[int]:
+    """
+    Get id of user who saved the phone given.
+
+    Arguments:
+        phone: Phone number.
+
+    Returns:
+        user_id: Telegram user id or None if the phone is not saved.
+    """
+    return get_storage().get_user_id(phone)
 
 
 def get_phones_to_call(time: datetime.datetime) -> tp.List[str]:
@@ -114,21 +302,269 @@ def get_phones_to_call(time: datetime.datetime) -> tp.List[str]:
     Returns:
         phones: List of phones.
     """
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT DISTINCT phone
-        FROM phones as a
-        JOIN (SELECT * FROM calls WHERE date_expired>?) as b
-        ON a.user_id = b.user_id
-        """,
-        (time,),
-    )
-    return [phone for (phone,) in c.fetchall()]
+    with QUERY_SECONDS.labels("sql").time():
+        return get_storage().get_phones_to_call(_to_epoch(time))
+
+
+def get_active_phones(time: datetime.datetime) -> tp.List[str]:
+    """
+    Get phones from all non-expired calls using the in-memory active duty index.
+
+    Same as get_phones_to_call, but without disk I/O. The index is filled by
+    init_db and kept up to date by add_call and add_phone.
+
+    Arguments:
+        time: Current datetime.
+
+    Returns:
+        phones: List of phones.
+    """
+    with QUERY_SECONDS.labels("index").time():
+        return __active_index.get_phones_to_call(_to_epoch(time))
+
+
+def get_active_users(time: datetime.datetime) -> tp.List[tp.Tuple[int, str]]:
+    """
+    Get users from all non-expired calls and their phones using the in-memory active duty index.
+
+    Arguments:
+        time: Current datetime.
+
+    Returns:
+        users: List of pairs (user_id, phone).
+    """
+    with QUERY_SECONDS.labels("index").time():
+        return __active_index.get_users_to_call(_to_epoch(time))
+
+
+def check_active_index(time: datetime.datetime) -> bool:
+    """
+    Check that the in-memory active duty index agrees with database.
+
+    Arguments:
+        time: Current datetime.
+
+    Returns:
+        consistent: True if both return the same phones to call.
+    """
+    return sorted(get_active_phones(time)) == sorted(get_phones_to_call(time))
+
+
+def delete_expired_calls(time: datetime.datetime, batch_size: int = 500) -> int:
+    """
+    Delete calls expired by the time given, each batch in its own short transaction.
+
+    Arguments:
+        time: Current datetime.
+        batch_size: Maximal number of rows deleted in one transaction.
+
+    Returns:
+        n_deleted: Number of deleted rows.
+    """
+    return get_storage().delete_expired_calls(_to_epoch(time), batch_size)
+
+
+def delete_expired_user_calls(user_id: int, time: datetime.datetime) -> int:
+    """
+    Delete calls of one user expired by the time given.
+
+    Arguments:
+        user_id: Bot user id in Telegram.
+        time: Current datetime.
+
+    Returns:
+        n_deleted: Number of deleted rows.
+    """
+    return get_storage().delete_expired_user_calls(user_id, _to_epoch(time))
+
+
+def merge_active_calls(time: datetime.datetime, batch_size: int = 500) -> int:
+    """
+    Merge non-expired calls of every user into one call from the earliest creation to the latest expiry.
+
+    Calls added while merging are left as is.
+
+    Arguments:
+        time: Current datetime.
+        batch_size: Maximal number of users merged in one transaction.
+
+    Returns:
+        n_merged: Number of rows removed by merging.
+    """
+    return get_storage().merge_active_calls(_to_epoch(time), batch_size)
+
+
+def incremental_vacuum(max_pages: int = 1000) -> int:
+    """
+    Return free database pages to the file system.
+
+    Arguments:
+        max_pages: Maximal number of pages to free.
+
+    Returns:
+        n_bytes: Number of bytes reclaimed.
+    """
+    return get_storage().incremental_vacuum(max_pages)
+
+
+def add_dials(alert_id: str, phones: tp.Iterable[str]) -> tp.List[tp.Tuple[int, str]]:
+    """
+    Add phones of an alert into dial outbox as in flight, phones already added for the alert are skipped.
+
+    Arguments:
+        alert_id: Alert id, the same for redelivered alert.
+        phones: Phones to call.
+
+    Returns:
+        dials: Pairs (dial_id, phone) of added dials.
+    """
+    return get_storage().add_dials(alert_id, phones, _now())
+
+
+def count_pending_dials() -> int:
+    """Get number of dials waiting to be retried."""
+    return get_storage().count_dials(DIAL_PENDING)
+
+
+def claim_pending_dials(limit: int = 1000) -> tp.List[tp.Tuple[int, str, str]]:
+    """
+    Mark pending dials as in flight.
+
+    Arguments:
+        limit: Maximal number of dials to claim.
+
+    Returns:
+        dials: Triples (dial_id, alert_id, phone) of claimed dials.
+    """
+    return get_storage().claim_pending_dials(limit, _now())
+
+
+def expire_pending_dials(max_age: float) -> int:
+    """
+    Mark pending dials added more than max_age seconds ago as failed, so they are never dialed.
+
+    Arguments:
+        max_age: Maximal age of a dial in seconds.
+
+    Returns:
+        n_dials: Number of expired dials.
+    """
+    now = _now()
+    return get_storage().expire_pending_dials(now - int(max_age), now)
+
+
+def reset_in_flight_dials() -> int:
+    """
+    Make dials left in flight by a stopped process pending again.
+
+    Returns:
+        n_dials: Number of reset dials.
+    """
+    return get_storage().reset_in_flight_dials()
+
+
+def finish_dial(dial_id: int, error: tp.Optional[str] = None, max_attempts: int = 3,
+                tracked_alert_id: tp.Optional[str] = None, campaign: tp.Optional[str] = None) -> None:
+    """
+    Save dial result.
+
+    Arguments:
+        dial_id: Dial id in outbox.
+        error: Error description, None if the call was created.
+        max_attempts: Number of failed attempts after which the dial is not retried.
+        tracked_alert_id: If given and the call was created, tracking of its status for the alert
+            is started in the same transaction.
+        campaign: If given and the call was created, Zvonok campaign saved for tracked calls of the phone.
+    """
+    get_storage().finish_dial(dial_id, error, max_attempts, _now(), tracked_alert_id, campaign)
+
+
+def defer_dial(dial_id: int) -> None:
+    """
+    Make dial pending again without counting an attempt.
+
+    Arguments:
+        dial_id: Dial id in outbox.
+    """
+    get_storage().defer_dial(dial_id, _now())
+
+
+def delete_finished_dials(time: datetime.datetime, batch_size: int = 500) -> int:
+    """
+    Delete done and failed dials updated before the time given.
+
+    Arguments:
+        time: Datetime to delete dials before.
+        batch_size: Maximal number of rows deleted in one transaction.
+
+    Returns:
+        n_deleted: Number of deleted rows.
+    """
+    return get_storage().delete_finished_dials(_to_epoch(time), batch_size)
+
+
+def add_tracked_calls(alert_id: str, phones: tp.Iterable[str], started_at: datetime.datetime) -> None:
+    """
+    Start tracking status of calls dialed for an alert, phones already tracked for the alert are skipped.
+
+    Arguments:
+        alert_id: Alert id.
+        phones: Dialed phones.
+        started_at: Datetime the calls were dialed.
+    """
+    get_storage().add_tracked_calls(alert_id, phones, _to_epoch(started_at))
+
+
+def get_tracked_calls() -> tp.List[tp.Tuple[str, str, int, int, int]]:
+    """
+    Get calls which status is not known yet.
+
+    Returns:
+        calls: Tuples (alert_id, phone, started_at, checks, redials), started_at is epoch seconds.
+    """
+    return get_storage().get_tracked_calls()
+
+
+def get_tracked_campaigns() -> tp.List[tp.Tuple[str, str]]:
+    """
+    Get Zvonok campaigns of calls which status is not known yet.
+
+    Returns:
+        campaigns: Pairs (phone, campaign), the latest dial of a phone comes last.
+    """
+    return get_storage().get_tracked_campaigns()
+
+
+def update_call_status(phone: str, state: str, checks: int, redials: int) -> None:
+    """
+    Save status of tracked calls of the phone given for all alerts.
+
+    Arguments:
+        phone: Dialed phone.
+        state: One of CALL_TRACKING, CALL_ANSWERED and CALL_UNANSWERED.
+        checks: Number of status checks made.
+        redials: Number of redials made.
+    """
+    get_storage().update_call_status(phone, state, checks, redials, _now())
+
+
+def delete_finished_call_statuses(time: datetime.datetime, batch_size: int = 500) -> int:
+    """
+    Delete answered and unanswered calls updated before the time given.
+
+    Arguments:
+        time: Datetime to delete calls before.
+        batch_size: Maximal number of rows deleted in one transaction.
+
+    Returns:
+        n_deleted: Number of deleted rows.
+    """
+    return get_storage().delete_finished_call_statuses(_to_epoch(time), batch_size)
 
 
 if __name__ == "__main__":
+    import argparse
+
     parser = argparse.ArgumentParser()
     parser.add_argument("--force-create", action="store_true", help="Force recreate db")
     parser.parse_args()
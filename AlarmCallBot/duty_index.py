@@ -0,0 +1,106 @@
+"""In-memory index of users on duty."""
+import heapq
+import threading
+import typing as tp
+
+
+class ActiveDutyIndex:
+    """
+    In-memory index of users on duty.
+
+    Keeps the latest expiry time of every user with non-expired call in a dict and
+    the same expiries in a min-heap, so expired users are dropped lazily in
+    O(log n) each, and phones to call are read in O(active users) without disk I/O.
+    All times are integer epoch seconds.
+    """
+
+    def __init__(self) -> None:
+        """Create empty index."""
+        self.__lock = threading.Lock()
+        self.__expiries: tp.Dict[int, int] = {}
+        self.__heap: tp.List[tp.Tuple[int, int]] = []
+        self.__phones: tp.Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        """Get number of users which were on duty at the last lookup."""
+        return len(self.__expiries)
+
+    def __add_call(self, user_id: int, date_expired: int) -> None:
+        """Add call without locking."""
+        if date_expired > self.__expiries.get(user_id, date_expired - 1):
+            self.__expiries[user_id] = date_expired
+            heapq.heappush(self.__heap, (date_expired, user_id))
+
+    def add_call(self, user_id: int, date_expired: int) -> None:
+        """
+        Add user call.
+
+        Arguments:
+            user_id: Bot user id in Telegram.
+            date_expired: Call expiring time.
+        """
+        with self.__lock:
+            self.__add_call(user_id, date_expired)
+
+    def add_phone(self, user_id: int, phone: str) -> None:
+        """
+        Add or replace user phone.
+
+        Arguments:
+            user_id: Bot user id in Telegram.
+            phone: Bot user phone in Telegram.
+        """
+        with self.__lock:
+            self.__phones[user_id] = phone
+
+    def rebuild(self, calls: tp.Iterable[tp.Tuple[int, int]], phones: tp.Iterable[tp.Tuple[int, str]]) -> None:
+        """
+        Replace index content.
+
+        Arguments:
+            calls: Pairs (user_id, date_expired) of calls.
+            phones: Pairs (user_id, phone) of all saved phones.
+        """
+        with self.__lock:
+            self.__expiries = {}
+            self.__heap = []
+            for user_id, date_expired in calls:
+                self.__add_call(user_id, date_expired)
+            self.__phones = dict(phones)
+
+    def __evict(self, time: int) -> None:
+        """Drop users whose calls expired by the time given."""
+        while self.__heap and self.__heap[0][0] <= time:
+            date_expired, user_id = heapq.heappop(self.__heap)
+            if self.__expiries.get(user_id) == date_expired:
+                del self.__expiries[user_id]
+
+    def get_phones_to_call(self, time: int) -> tp.List[str]:
+        """
+        Get phones from all non-expired calls.
+
+        Arguments:
+            time: Current time.
+
+        Returns:
+            phones: List of distinct phones.
+        """
+        with self.__lock:
+            self.__evict(time)
+            phones = (self.__phones.get(user_id) for user_id in self.__expiries)
+            return list(dict.fromkeys(phone for phone in phones if phone is not None))
+
+    def get_users_to_call(self, time: int) -> tp.List[tp.Tuple[int, str]]:
+        """
+        Get users with non-expired calls and their phones.
+
+        Arguments:
+            time: Current time.
+
+        Returns:
+            users: List of pairs (user_id, phone) of users with saved phone.
+        """
+        with self.__lock:
+            self.__evict(time)
+            users = ((user_id, self.__phones.get(user_id)) for user_id in self.__expiries)
+            return [(user_id, phone) for user_id, phone in users if phone is not None]
@@ -0,0 +1,104 @@
+"""Non-blocking logging setup."""
+import logging
+import os
+import queue
+import typing as tp
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from . import metrics
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(threadName)s %(name)s: %(message)s"
+
+DROPPED_RECORDS = metrics.Counter(
+    "alarm_bot_log_records_dropped_total", "Number of log records dropped because the log queue was full."
+)
+
+
+class CappedList:
+    """
+    List of items which is formatted lazily and shows at most limit items.
+
+    Pass it as a %-style logging argument, so it is formatted only if the record is emitted.
+
+    Arguments:
+        items: Items to show.
+        limit: Maximal number of items shown, the number of the rest is appended.
+    """
+
+    def __init__(self, items: tp.Sequence[tp.Any], limit: int = 10) -> None:
+        """Save items."""
+        self.__items = items
+        self.__limit = limit
+
+    def __str__(self) -> str:
+        """Join items with commas."""
+        shown = ",".join(str(item) for item in self.__items[:self.__limit])
+        if len(self.__items) > self.__limit:
+            return f"{shown},... ({len(self.__items) - self.__limit} more)"
+        return shown
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Queue handler which drops records when the queue is full instead of blocking."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put record into queue, count it as dropped if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc()
+
+
+def setup_queue_logging(handlers: tp.Sequence[logging.Handler], level: int = logging.INFO,
+                        queue_size: int = 10000) -> QueueListener:
+    """
+    Make root logger put records into a queue, which is passed to handlers by a background thread.
+
+    Records are formatted in the logging thread, handlers I/O happens in the
+    listener thread, so the logging thread does not wait for the disk.
+
+    Arguments:
+        handlers: Handlers to pass records to, the root logger handlers are replaced.
+        level: Minimal level of logged records.
+        queue_size: Maximal number of records waiting to be handled, new records are dropped when it is full.
+
+    Returns:
+        listener: Started listener, stop it to handle the records left before exit.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def setup_logging(log_dir: str, file_name: str, debug: bool = False, level: int = logging.INFO,
+                  queue_size: int = 10000) -> QueueListener:
+    """
+    Set up non-blocking logging into daily rotated file.
+
+    Arguments:
+        log_dir: Directory of log files.
+        file_name: Log file name.
+        debug: If True, records are written to stderr too.
+        level: Minimal level of logged records.
+        queue_size: Maximal number of records waiting to be written, new records are dropped when it is full.
+
+    Returns:
+        listener: Started listener, stop it to write the records left before exit.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: tp.List[logging.Handler] = [
+        TimedRotatingFileHandler(os.path.join(log_dir, file_name), when="midnight", backupCount=30)
+    ]
+    if debug:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return setup_queue_logging(handlers, level, queue_size)
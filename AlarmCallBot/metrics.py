@@ -0,0 +1,353 @@
+"""Metrics collection and Prometheus text exposition."""
+import bisect
+import contextlib
+import logging
+import math
+import threading
+import time
+import typing as tp
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    """Escape label value for text exposition."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: tp.Sequence[str], values: tp.Sequence[str]) -> str:
+    """Format label pairs, empty string if there are no labels."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format sample value."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Registry:
+    """Collection of metrics rendered together, a metric registered again under the same name replaces the old one."""
+
+    def __init__(self) -> None:
+        """Create empty registry."""
+        self.__metrics: tp.Dict[str, "_Metric"] = {}
+        self.__lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        """
+        Add metric.
+
+        Arguments:
+            metric: Metric to add.
+        """
+        with self.__lock:
+            self.__metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format."""
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """
+    Base class of metrics with labels.
+
+    Children, one per label values, are created on first use and cached, so
+    callers on hot paths can keep the child returned by labels().
+
+    Arguments:
+        name: Metric name.
+        documentation: Metric help text.
+        labelnames: Label names.
+        registry: Registry to add the metric to, None to keep it unregistered. Default: REGISTRY.
+    """
+
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tp.Sequence[str] = (),
+                 registry: tp.Optional[Registry] = REGISTRY) -> None:
+        """Create metric and register it."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: tp.Dict[tp.Tuple[str, ...], tp.Any] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self) -> tp.Any:
+        """Create child for new label values."""
+        raise NotImplementedError
+
+    def labels(self, *values: tp.Any) -> tp.Any:
+        """
+        Get child for label values given.
+
+        Arguments:
+            values: Label values in the order of label names.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> tp.Iterator[tp.Tuple[str, str, float]]:
+        """Get samples as triples (name suffix, labels, value)."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render metric in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self._samples())
+        return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    """Counter value for one label set."""
+
+    def __init__(self) -> None:
+        """Create zero counter."""
+        self.value = 0.0
+        self.__lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increase counter.
+
+        Arguments:
+            amount: Non-negative increment.
+        """
+        with self.__lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter, its name should end with _total."""
+
+    TYPE = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        """Create zero counter."""
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increase counter without labels.
+
+        Arguments:
+            amount: Non-negative increment.
+        """
+        self.labels().inc(amount)
+
+    def _samples(self) -> tp.Iterator[tp.Tuple[str, str, float]]:
+        """Get counter values."""
+        for values, child in list(self._children.items()):
+            yield "", _format_labels(self.labelnames, values), child.value
+
+
+class Gauge(_Metric):
+    """
+    Gauge read from a function at collection time, so it costs nothing between scrapes.
+
+    Arguments:
+        name: Metric name.
+        documentation: Metric help text.
+        function: Function which returns current value.
+        registry: Registry to add the metric to, None to keep it unregistered. Default: REGISTRY.
+    """
+
+    TYPE = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: tp.Callable[[], float],
+                 registry: tp.Optional[Registry] = REGISTRY) -> None:
+        """Create gauge and register it."""
+        self.__function = function
+        super().__init__(name, documentation, (), registry)
+
+    def _samples(self) -> tp.Iterator[tp.Tuple[str, str, float]]:
+        """Get current value, NaN if the function failed."""
+        try:
+            value = float(self.__function())
+        except Exception as exc:
+            logger.warning("Failed to collect gauge %s: %s", self.name, exc)
+            value = math.nan
+        yield "", "", value
+
+
+class _HistogramChild:
+    """
+    Histogram values for one label set.
+
+    Arguments:
+        buckets: Sorted upper bounds of buckets.
+    """
+
+    def __init__(self, buckets: tp.Sequence[float]) -> None:
+        """Create empty histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Add observation.
+
+        Arguments:
+            value: Observed value.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> tp.Tuple[tp.List[int], float]:
+        """Get bucket counts and sum consistent with each other."""
+        with self.__lock:
+            return list(self.counts), self.sum
+
+    @contextlib.contextmanager
+    def time(self) -> tp.Iterator[None]:
+        """Observe duration of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def timed(self, function: tp.Callable) -> tp.Callable:
+        """Decorate function to observe duration of every call in seconds."""
+        @wraps(function)
+        def __wrapper(*args, **kwargs):
+            with self.time():
+                return function(*args, **kwargs)
+
+        return __wrapper
+
+
+class Histogram(_Metric):
+    """
+    Histogram with fixed buckets.
+
+    Arguments:
+        name: Metric name.
+        documentation: Metric help text.
+        labelnames: Label names.
+        buckets: Upper bounds of buckets, +Inf bucket is added.
+        registry: Registry to add the metric to, None to keep it unregistered. Default: REGISTRY.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tp.Sequence[str] = (),
+                 buckets: tp.Sequence[float] = LATENCY_BUCKETS, registry: tp.Optional[Registry] = REGISTRY) -> None:
+        """Create histogram and register it."""
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        """Create empty histogram."""
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """
+        Add observation to histogram without labels.
+
+        Arguments:
+            value: Observed value.
+        """
+        self.labels().observe(value)
+
+    def _samples(self) -> tp.Iterator[tp.Tuple[str, str, float]]:
+        """Get cumulative bucket counts, sum and count."""
+        names = self.labelnames + ("le",)
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(names, values + (_format_value(bound),)), cumulative
+            yield "_sum", _format_labels(self.labelnames, values), total
+            yield "_count", _format_labels(self.labelnames, values), cumulative
+
+
+class MetricsServer:
+    """
+    Local HTTP server which exposes metrics at /metrics in Prometheus text format.
+
+    Arguments:
+        registry: Metrics to expose.
+        host: Host to listen on.
+        port: Port to listen on, 0 to pick a free one.
+    """
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = "127.0.0.1", port: int = 9464) -> None:
+        """Create server, it does not serve until started."""
+        self.__registry = registry
+        self.__server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self.__server.daemon_threads = True
+        self.__thread: tp.Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        """Port the server listens on."""
+        return self.__server.server_address[1]
+
+    def __make_handler(self) -> tp.Type[BaseHTTPRequestHandler]:
+        """Create request handler class bound to this server."""
+        registry = self.__registry
+
+        class Handler(BaseHTTPRequestHandler):
+            """Metrics request handler."""
+
+            def do_GET(self) -> None:
+                """Send metrics."""
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: tp.Any) -> None:
+                """Log request into debug log instead of stderr."""
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        if self.__thread is not None:
+            return
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="metrics", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop serving requests."""
+        if self.__thread is None:
+            return
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+        self.__thread = None
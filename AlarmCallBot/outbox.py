@@ -0,0 +1,160 @@
+"""Persistent dial outbox module."""
+import collections
+import logging
+import threading
+import typing as tp
+
+from . import db
+from .zvonok_api.Dispatcher import CallDispatcher, DialResult, WaveReport
+from .zvonok_api.Utils import CircuitOpenException
+
+logger = logging.getLogger(__name__)
+
+REDIAL_SEPARATOR = "/redial/"
+
+
+class DialOutbox:
+    """
+    Dial dispatcher backed by the dial_outbox table.
+
+    Every phone of an alert is saved into the outbox before it is dialed and
+    acknowledged right after the call is created, so waves interrupted by a
+    crash are resumed after restart, and acknowledged phones are never dialed
+    again. Phones saved for the same alert twice, e.g. when Telegram redelivers
+    the post, are dialed once. Failed dials are retried in background until
+    max_attempts attempts are made, dials rejected while Zvonok API circuit is
+    open are kept pending without counting an attempt. Pending dials older than
+    max_age, e.g. deferred for a long time or left by a run stopped hours ago,
+    are marked failed instead of being dialed, as the alert is stale by then.
+    Redials of unanswered calls are saved as dials of the alert id with the
+    redial number appended, so they are resumed after restart too.
+
+    Arguments:
+        call_dispatcher: Dispatcher which dials phones concurrently.
+        max_attempts: Maximal number of attempts to dial a phone for one alert.
+        retry_interval: Number of seconds between retries of pending dials.
+        max_age: Number of seconds after the alert its pending dials are dropped.
+        track_calls: If True, status tracking of every created call, except redials, is saved
+            in the same transaction as the dial result.
+        campaign_for: Function which returns Zvonok campaign the phone was dialed in, e.g.
+            ShardedZvonokManager.campaign_for, the campaign is saved with tracked calls of the phone.
+        on_dialed: Function called with alert id and phone after the call is created, except redials.
+    """
+
+    def __init__(self, call_dispatcher: CallDispatcher, max_attempts: int = 3, retry_interval: float = 5.0,
+                 max_age: float = 900.0, track_calls: bool = False,
+                 campaign_for: tp.Optional[tp.Callable[[str], str]] = None,
+                 on_dialed: tp.Optional[tp.Callable[[str, str], None]] = None) -> None:
+        """Create stopped outbox."""
+        self.__call_dispatcher = call_dispatcher
+        self.__on_dialed = on_dialed
+        self.__track_calls = track_calls
+        self.__campaign_for = campaign_for
+        self.__max_attempts = max_attempts
+        self.__retry_interval = retry_interval
+        self.__max_age = max_age
+        self.__stop_event = threading.Event()
+        self.__thread: tp.Optional[threading.Thread] = None
+
+    def __dispatch(self, dials: tp.Iterable[tp.Tuple[int, str, str]]) -> WaveReport:
+        """
+        Dial phones from outbox and save results.
+
+        Arguments:
+            dials: Triples (dial_id, alert_id, phone), a phone pending for several alerts is dialed once.
+        """
+        dial_ids: tp.DefaultDict[str, tp.List[tp.Tuple[int, str]]] = collections.defaultdict(list)
+        for dial_id, alert_id, phone in dials:
+            dial_ids[phone].append((dial_id, alert_id))
+
+        def on_result(result: DialResult) -> None:
+            campaign = None
+            if result.ok and self.__track_calls and self.__campaign_for is not None:
+                campaign = self.__campaign_for(result.phone)
+            for dial_id, alert_id in dial_ids[result.phone]:
+                if isinstance(result.exception, CircuitOpenException):
+                    db.defer_dial(dial_id)
+                    continue
+                is_redial = REDIAL_SEPARATOR in alert_id
+                tracked_alert_id = alert_id if self.__track_calls and not is_redial else None
+                db.finish_dial(dial_id, result.error, self.__max_attempts, tracked_alert_id, campaign)
+                if result.ok and not is_redial and self.__on_dialed is not None:
+                    self.__on_dialed(alert_id, result.phone)
+
+        return self.__call_dispatcher.dispatch(list(dial_ids), on_result)
+
+    def submit_wave(self, alert_id: str, phones: tp.Iterable[str]) -> WaveReport:
+        """
+        Save phones of the alert into outbox and dial them.
+
+        Arguments:
+            alert_id: Alert id, the same for redelivered alert.
+            phones: Phones to call.
+
+        Returns:
+            report: Per-phone results of the wave, phones already saved for the alert are not included.
+        """
+        return self.__dispatch((dial_id, alert_id, phone) for dial_id, phone in db.add_dials(alert_id, phones))
+
+    def redial(self, alert_id: str, phone: str, redial: int) -> WaveReport:
+        """
+        Save redial of the phone into outbox and dial it.
+
+        Arguments:
+            alert_id: Alert id the phone was dialed for.
+            phone: Phone to call again.
+            redial: Number of the redial, starting from 1.
+
+        Returns:
+            report: Result of the dial, empty if the redial was saved before.
+        """
+        return self.submit_wave(f"{alert_id}{REDIAL_SEPARATOR}{redial}", [phone])
+
+    def drain(self) -> WaveReport:
+        """
+        Dial all pending phones from outbox which are not older than max_age.
+
+        Returns:
+            report: Per-phone results.
+        """
+        n_expired = db.expire_pending_dials(self.__max_age)
+        if n_expired:
+            logger.warning("Dropped %s pending dials older than %s seconds", n_expired, self.__max_age)
+        dials = db.claim_pending_dials()
+        if dials:
+            logger.info("Dialing %s pending phones from outbox", len(dials))
+        return self.__dispatch(dials)
+
+    def __run(self) -> None:
+        """Dial pending phones until stopped."""
+        while True:
+            try:
+                self.drain()
+            except Exception as exc:
+                logger.error("Failed to drain dial outbox: %s", exc)
+            if self.__stop_event.wait(self.__retry_interval):
+                return
+
+    def start(self) -> None:
+        """
+        Start resuming and retrying dials in a background thread.
+
+        Should be called before new alerts are submitted, as dials left in flight
+        by the previous run are made pending again.
+        """
+        if self.__thread is not None:
+            return
+        n_reset = db.reset_in_flight_dials()
+        if n_reset:
+            logger.warning("Resuming %s dials interrupted by the previous run", n_reset)
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name="dial-outbox", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop background thread, the dials in flight are finished first."""
+        if self.__thread is None:
+            return
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__thread = None
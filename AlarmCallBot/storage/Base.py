@@ -0,0 +1,150 @@
+"""Storage interface of calls, phones, dial outbox and call statuses."""
+import typing as tp
+
+DIAL_PENDING = "pending"
+DIAL_IN_FLIGHT = "in_flight"
+DIAL_DONE = "done"
+DIAL_FAILED = "failed"
+DIAL_EXPIRED_ERROR = "expired"
+
+CALL_TRACKING = "tracking"
+CALL_ANSWERED = "answered"
+CALL_UNANSWERED = "unanswered"
+
+
+class Storage:
+    """
+    Base class of storage engines.
+
+    Engines keep four tables:
+        calls (user_id, date_created, date_expired),
+        phones (user_id, phone), one phone per user,
+        dial_outbox (alert_id, phone, state, attempts, last_error, created_at, updated_at),
+        call_status (alert_id, phone, state, checks, redials, started_at, updated_at, campaign).
+    All times are integer epoch seconds, engines do not read the clock. Every
+    method is atomic and safe to call from several threads.
+    """
+
+    NAME = ""
+
+    def init(self, force: bool = False) -> None:
+        """
+        Create tables missing in storage.
+
+        Arguments:
+            force: If True, drops all data first.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release resources, the next call reopens them."""
+        raise NotImplementedError
+
+    def write(self, calls: tp.Sequence[tp.Tuple[int, int, int]], phones: tp.Sequence[tp.Tuple[int, str]]) -> None:
+        """
+        Add calls and save phones in one transaction.
+
+        Arguments:
+            calls: Triples (user_id, date_created, date_expired).
+            phones: Pairs (user_id, phone), replacing saved phone of the user.
+        """
+        raise NotImplementedError
+
+    def get_phone(self, user_id: int) -> tp.Optional[str]:
+        """Get phone of the user, None if it is not saved."""
+        raise NotImplementedError
+
+    def get_phones(self) -> tp.List[tp.Tuple[int, str]]:
+        """Get all pairs (user_id, phone)."""
+        raise NotImplementedError
+
+    def get_user_id(self, phone: str) -> tp.Optional[int]:
+        """Get id of the first user who saved the phone, None if nobody did."""
+        raise NotImplementedError
+
+    def get_phones_to_call(self, time: int) -> tp.List[str]:
+        """Get distinct phones of users with calls expiring after time."""
+        raise NotImplementedError
+
+    def get_duty_ends(self, time: int) -> tp.List[tp.Tuple[int, int]]:
+        """Get pairs (user_id, latest date_expired) of users with calls expiring after time."""
+        raise NotImplementedError
+
+    def delete_expired_calls(self, time: int, batch_size: int = 500) -> int:
+        """Delete calls expired by time, return number of deleted calls."""
+        raise NotImplementedError
+
+    def delete_expired_user_calls(self, user_id: int, time: int) -> int:
+        """Delete calls of the user expired by time, return number of deleted calls."""
+        raise NotImplementedError
+
+    def merge_active_calls(self, time: int, batch_size: int = 500) -> int:
+        """
+        Merge calls of every user expiring after time into one call from the earliest creation to the latest expiry.
+
+        Returns:
+            n_merged: Number of calls removed by merging.
+        """
+        raise NotImplementedError
+
+    def incremental_vacuum(self, max_pages: int = 1000) -> int:
+        """Return free space to the file system, return number of bytes reclaimed."""
+        raise NotImplementedError
+
+    def add_dials(self, alert_id: str, phones: tp.Iterable[str], time: int) -> tp.List[tp.Tuple[int, str]]:
+        """Add in flight dials of phones not dialed for the alert yet, return pairs (dial_id, phone)."""
+        raise NotImplementedError
+
+    def count_dials(self, state: str) -> int:
+        """Get number of dials in the state given."""
+        raise NotImplementedError
+
+    def claim_pending_dials(self, limit: int, time: int) -> tp.List[tp.Tuple[int, str, str]]:
+        """Mark up to limit oldest pending dials as in flight, return triples (dial_id, alert_id, phone)."""
+        raise NotImplementedError
+
+    def expire_pending_dials(self, created_before: int, time: int) -> int:
+        """Mark pending dials created before created_before as failed, return number of expired dials."""
+        raise NotImplementedError
+
+    def reset_in_flight_dials(self) -> int:
+        """Make in flight dials pending, return number of reset dials."""
+        raise NotImplementedError
+
+    def finish_dial(self, dial_id: int, error: tp.Optional[str], max_attempts: int, time: int,
+                    tracked_alert_id: tp.Optional[str] = None, campaign: tp.Optional[str] = None) -> None:
+        """
+        Count an attempt, mark dial done, pending or failed after max_attempts failed attempts.
+
+        If the dial is done, in the same transaction tracking of the call for tracked_alert_id is started
+        if it is given, and campaign, if given, is saved for all tracked calls of the phone.
+        """
+        raise NotImplementedError
+
+    def defer_dial(self, dial_id: int, time: int) -> None:
+        """Make dial pending without counting an attempt."""
+        raise NotImplementedError
+
+    def delete_finished_dials(self, time: int, batch_size: int = 500) -> int:
+        """Delete done and failed dials updated before time, return number of deleted dials."""
+        raise NotImplementedError
+
+    def add_tracked_calls(self, alert_id: str, phones: tp.Iterable[str], started_at: int) -> None:
+        """Start tracking calls of phones not tracked for the alert yet."""
+        raise NotImplementedError
+
+    def get_tracked_calls(self) -> tp.List[tp.Tuple[str, str, int, int, int]]:
+        """Get tuples (alert_id, phone, started_at, checks, redials) of tracked calls in the order of adding."""
+        raise NotImplementedError
+
+    def get_tracked_campaigns(self) -> tp.List[tp.Tuple[str, str]]:
+        """Get pairs (phone, campaign) of tracked calls with known campaign."""
+        raise NotImplementedError
+
+    def update_call_status(self, phone: str, state: str, checks: int, redials: int, time: int) -> None:
+        """Save status of tracked calls of the phone for all alerts."""
+        raise NotImplementedError
+
+    def delete_finished_call_statuses(self, time: int, batch_size: int = 500) -> int:
+        """Delete answered and unanswered calls updated before time, return number of deleted calls."""
+        raise NotImplementedError
@@ -0,0 +1,316 @@
+"""In-memory storage engine."""
+import itertools
+import threading
+import typing as tp
+from dataclasses import dataclass
+
+from .Base import (
+    CALL_ANSWERED, CALL_TRACKING, CALL_UNANSWERED, DIAL_DONE, DIAL_EXPIRED_ERROR, DIAL_FAILED, DIAL_IN_FLIGHT,
+    DIAL_PENDING, Storage
+)
+
+
+@dataclass
+class _Dial:
+    """
+    Row of dial outbox.
+
+    Attributes:
+        alert_id (str): Alert id.
+        phone (str): Phone to call.
+        state (str): One of DIAL_PENDING, DIAL_IN_FLIGHT, DIAL_DONE and DIAL_FAILED.
+        created_at (int): Time of adding.
+        updated_at (int): Time of the last change.
+        attempts (int): Number of attempts made.
+        last_error (str): Error of the last failed attempt.
+    """
+
+    alert_id: str
+    phone: str
+    state: str
+    created_at: int
+    updated_at: int
+    attempts: int = 0
+    last_error: tp.Optional[str] = None
+
+
+@dataclass
+class _CallStatus:
+    """
+    Row of call status table.
+
+    Attributes:
+        alert_id (str): Alert id.
+        phone (str): Dialed phone.
+        state (str): One of CALL_TRACKING, CALL_ANSWERED and CALL_UNANSWERED.
+        started_at (int): Time of the dial.
+        updated_at (int): Time of the last change.
+        checks (int): Number of status checks made.
+        redials (int): Number of redials made.
+        campaign (str): Zvonok campaign the phone was dialed in.
+    """
+
+    alert_id: str
+    phone: str
+    state: str
+    started_at: int
+    updated_at: int
+    checks: int = 0
+    redials: int = 0
+    campaign: tp.Optional[str] = None
+
+
+class MemoryStorage(Storage):
+    """
+    Storage in dicts of the process memory, nothing is written to disk.
+
+    Tables are dicts keyed by row id, which keep insertion order, so rows are
+    returned in the same order as by the sqlite3 engine, tracked calls are
+    also indexed by phone. One lock guards all tables, which makes every
+    method a transaction. Data lives as long as the object and is kept by
+    close().
+    """
+
+    NAME = "memory"
+
+    def __init__(self) -> None:
+        """Create empty storage."""
+        self.__lock = threading.Lock()
+        self.__ids = itertools.count(1)
+        self.__calls: tp.Dict[int, tp.Tuple[int, int, int]] = {}
+        self.__phones: tp.Dict[int, str] = {}
+        self.__dials: tp.Dict[int, _Dial] = {}
+        self.__dial_ids: tp.Dict[tp.Tuple[str, str], int] = {}
+        self.__statuses: tp.Dict[int, _CallStatus] = {}
+        self.__status_ids: tp.Dict[tp.Tuple[str, str], int] = {}
+        self.__tracking: tp.Dict[str, tp.List[int]] = {}
+
+    def init(self, force: bool = False) -> None:
+        """Drop all data if force is True."""
+        if not force:
+            return
+        with self.__lock:
+            self.__calls.clear()
+            self.__phones.clear()
+            self.__dials.clear()
+            self.__dial_ids.clear()
+            self.__statuses.clear()
+            self.__status_ids.clear()
+            self.__tracking.clear()
+
+    def close(self) -> None:
+        """Do nothing, data is kept."""
+
+    def write(self, calls: tp.Sequence[tp.Tuple[int, int, int]], phones: tp.Sequence[tp.Tuple[int, str]]) -> None:
+        """Add calls and save phones in one transaction."""
+        with self.__lock:
+            for call in calls:
+                self.__calls[next(self.__ids)] = tuple(call)
+            for user_id, phone in phones:
+                self.__phones[user_id] = phone
+
+    def get_phone(self, user_id: int) -> tp.Optional[str]:
+        """Get phone of the user, None if it is not saved."""
+        return self.__phones.get(user_id)
+
+    def get_phones(self) -> tp.List[tp.Tuple[int, str]]:
+        """Get all pairs (user_id, phone)."""
+        with self.__lock:
+            return list(self.__phones.items())
+
+    def get_user_id(self, phone: str) -> tp.Optional[int]:
+        """Get id of the first user who saved the phone, None if nobody did."""
+        with self.__lock:
+            return next((user_id for user_id, saved in self.__phones.items() if saved == phone), None)
+
+    def get_phones_to_call(self, time: int) -> tp.List[str]:
+        """Get distinct phones of users with calls expiring after time."""
+        with self.__lock:
+            users = {user_id for user_id, _, date_expired in self.__calls.values() if date_expired > time}
+            return list({self.__phones[user_id] for user_id in users if user_id in self.__phones})
+
+    def get_duty_ends(self, time: int) -> tp.List[tp.Tuple[int, int]]:
+        """Get pairs (user_id, latest date_expired) of users with calls expiring after time."""
+        duty_ends: tp.Dict[int, int] = {}
+        with self.__lock:
+            for user_id, _, date_expired in self.__calls.values():
+                if date_expired > max(time, duty_ends.get(user_id, time)):
+                    duty_ends[user_id] = date_expired
+        return list(duty_ends.items())
+
+    def __delete_calls(self, predicate: tp.Callable[[tp.Tuple[int, int, int]], bool]) -> int:
+        """Delete calls matching predicate."""
+        with self.__lock:
+            ids = [call_id for call_id, call in self.__calls.items() if predicate(call)]
+            for call_id in ids:
+                del self.__calls[call_id]
+        return len(ids)
+
+    def delete_expired_calls(self, time: int, batch_size: int = 500) -> int:
+        """Delete calls expired by time, return number of deleted calls."""
+        return self.__delete_calls(lambda call: call[2] <= time)
+
+    def delete_expired_user_calls(self, user_id: int, time: int) -> int:
+        """Delete calls of the user expired by time, return number of deleted calls."""
+        return self.__delete_calls(lambda call: call[0] == user_id and call[2] <= time)
+
+    def merge_active_calls(self, time: int, batch_size: int = 500) -> int:
+        """Merge calls of every user expiring after time into one call."""
+        with self.__lock:
+            groups: tp.Dict[int, tp.List[int]] = {}
+            for call_id, (user_id, _, date_expired) in self.__calls.items():
+                if date_expired > time:
+                    groups.setdefault(user_id, []).append(call_id)
+            n_merged = 0
+            for user_id, ids in groups.items():
+                if len(ids) < 2:
+                    continue
+                calls = [self.__calls.pop(call_id) for call_id in ids]
+                merged = (user_id, min(call[1] for call in calls), max(call[2] for call in calls))
+                self.__calls[next(self.__ids)] = merged
+                n_merged += len(ids) - 1
+        return n_merged
+
+    def incremental_vacuum(self, max_pages: int = 1000) -> int:
+        """Do nothing, memory of deleted rows is freed at once."""
+        return 0
+
+    def add_dials(self, alert_id: str, phones: tp.Iterable[str], time: int) -> tp.List[tp.Tuple[int, str]]:
+        """Add in flight dials of phones not dialed for the alert yet, return pairs (dial_id, phone)."""
+        dials = []
+        with self.__lock:
+            for phone in phones:
+                if (alert_id, phone) in self.__dial_ids:
+                    continue
+                dial_id = next(self.__ids)
+                self.__dials[dial_id] = _Dial(alert_id, phone, DIAL_IN_FLIGHT, time, time)
+                self.__dial_ids[alert_id, phone] = dial_id
+                dials.append((dial_id, phone))
+        return dials
+
+    def count_dials(self, state: str) -> int:
+        """Get number of dials in the state given."""
+        with self.__lock:
+            return sum(1 for dial in self.__dials.values() if dial.state == state)
+
+    def claim_pending_dials(self, limit: int, time: int) -> tp.List[tp.Tuple[int, str, str]]:
+        """Mark up to limit oldest pending dials as in flight, return triples (dial_id, alert_id, phone)."""
+        claimed = []
+        with self.__lock:
+            for dial_id, dial in self.__dials.items():
+                if len(claimed) >= limit:
+                    break
+                if dial.state == DIAL_PENDING:
+                    dial.state, dial.updated_at = DIAL_IN_FLIGHT, time
+                    claimed.append((dial_id, dial.alert_id, dial.phone))
+        return claimed
+
+    def expire_pending_dials(self, created_before: int, time: int) -> int:
+        """Mark pending dials created before created_before as failed, return number of expired dials."""
+        n_dials = 0
+        with self.__lock:
+            for dial in self.__dials.values():
+                if dial.state == DIAL_PENDING and dial.created_at < created_before:
+                    dial.state, dial.last_error, dial.updated_at = DIAL_FAILED, DIAL_EXPIRED_ERROR, time
+                    n_dials += 1
+        return n_dials
+
+    def reset_in_flight_dials(self) -> int:
+        """Make in flight dials pending, return number of reset dials."""
+        n_dials = 0
+        with self.__lock:
+            for dial in self.__dials.values():
+                if dial.state == DIAL_IN_FLIGHT:
+                    dial.state = DIAL_PENDING
+                    n_dials += 1
+        return n_dials
+
+    def finish_dial(self, dial_id: int, error: tp.Optional[str], max_attempts: int, time: int,
+                    tracked_alert_id: tp.Optional[str] = None, campaign: tp.Optional[str] = None) -> None:
+        """Count an attempt, mark dial done, pending or failed, start tracking the call if it was created."""
+        with self.__lock:
+            dial = self.__dials.get(dial_id)
+            if dial is None:
+                return
+            dial.attempts += 1
+            dial.updated_at = time
+            if error is None:
+                dial.state = DIAL_DONE
+                if tracked_alert_id is not None:
+                    self.__add_tracked_call(tracked_alert_id, dial.phone, time)
+                if campaign is not None:
+                    for status_id in self.__tracking.get(dial.phone, []):
+                        self.__statuses[status_id].campaign = campaign
+            else:
+                dial.state = DIAL_FAILED if dial.attempts >= max_attempts else DIAL_PENDING
+                dial.last_error = error
+
+    def defer_dial(self, dial_id: int, time: int) -> None:
+        """Make dial pending without counting an attempt."""
+        with self.__lock:
+            dial = self.__dials.get(dial_id)
+            if dial is not None:
+                dial.state, dial.updated_at = DIAL_PENDING, time
+
+    def delete_finished_dials(self, time: int, batch_size: int = 500) -> int:
+        """Delete done and failed dials updated before time, return number of deleted dials."""
+        with self.__lock:
+            ids = [
+                dial_id for dial_id, dial in self.__dials.items()
+                if dial.state in (DIAL_DONE, DIAL_FAILED) and dial.updated_at < time
+            ]
+            for dial_id in ids:
+                dial = self.__dials.pop(dial_id)
+                del self.__dial_ids[dial.alert_id, dial.phone]
+        return len(ids)
+
+    def add_tracked_calls(self, alert_id: str, phones: tp.Iterable[str], started_at: int) -> None:
+        """Start tracking calls of phones not tracked for the alert yet."""
+        with self.__lock:
+            for phone in phones:
+                self.__add_tracked_call(alert_id, phone, started_at)
+
+    def __add_tracked_call(self, alert_id: str, phone: str, started_at: int) -> None:
+        """Start tracking call of the phone if it is not tracked for the alert yet, lock must be held."""
+        if (alert_id, phone) in self.__status_ids:
+            return
+        status_id = next(self.__ids)
+        self.__statuses[status_id] = _CallStatus(alert_id, phone, CALL_TRACKING, started_at, started_at)
+        self.__status_ids[alert_id, phone] = status_id
+        self.__tracking.setdefault(phone, []).append(status_id)
+
+    def get_tracked_calls(self) -> tp.List[tp.Tuple[str, str, int, int, int]]:
+        """Get tuples (alert_id, phone, started_at, checks, redials) of tracked calls in the order of adding."""
+        with self.__lock:
+            return [
+                (status.alert_id, status.phone, status.started_at, status.checks, status.redials)
+                for status in self.__statuses.values() if status.state == CALL_TRACKING
+            ]
+
+    def get_tracked_campaigns(self) -> tp.List[tp.Tuple[str, str]]:
+        """Get pairs (phone, campaign) of tracked calls with known campaign."""
+        with self.__lock:
+            return [
+                (status.phone, status.campaign)
+                for status in self.__statuses.values() if status.state == CALL_TRACKING and status.campaign is not None
+            ]
+
+    def update_call_status(self, phone: str, state: str, checks: int, redials: int, time: int) -> None:
+        """Save status of tracked calls of the phone for all alerts."""
+        with self.__lock:
+            ids = self.__tracking.pop(phone, []) if state != CALL_TRACKING else self.__tracking.get(phone, [])
+            for status_id in ids:
+                status = self.__statuses[status_id]
+                status.state, status.checks, status.redials, status.updated_at = state, checks, redials, time
+
+    def delete_finished_call_statuses(self, time: int, batch_size: int = 500) -> int:
+        """Delete answered and unanswered calls updated before time, return number of deleted calls."""
+        with self.__lock:
+            ids = [
+                status_id for status_id, status in self.__statuses.items()
+                if status.state in (CALL_ANSWERED, CALL_UNANSWERED) and status.updated_at < time
+            ]
+            for status_id in ids:
+                status = self.__statuses.pop(status_id)
+                del self.__status_ids[status.alert_id, status.phone]
+        return len(ids)
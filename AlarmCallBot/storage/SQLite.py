@@ -0,0 +1,573 @@
+"""SQLite storage engine."""
+import contextlib
+import logging
+import sqlite3
+import threading
+import typing as tp
+
+from .Base import (
+    CALL_ANSWERED, CALL_TRACKING, CALL_UNANSWERED, DIAL_DONE, DIAL_EXPIRED_ERROR, DIAL_FAILED, DIAL_IN_FLIGHT,
+    DIAL_PENDING, Storage
+)
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT = 5.0
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _migration_create_tables(c: sqlite3.Cursor) -> None:
+    """Create initial tables calls and phones."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS calls (
+              id INTEGER PRIMARY KEY,
+              user_id INTEGER NOT NULL,
+              date_created TIMESTAMP,
+              date_expired TIMESTAMP
+        )
+    """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS phones (
+              id INTEGER PRIMARY KEY,
+              user_id INTEGER NOT NULL,
+              phone TEXT
+        )
+    """
+    )
+
+
+def _migration_epoch_dates_and_indexes(c: sqlite3.Cursor) -> None:
+    """
+    Store call dates as integer epoch seconds, add indexes and make phones.user_id unique.
+
+    TIMESTAMP text is local time written by sqlite3 datetime adapter. For users with
+    several phones the first saved one is kept, as get_phone returned it.
+    """
+    c.execute(
+        """
+        CREATE TABLE calls_new (
+              id INTEGER PRIMARY KEY,
+              user_id INTEGER NOT NULL,
+              date_created INTEGER,
+              date_expired INTEGER
+        )
+    """
+    )
+    c.execute(
+        """
+        INSERT INTO calls_new (id, user_id, date_created, date_expired)
+        SELECT id, user_id,
+               CAST(strftime('%s', date_created, 'utc') AS INTEGER),
+               CAST(strftime('%s', date_expired, 'utc') AS INTEGER)
+        FROM calls
+        """
+    )
+    c.execute("DROP TABLE calls")
+    c.execute("ALTER TABLE calls_new RENAME TO calls")
+    c.execute("CREATE INDEX calls_date_expired ON calls (date_expired, user_id)")
+    c.execute("CREATE INDEX calls_user_id ON calls (user_id)")
+
+    c.execute(
+        """
+        CREATE TABLE phones_new (
+              id INTEGER PRIMARY KEY,
+              user_id INTEGER NOT NULL UNIQUE,
+              phone TEXT
+        )
+    """
+    )
+    c.execute(
+        """
+        INSERT INTO phones_new (id, user_id, phone)
+        SELECT id, user_id, phone
+        FROM phones
+        WHERE id IN (SELECT MIN(id) FROM phones GROUP BY user_id)
+        """
+    )
+    c.execute("DROP TABLE phones")
+    c.execute("ALTER TABLE phones_new RENAME TO phones")
+
+
+def _migration_dial_outbox(c: sqlite3.Cursor) -> None:
+    """Create dial outbox table, which keeps every phone of every alert until it is dialed."""
+    c.execute(
+        """
+        CREATE TABLE dial_outbox (
+              id INTEGER PRIMARY KEY,
+              alert_id TEXT NOT NULL,
+              phone TEXT NOT NULL,
+              state TEXT NOT NULL,
+              attempts INTEGER NOT NULL DEFAULT 0,
+              last_error TEXT,
+              updated_at INTEGER NOT NULL,
+              UNIQUE (alert_id, phone)
+        )
+    """
+    )
+    c.execute("CREATE INDEX dial_outbox_state ON dial_outbox (state, updated_at)")
+
+
+def _migration_call_status(c: sqlite3.Cursor) -> None:
+    """Create call status table, which keeps outcome of every dialed phone of every alert."""
+    c.execute(
+        """
+        CREATE TABLE call_status (
+              id INTEGER PRIMARY KEY,
+              alert_id TEXT NOT NULL,
+              phone TEXT NOT NULL,
+              state TEXT NOT NULL,
+              checks INTEGER NOT NULL DEFAULT 0,
+              redials INTEGER NOT NULL DEFAULT 0,
+              started_at INTEGER NOT NULL,
+              updated_at INTEGER NOT NULL,
+              UNIQUE (alert_id, phone)
+        )
+    """
+    )
+    c.execute("CREATE INDEX call_status_state ON call_status (state, updated_at)")
+
+
+def _migration_dial_created_at(c: sqlite3.Cursor) -> None:
+    """Add creation time of dials, so that stale dials are not dialed, existing dials get the last update time."""
+    c.execute("ALTER TABLE dial_outbox ADD COLUMN created_at INTEGER NOT NULL DEFAULT 0")
+    c.execute("UPDATE dial_outbox SET created_at = updated_at")
+
+
+def _migration_call_campaign(c: sqlite3.Cursor) -> None:
+    """Add Zvonok campaign of tracked calls, so that their status is checked in the right campaign after restart."""
+    c.execute("ALTER TABLE call_status ADD COLUMN campaign TEXT")
+
+
+_MIGRATIONS: tp.List[tp.Callable[[sqlite3.Cursor], None]] = [
+    _migration_create_tables,
+    _migration_epoch_dates_and_indexes,
+    _migration_dial_outbox,
+    _migration_call_status,
+    _migration_dial_created_at,
+    _migration_call_campaign,
+]
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Get schema version of database.
+
+    Arguments:
+        conn: Connection to database.
+
+    Returns:
+        version: Number of migrations applied, 0 for empty database and database created before migrations.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply all migrations missing in database, each in its own transaction.
+
+    Arguments:
+        conn: Connection to database.
+
+    Returns:
+        version: Schema version after migration.
+    """
+    version = get_schema_version(conn)
+    for number, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            migration(c)
+            c.execute(f"PRAGMA user_version = {number}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        version = number
+    return version
+
+
+_INSERT_CALL = "INSERT INTO calls (user_id, date_created, date_expired) VALUES (?, ?, ?)"
+_UPSERT_PHONE = (
+    "INSERT INTO phones (user_id, phone) VALUES (?, ?) ON CONFLICT (user_id) DO UPDATE SET phone = excluded.phone"
+)
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage in sqlite3 database file.
+
+    Every thread has its own connection, connections of exited threads are
+    closed when another thread opens one. Database is switched to WAL journal
+    mode, so readers never wait for writers, and commits are synced to disk
+    only on checkpoints. Schema is kept up to date by numbered migrations.
+
+    Arguments:
+        path: Database file path.
+        busy_timeout: Number of seconds to wait for the write lock.
+    """
+
+    NAME = "sqlite"
+
+    def __init__(self, path: str = "calls.db", busy_timeout: float = BUSY_TIMEOUT) -> None:
+        """Create storage, connections are opened on first use."""
+        self.path = path
+        self.__busy_timeout = busy_timeout
+        self.__local = threading.local()
+        self.__connections_lock = threading.Lock()
+        self.__connections: tp.Dict[int, tp.Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self.__generation = 0
+
+    def __connect(self) -> sqlite3.Connection:
+        """Open connection in WAL journal mode."""
+        conn = sqlite3.connect(self.path, timeout=self.__busy_timeout, check_same_thread=False)
+        # Takes effect only in a new database file, older files are switched by incremental_vacuum()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.__busy_timeout * 1000)}")
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Get connection of the current thread."""
+        conn = getattr(self.__local, "connection", None)
+        if conn is None or getattr(self.__local, "generation", None) != self.__generation:
+            conn = self.__connect()
+            thread = threading.current_thread()
+            with self.__connections_lock:
+                self.__close_dead_connections()
+                self.__connections[thread.ident] = (thread, conn)
+            self.__local.connection = conn
+            self.__local.generation = self.__generation
+        return conn
+
+    def __close_dead_connections(self) -> None:
+        """Close connections of exited threads, must be called with connections lock held."""
+        for ident, (thread, conn) in list(self.__connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self.__connections[ident]
+
+    @property
+    def n_connections(self) -> int:
+        """Number of open connections."""
+        return len(self.__connections)
+
+    def close(self) -> None:
+        """Close connections of all threads, the next get_connection() calls open new ones."""
+        with self.__connections_lock:
+            self.__generation += 1
+            for _, conn in self.__connections.values():
+                conn.close()
+            self.__connections.clear()
+
+    @contextlib.contextmanager
+    def transaction(self) -> tp.Iterator[sqlite3.Cursor]:
+        """
+        Run statements in one write transaction of the current thread connection.
+
+        The transaction takes the write lock at start, commits on exit and rolls back on exception.
+        Transactions can not be nested.
+
+        Yields:
+            cursor: Cursor to execute statements with.
+        """
+        conn = self.get_connection()
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def init(self, force: bool = False) -> None:
+        """
+        Migrate database to the latest schema.
+
+        Arguments:
+            force: If True, drops tables before creating.
+        """
+        conn = self.get_connection()
+        if force:
+            c = conn.cursor()
+            c.execute("DROP TABLE IF EXISTS calls")
+            c.execute("DROP TABLE IF EXISTS phones")
+            c.execute("DROP TABLE IF EXISTS dial_outbox")
+            c.execute("DROP TABLE IF EXISTS call_status")
+            c.execute("PRAGMA user_version = 0")
+            conn.commit()
+        migrate(conn)
+
+    def write(self, calls: tp.Sequence[tp.Tuple[int, int, int]], phones: tp.Sequence[tp.Tuple[int, str]]) -> None:
+        """Add calls and save phones in one transaction."""
+        with self.transaction() as c:
+            c.executemany(_INSERT_CALL, calls)
+            c.executemany(_UPSERT_PHONE, phones)
+
+    def get_phone(self, user_id: int) -> tp.Optional[str]:
+        """Get phone of the user, None if it is not saved."""
+        c = self.get_connection().cursor()
+        c.execute("SELECT phone FROM phones WHERE user_id=?", (user_id,))
+        res = c.fetchone()
+        if res is None:
+            return None
+        return res[0]
+
+    def get_phones(self) -> tp.List[tp.Tuple[int, str]]:
+        """Get all pairs (user_id, phone)."""
+        c = self.get_connection().cursor()
+        c.execute("SELECT user_id, phone FROM phones")
+        return c.fetchall()
+
+    def get_user_id(self, phone: str) -> tp.Optional[int]:
+        """Get id of the first user who saved the phone, None if nobody did."""
+        c = self.get_connection().cursor()
+        c.execute("SELECT user_id FROM phones WHERE phone = ? LIMIT 1", (phone,))
+        row = c.fetchone()
+        return row[0] if row is not None else None
+
+    def get_phones_to_call(self, time: int) -> tp.List[str]:
+        """Get distinct phones of users with calls expiring after time."""
+        c = self.get_connection().cursor()
+        c.execute(
+            """
+            SELECT DISTINCT phone
+            FROM calls
+            JOIN phones ON phones.user_id = calls.user_id
+            WHERE calls.date_expired > ?
+            """,
+            (time,),
+        )
+        return [phone for (phone,) in c.fetchall()]
+
+    def get_duty_ends(self, time: int) -> tp.List[tp.Tuple[int, int]]:
+        """Get pairs (user_id, latest date_expired) of users with calls expiring after time."""
+        c = self.get_connection().cursor()
+        c.execute("SELECT user_id, MAX(date_expired) FROM calls WHERE date_expired > ? GROUP BY user_id", (time,))
+        return c.fetchall()
+
+    def delete_expired_calls(self, time: int, batch_size: int = 500) -> int:
+        """Delete calls expired by time, each batch in its own short transaction."""
+        n_deleted = 0
+        while True:
+            with self.transaction() as c:
+                c.execute(
+                    "DELETE FROM calls WHERE id IN (SELECT id FROM calls WHERE date_expired <= ? LIMIT ?)",
+                    (time, batch_size),
+                )
+            n_deleted += c.rowcount
+            if c.rowcount < batch_size:
+                return n_deleted
+
+    def delete_expired_user_calls(self, user_id: int, time: int) -> int:
+        """Delete calls of the user expired by time, return number of deleted calls."""
+        with self.transaction() as c:
+            c.execute("DELETE FROM calls WHERE user_id = ? AND date_expired <= ?", (user_id, time))
+            return c.rowcount
+
+    def merge_active_calls(self, time: int, batch_size: int = 500) -> int:
+        """Merge active calls of every user, batch_size users in one transaction, calls added meanwhile are kept."""
+        c = self.get_connection().cursor()
+        c.execute(
+            """
+            SELECT user_id, MIN(date_created), MAX(date_expired), MAX(id)
+            FROM calls
+            WHERE date_expired > ?
+            GROUP BY user_id
+            HAVING COUNT(*) > 1
+            """,
+            (time,),
+        )
+        groups = c.fetchall()
+        n_merged = 0
+        for start in range(0, len(groups), batch_size):
+            with self.transaction() as c:
+                for user_id, date_created, date_expired, max_id in groups[start:start + batch_size]:
+                    c.execute(
+                        "DELETE FROM calls WHERE user_id = ? AND date_expired > ? AND id <= ?",
+                        (user_id, time, max_id),
+                    )
+                    n_merged += c.rowcount - 1
+                    c.execute(_INSERT_CALL, (user_id, date_created, date_expired))
+        return n_merged
+
+    def incremental_vacuum(self, max_pages: int = 1000) -> int:
+        """
+        Return free database pages to the file system, return number of bytes reclaimed.
+
+        A database file created without incremental auto vacuum is rebuilt once by a full VACUUM,
+        which blocks writes until it finishes, so it should be called from a background job.
+        """
+        conn = self.get_connection()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != _AUTO_VACUUM_INCREMENTAL:
+            logger.warning("Rebuilding database %s of %s pages to enable incremental vacuum", self.path, page_count)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return (page_count - conn.execute("PRAGMA page_count").fetchone()[0]) * page_size
+        # execute() steps the pragma once and frees one page only, executescript() runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        return (page_count - conn.execute("PRAGMA page_count").fetchone()[0]) * page_size
+
+    def add_dials(self, alert_id: str, phones: tp.Iterable[str], time: int) -> tp.List[tp.Tuple[int, str]]:
+        """Add in flight dials of phones not dialed for the alert yet, return pairs (dial_id, phone)."""
+        dials = []
+        with self.transaction() as c:
+            for phone in phones:
+                c.execute(
+                    "INSERT OR IGNORE INTO dial_outbox (alert_id, phone, state, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (alert_id, phone, DIAL_IN_FLIGHT, time, time),
+                )
+                if c.rowcount == 1:
+                    dials.append((c.lastrowid, phone))
+        return dials
+
+    def count_dials(self, state: str) -> int:
+        """Get number of dials in the state given."""
+        c = self.get_connection().cursor()
+        c.execute("SELECT COUNT(*) FROM dial_outbox WHERE state = ?", (state,))
+        return c.fetchone()[0]
+
+    def claim_pending_dials(self, limit: int, time: int) -> tp.List[tp.Tuple[int, str, str]]:
+        """Mark up to limit oldest pending dials as in flight, return triples (dial_id, alert_id, phone)."""
+        with self.transaction() as c:
+            c.execute(
+                "SELECT id, alert_id, phone FROM dial_outbox WHERE state = ? ORDER BY id LIMIT ?",
+                (DIAL_PENDING, limit),
+            )
+            dials = c.fetchall()
+            c.executemany(
+                "UPDATE dial_outbox SET state = ?, updated_at = ? WHERE id = ?",
+                [(DIAL_IN_FLIGHT, time, dial_id) for dial_id, _, _ in dials],
+            )
+            return dials
+
+    def expire_pending_dials(self, created_before: int, time: int) -> int:
+        """Mark pending dials created before created_before as failed, return number of expired dials."""
+        with self.transaction() as c:
+            c.execute(
+                "UPDATE dial_outbox SET state = ?, last_error = ?, updated_at = ? WHERE state = ? AND created_at < ?",
+                (DIAL_FAILED, DIAL_EXPIRED_ERROR, time, DIAL_PENDING, created_before),
+            )
+            return c.rowcount
+
+    def reset_in_flight_dials(self) -> int:
+        """Make in flight dials pending, return number of reset dials."""
+        with self.transaction() as c:
+            c.execute("UPDATE dial_outbox SET state = ? WHERE state = ?", (DIAL_PENDING, DIAL_IN_FLIGHT))
+            return c.rowcount
+
+    def finish_dial(self, dial_id: int, error: tp.Optional[str], max_attempts: int, time: int,
+                    tracked_alert_id: tp.Optional[str] = None, campaign: tp.Optional[str] = None) -> None:
+        """Count an attempt, mark dial done, pending or failed, start tracking the call if it was created."""
+        with self.transaction() as c:
+            if error is None:
+                c.execute(
+                    "UPDATE dial_outbox SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (DIAL_DONE, time, dial_id),
+                )
+                if tracked_alert_id is not None:
+                    c.execute(
+                        "INSERT OR IGNORE INTO call_status (alert_id, phone, state, started_at, updated_at) "
+                        "SELECT ?, phone, ?, ?, ? FROM dial_outbox WHERE id = ?",
+                        (tracked_alert_id, CALL_TRACKING, time, time, dial_id),
+                    )
+                if campaign is not None:
+                    c.execute(
+                        "UPDATE call_status SET campaign = ? "
+                        "WHERE state = ? AND phone = (SELECT phone FROM dial_outbox WHERE id = ?)",
+                        (campaign, CALL_TRACKING, dial_id),
+                    )
+            else:
+                c.execute(
+                    """
+                    UPDATE dial_outbox
+                    SET state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END,
+                        attempts = attempts + 1, last_error = ?, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (max_attempts, DIAL_FAILED, DIAL_PENDING, error, time, dial_id),
+                )
+
+    def defer_dial(self, dial_id: int, time: int) -> None:
+        """Make dial pending without counting an attempt."""
+        with self.transaction() as c:
+            c.execute("UPDATE dial_outbox SET state = ?, updated_at = ? WHERE id = ?", (DIAL_PENDING, time, dial_id))
+
+    def delete_finished_dials(self, time: int, batch_size: int = 500) -> int:
+        """Delete done and failed dials updated before time, each batch in its own short transaction."""
+        n_deleted = 0
+        while True:
+            with self.transaction() as c:
+                c.execute(
+                    """
+                    DELETE FROM dial_outbox WHERE id IN (
+                        SELECT id FROM dial_outbox WHERE state IN (?, ?) AND updated_at < ? LIMIT ?
+                    )
+                    """,
+                    (DIAL_DONE, DIAL_FAILED, time, batch_size),
+                )
+            n_deleted += c.rowcount
+            if c.rowcount < batch_size:
+                return n_deleted
+
+    def add_tracked_calls(self, alert_id: str, phones: tp.Iterable[str], started_at: int) -> None:
+        """Start tracking calls of phones not tracked for the alert yet."""
+        with self.transaction() as c:
+            c.executemany(
+                "INSERT OR IGNORE INTO call_status (alert_id, phone, state, started_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(alert_id, phone, CALL_TRACKING, started_at, started_at) for phone in phones],
+            )
+
+    def get_tracked_calls(self) -> tp.List[tp.Tuple[str, str, int, int, int]]:
+        """Get tuples (alert_id, phone, started_at, checks, redials) of tracked calls in the order of adding."""
+        c = self.get_connection().cursor()
+        c.execute(
+            "SELECT alert_id, phone, started_at, checks, redials FROM call_status WHERE state = ? ORDER BY id",
+            (CALL_TRACKING,),
+        )
+        return c.fetchall()
+
+    def get_tracked_campaigns(self) -> tp.List[tp.Tuple[str, str]]:
+        """Get pairs (phone, campaign) of tracked calls with known campaign."""
+        c = self.get_connection().cursor()
+        c.execute(
+            "SELECT phone, campaign FROM call_status WHERE state = ? AND campaign IS NOT NULL ORDER BY id",
+            (CALL_TRACKING,),
+        )
+        return c.fetchall()
+
+    def update_call_status(self, phone: str, state: str, checks: int, redials: int, time: int) -> None:
+        """Save status of tracked calls of the phone for all alerts."""
+        with self.transaction() as c:
+            c.execute(
+                "UPDATE call_status SET state = ?, checks = ?, redials = ?, updated_at = ? "
+                "WHERE phone = ? AND state = ?",
+                (state, checks, redials, time, phone, CALL_TRACKING),
+            )
+
+    def delete_finished_call_statuses(self, time: int, batch_size: int = 500) -> int:
+        """Delete answered and unanswered calls updated before time, each batch in its own short transaction."""
+        n_deleted = 0
+        while True:
+            with self.transaction() as c:
+                c.execute(
+                    """
+                    DELETE FROM call_status WHERE id IN (
+                        SELECT id FROM call_status WHERE state IN (?, ?) AND updated_at < ? LIMIT ?
+                    )
+                    """,
+                    (CALL_ANSWERED, CALL_UNANSWERED, time, batch_size),
+                )
+            n_deleted += c.rowcount
+            if c.rowcount < batch_size:
+                return n_deleted
@@ -0,0 +1,29 @@
+"""Storage engine utils."""
+import typing as tp
+
+from .Base import Storage
+from .Memory import MemoryStorage
+from .SQLite import SQLiteStorage
+
+STORAGES: tp.Dict[str, tp.Type[Storage]] = {
+    SQLiteStorage.NAME: SQLiteStorage,
+    MemoryStorage.NAME: MemoryStorage,
+}
+
+
+def create_storage(name: str, path: str = "calls.db") -> Storage:
+    """
+    Create storage engine by name.
+
+    Arguments:
+        name: 'sqlite' or 'memory'.
+        path: Database file path of the sqlite engine.
+
+    Returns:
+        storage: New storage engine.
+    """
+    if name == SQLiteStorage.NAME:
+        return SQLiteStorage(path)
+    if name == MemoryStorage.NAME:
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage {name!r}, expected one of {sorted(STORAGES)}")
@@ -0,0 +1,178 @@
+"""Hashed timing wheel for many pending timers."""
+import logging
+import math
+import threading
+import time
+import typing as tp
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Timer:
+    """
+    Pending timer.
+
+    Attributes:
+        key (Hashable): Timer key, a new timer with the same key replaces this one.
+        deadline (float): Time to fire at in clock seconds.
+        callback (Callable): Function called when the timer fires.
+        cancelled (bool): True if the timer was cancelled or replaced.
+    """
+
+    key: tp.Hashable
+    deadline: float
+    callback: tp.Callable[[], None]
+    cancelled: bool = False
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel which fires callbacks at their deadlines.
+
+    Time is split into ticks, a timer is put into the slot of its deadline tick
+    modulo n_slots, so adding and cancelling a timer are O(1) at any number of
+    pending timers. When a tick passes only the timers of its slot are looked
+    at, those due are fired and those due in a later turn of the wheel are left
+    in place. Timers fire at the end of their tick, up to one tick late and
+    never early. Callbacks run in the wheel thread one after another and
+    should not block.
+
+    Arguments:
+        tick: Number of seconds per slot.
+        n_slots: Number of slots, a timer further than tick * n_slots ahead waits several turns.
+        clock: Function which returns current time in seconds.
+    """
+
+    def __init__(self, tick: float = 1.0, n_slots: int = 3600, clock: tp.Callable[[], float] = time.time) -> None:
+        """Create stopped wheel."""
+        self.__tick = tick
+        self.__clock = clock
+        self.__slots: tp.List[tp.List[_Timer]] = [[] for _ in range(n_slots)]
+        self.__timers: tp.Dict[tp.Hashable, _Timer] = {}
+        self.__done_tick = self.__tick_of(clock()) - 1
+        self.__condition = threading.Condition()
+        self.__stopped = True
+        self.__thread: tp.Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        """Get number of pending timers."""
+        with self.__condition:
+            return len(self.__timers)
+
+    def __tick_of(self, t: float) -> int:
+        """Get number of the tick time t falls into."""
+        return math.floor(t / self.__tick)
+
+    def schedule(self, key: tp.Hashable, deadline: float, callback: tp.Callable[[], None]) -> None:
+        """
+        Add timer, replace pending timer with the same key.
+
+        Arguments:
+            key: Timer key.
+            deadline: Time to fire at in clock seconds, a passed deadline fires at the end of the current tick.
+            callback: Function called when the timer fires.
+        """
+        timer = _Timer(key, deadline, callback)
+        with self.__condition:
+            old = self.__timers.pop(key, None)
+            if old is not None:
+                old.cancelled = True
+            self.__timers[key] = timer
+            deadline_tick = max(self.__tick_of(deadline), self.__done_tick + 1)
+            self.__slots[deadline_tick % len(self.__slots)].append(timer)
+
+    def cancel(self, key: tp.Hashable) -> bool:
+        """
+        Cancel pending timer.
+
+        Arguments:
+            key: Timer key.
+
+        Returns:
+            cancelled: False if there is no pending timer with the key.
+        """
+        with self.__condition:
+            timer = self.__timers.pop(key, None)
+            if timer is None:
+                return False
+            timer.cancelled = True
+            return True
+
+    def deadline(self, key: tp.Hashable) -> tp.Optional[float]:
+        """Get deadline of pending timer, None if there is no pending timer with the key."""
+        with self.__condition:
+            timer = self.__timers.get(key)
+            return timer.deadline if timer is not None else None
+
+    def __pop_due(self) -> tp.List[_Timer]:
+        """Advance the wheel over the passed ticks and pop timers due by then."""
+        now = self.__clock()
+        now_tick = self.__tick_of(now)
+        # after a long pause one turn over all slots is enough to see every timer
+        first_tick = max(self.__done_tick + 1, now_tick - len(self.__slots))
+        due = []
+        for tick in range(first_tick, now_tick):
+            slot = self.__slots[tick % len(self.__slots)]
+            if not slot:
+                continue
+            waiting = []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.deadline <= now:
+                    timer.cancelled = True
+                    del self.__timers[timer.key]
+                    due.append(timer)
+                else:
+                    waiting.append(timer)
+            slot[:] = waiting
+        self.__done_tick = max(self.__done_tick, now_tick - 1)
+        due.sort(key=lambda timer: timer.deadline)
+        return due
+
+    def fire_due(self) -> int:
+        """
+        Fire all due timers in the calling thread.
+
+        Returns:
+            n_fired: Number of fired timers.
+        """
+        with self.__condition:
+            due = self.__pop_due()
+        for timer in due:
+            try:
+                timer.callback()
+            except Exception as exc:
+                logger.error("Timer %s failed: %s", timer.key, exc)
+        return len(due)
+
+    def __run(self) -> None:
+        """Fire timers every tick until stopped."""
+        while True:
+            self.fire_due()
+            with self.__condition:
+                if self.__stopped:
+                    return
+                next_tick_end = (self.__done_tick + 2) * self.__tick
+                self.__condition.wait(max(0.0, next_tick_end - self.__clock()))
+
+    def start(self) -> None:
+        """Fire timers in a background thread."""
+        if self.__thread is not None:
+            return
+        with self.__condition:
+            self.__stopped = False
+        self.__thread = threading.Thread(target=self.__run, name="timer-wheel", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop firing timers, pending timers are kept."""
+        if self.__thread is None:
+            return
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+        self.__thread.join()
+        self.__thread = None
@@ -0,0 +1,130 @@
+"""Write-behind queue for database writes."""
+import logging
+import queue
+import threading
+import time
+import typing as tp
+
+logger = logging.getLogger(__name__)
+
+Record = tp.Tuple[str, tp.Tuple[tp.Any, ...]]
+
+
+class WriteBehindQueue:
+    """
+    Queue which writes records in batches from a single writer thread.
+
+    put() returns immediately, the writer thread collects records until batch_size
+    records are collected or flush_interval seconds passed since the first one, and
+    passes the batch to write function, which should store it in one transaction.
+    A failed batch is retried until it is written. After stop the queue is drained
+    and failed writes are retried up to stop_retries times in total, records still
+    not written then are dropped and counted in the log.
+
+    Arguments:
+        write: Function which stores a batch of records.
+        batch_size: Maximal number of records in one batch.
+        flush_interval: Maximal number of seconds a record waits in the queue.
+        retry_interval: Number of seconds to wait before retrying failed batch.
+        stop_retries: Maximal number of failed writes retried after stop.
+    """
+
+    def __init__(self, write: tp.Callable[[tp.List[Record]], None], batch_size: int = 100,
+                 flush_interval: float = 0.05, retry_interval: float = 1.0, stop_retries: int = 3) -> None:
+        """Create stopped queue."""
+        self.__write = write
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__retry_interval = retry_interval
+        self.__stop_retries = stop_retries
+        self.__queue: queue.Queue = queue.Queue()
+        self.__stop_event = threading.Event()
+        self.__thread: tp.Optional[threading.Thread] = None
+
+    @property
+    def depth(self) -> int:
+        """Number of records waiting to be written."""
+        return self.__queue.qsize()
+
+    def put(self, record: Record) -> None:
+        """
+        Add record to the queue.
+
+        Arguments:
+            record: Pair of record kind and record values.
+        """
+        self.__queue.put(record)
+
+    def flush(self) -> None:
+        """Wait until all records put before are written."""
+        self.__queue.join()
+
+    def __collect(self) -> tp.List[Record]:
+        """Get next batch of records, empty if no records came during flush interval."""
+        try:
+            batch = [self.__queue.get(timeout=self.__flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.__flush_interval
+        while len(batch) < self.__batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self.__queue.get(timeout=timeout) if timeout > 0 else self.__queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def __write_batch(self, batch: tp.List[Record]) -> bool:
+        """Write batch and mark its records as done, return False if writing failed."""
+        try:
+            self.__write(batch)
+        except Exception as exc:
+            logger.error("Failed to write batch of %s records: %s", len(batch), exc)
+            return False
+        for _ in batch:
+            self.__queue.task_done()
+        return True
+
+    def __run(self) -> None:
+        """Write batches until stopped and the queue is empty."""
+        batch: tp.List[Record] = []
+        n_stop_failures = 0
+        while not (self.__stop_event.is_set() and not batch and self.__queue.empty()):
+            if not batch:
+                batch = self.__collect()
+            if not batch:
+                continue
+            if self.__write_batch(batch):
+                batch = []
+            elif not self.__stop_event.is_set():
+                self.__stop_event.wait(self.__retry_interval)
+            elif n_stop_failures < self.__stop_retries:
+                n_stop_failures += 1
+                time.sleep(self.__retry_interval)
+            else:
+                break
+        while True:
+            try:
+                batch.append(self.__queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            logger.error("Lost %s records which failed to be written before stop", len(batch))
+        for _ in batch:
+            self.__queue.task_done()
+
+    def start(self) -> None:
+        """Start writer thread."""
+        if self.__thread is not None:
+            return
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name="write-behind", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Write all queued records and stop writer thread."""
+        if self.__thread is None:
+            return
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__thread = None
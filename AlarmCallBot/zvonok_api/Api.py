@@ -1,13 +1,40 @@
 """Zvonok manager class module."""
 import logging
+import threading
+import time
 import requests
 import typing as tp
 from requests.adapters import HTTPAdapter, Retry
 
-from .Utils import check_request
+from .. import metrics
+from .CircuitBreaker import CircuitBreaker
+from .RateLimiter import AdaptiveRateLimiter
+from .Utils import RETRY_STATUSES, CircuitOpenException, check_request, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+REQUEST_SECONDS = metrics.Histogram(
+    "zvonok_request_seconds", "Latency of Zvonok API requests in seconds.", ("method",)
+)
+RESPONSES = metrics.Counter(
+    "zvonok_responses_total", "Zvonok API responses by status code.", ("method", "status")
+)
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter with default timeout for requests sent without one."""
+
+    def __init__(self, *args, timeout: tp.Optional[float] = None, **kwargs) -> None:
+        """Save default timeout."""
+        self.__timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):  # type: ignore[override]
+        """Send request with default timeout if no timeout given."""
+        if timeout is None:
+            timeout = self.__timeout
+        return super().send(request, timeout=timeout, **kwargs)
+
 
 class ZvonokManager:
     """
@@ -19,24 +46,35 @@ class ZvonokManager:
         api_host: URI of call request server.
         n_retries: Total number of connection retries allowed.
         backoff_factor: A backoff factor to apply between attempts after the second try.
+        pool_maxsize: Maximal number of keep-alive connections to the server, should not be less
+            than the number of concurrent dials.
+        timeout: Timeout of one request attempt in seconds.
+        rate_limiter: Limiter all requests go through, requests throttled by the server
+            are retried after the limiter allows. Default: AdaptiveRateLimiter with default settings.
+        circuit_breaker: If set, requests fail fast with CircuitOpenException while the circuit is open.
+            Connection errors and 5xx responses are counted as failures.
     """
 
     def __init__(self, public_api_key: tp.Optional[str], campaign_id: str, api_host: str, n_retries: int = 3,
-                 backoff_factor: float = 0.1) -> None:
-        """Create requests session."""
+                 backoff_factor: float = 0.1, pool_maxsize: int = 10, timeout: tp.Optional[float] = None,
+                 rate_limiter: tp.Optional[AdaptiveRateLimiter] = None,
+                 circuit_breaker: tp.Optional[CircuitBreaker] = None) -> None:
+        """Save settings, requests session is created on first request."""
         self.__public_api_key = public_api_key
         self.__campaign_id = campaign_id
         self.__api_host = api_host
         if self.__public_api_key is None:
             raise RuntimeError("Set ZVONOK_API_TOKEN env. variable")
 
-        retries = Retry(
-            total=n_retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=[408, 425, 429, 500, 502, 503, 504],
-        )
-        self.__requests_session = requests.Session()
-        self.__requests_session.mount("https://", HTTPAdapter(max_retries=retries))
+        self.__n_retries = n_retries
+        self.__backoff_factor = backoff_factor
+        self.__rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter()
+        self.__circuit_breaker = circuit_breaker
+
+        self.__pool_maxsize = pool_maxsize
+        self.__timeout = timeout
+        self.__requests_session: tp.Optional[requests.Session] = None
+        self.__session_lock = threading.Lock()
 
         self.__api_urls = {
             "create_call": "/manager/cabapi_external/api/v1/phones/call/",
@@ -44,6 +82,107 @@ class ZvonokManager:
             "check_call_by_phone": "/manager/cabapi_external/api/v1/phones/call_by_id/",
         }
 
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """Limiter all requests go through."""
+        return self.__rate_limiter
+
+    @property
+    def circuit_breaker(self) -> tp.Optional[CircuitBreaker]:
+        """Circuit breaker all requests go through."""
+        return self.__circuit_breaker
+
+    def __session(self) -> requests.Session:
+        """Get requests session, create it on first call."""
+        session = self.__requests_session
+        if session is None:
+            with self.__session_lock:
+                if self.__requests_session is None:
+                    retries = Retry(
+                        total=self.__n_retries,
+                        backoff_factor=self.__backoff_factor,
+                        status_forcelist=RETRY_STATUSES,
+                    )
+                    adapter = _TimeoutHTTPAdapter(
+                        max_retries=retries, pool_maxsize=self.__pool_maxsize, timeout=self.__timeout
+                    )
+                    self.__requests_session = requests.Session()
+                    self.__requests_session.mount("https://", adapter)
+                    self.__requests_session.mount("http://", adapter)
+                session = self.__requests_session
+        return session
+
+    def warm_up(self) -> None:
+        """
+        Create requests session and open a keep-alive connection to the server.
+
+        Run it in background at start, so the first alert does not wait for
+        connection and TLS handshake. Errors are logged and ignored.
+        """
+        try:
+            self.__session().head(self.__api_host).close()
+        except Exception as exc:
+            logger.warning("Failed to warm up connection to Zvonok api: %s", exc)
+            return
+        logger.info("Connection to Zvonok api is warmed up")
+
+    def __post(self, method: str, payload: tp.Dict[str, tp.Any]) -> requests.Response:
+        """
+        Send request through the circuit breaker.
+
+        Arguments:
+            method: API method name, key of api urls.
+            payload: Request data.
+        """
+        url = self.__api_host + self.__api_urls[method]
+        if self.__circuit_breaker is None:
+            return self.__send(method, url, payload)
+        if not self.__circuit_breaker.allow():
+            RESPONSES.labels(method, "circuit_open").inc()
+            raise CircuitOpenException(f"Zvonok api circuit is open, request to url = {url} is not sent")
+        try:
+            response = self.__send(method, url, payload)
+        except Exception:
+            self.__circuit_breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.__circuit_breaker.record_failure()
+        else:
+            self.__circuit_breaker.record_success()
+        return response
+
+    def __send(self, method: str, url: str, payload: tp.Dict[str, tp.Any]) -> requests.Response:
+        """
+        Send request through the rate limiter, retry it if the server throttles.
+
+        Arguments:
+            method: API method name used in metrics.
+            url: Request url.
+            payload: Request data.
+        """
+        request_seconds = REQUEST_SECONDS.labels(method)
+        attempt = 0
+        while True:
+            attempt += 1
+            self.__rate_limiter.acquire()
+            status = None
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                response = self.__session().post(url, data=payload)
+                status = response.status_code
+                if status in AdaptiveRateLimiter.THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            finally:
+                self.__rate_limiter.release(status, retry_after)
+                request_seconds.observe(time.perf_counter() - start)
+                RESPONSES.labels(method, status if status is not None else "error").inc()
+            if status not in AdaptiveRateLimiter.THROTTLE_STATUSES or attempt > self.__n_retries:
+                return response
+            logger.warning("Zvonok api throttled request with code = %s, retrying", status)
+            if retry_after is None:
+                time.sleep(self.__backoff_factor * (2 ** (attempt - 1)))
+
     @check_request
     def create_call(self, phone: str) -> requests.Response:
         """
@@ -52,16 +191,13 @@ class ZvonokManager:
         Arguments:
             phone: Given phone to call.
         """
-        logger.info(f"Create call for phone = {phone}")
+        logger.info("Create call for phone = %s", phone)
         payload = {
             "public_key": self.__public_api_key,
             "phone": phone,
             "campaign_id": self.__campaign_id,
         }
-        response = self.__requests_session.post(
-            self.__api_host + self.__api_urls["create_call"], data=payload
-        )
-        return response
+        return self.__post("create_call", payload)
 
     @check_request
     def delete_call(self, phone: str) -> requests.Response:
@@ -71,16 +207,13 @@ class ZvonokManager:
         Arguments:
             phone: Given phone to delete call for.
         """
-        logger.info(f"Delete call for phone = {phone}")
+        logger.info("Delete call for phone = %s", phone)
         payload = {
             "public_key": self.__public_api_key,
             "phone": phone,
             "campaign_id": self.__campaign_id,
         }
-        response = self.__requests_session.post(
-            self.__api_host + self.__api_urls["delete_call"], data=payload
-        )
-        return response
+        return self.__post("delete_call", payload)
 
     @check_request
     def check_call(self, phone: str) -> requests.Response:
@@ -90,13 +223,10 @@ class ZvonokManager:
         Arguments:
             phone: Given phone to check call for.
         """
-        logger.info(f"Check call for phone = {phone}")
+        logger.info("Check call for phone = %s", phone)
         payload = {
             "public_key": self.__public_api_key,
             "phone": phone,
             "campaign_id": self.__campaign_id,
         }
-        response = self.__requests_session.post(
-            self.__api_host + self.__api_urls["check_call_by_phone"], data=payload
-        )
-        return response
+        return self.__post("check_call_by_phone", payload)
@@ -0,0 +1,187 @@
+"""Asynchronous zvonok manager class module."""
+import asyncio
+import logging
+import time
+import typing as tp
+
+import aiohttp
+
+from .Dispatcher import DialResult, WaveReport
+from .RateLimiter import AdaptiveRateLimiter
+from .Utils import async_check_request, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncZvonokManager:
+    """
+    Asynchronous zvonok manager class.
+
+    All requests share one aiohttp session with a pool of keep-alive connections,
+    so hundreds of dials can be in flight on one event loop. The session is created
+    on the first request and must be closed with close() or by using the manager
+    as an async context manager.
+
+    Arguments:
+        public_api_key: Zvonok API public key.
+        campaign_id: Zvonok campaign ID.
+        api_host: URI of call request server.
+        n_retries: Total number of retries allowed.
+        backoff_factor: A backoff factor to apply between attempts after the second try.
+        pool_size: Maximal number of simultaneous connections to the server.
+        timeout: Timeout of one request attempt in seconds.
+    """
+
+    def __init__(self, public_api_key: tp.Optional[str], campaign_id: str, api_host: str, n_retries: int = 3,
+                 backoff_factor: float = 0.1, pool_size: int = 100, timeout: tp.Optional[float] = None) -> None:
+        """Save connection settings."""
+        self.__public_api_key = public_api_key
+        self.__campaign_id = campaign_id
+        self.__api_host = api_host
+        if self.__public_api_key is None:
+            raise RuntimeError("Set ZVONOK_API_TOKEN env. variable")
+
+        self.__n_retries = n_retries
+        self.__backoff_factor = backoff_factor
+        self.__pool_size = pool_size
+        self.__timeout = timeout
+        self.__session: tp.Optional[aiohttp.ClientSession] = None
+
+        self.__api_urls = {
+            "create_call": "/manager/cabapi_external/api/v1/phones/call/",
+            "delete_call": "/manager/cabapi_external/api/v1/phones/remove_call/",
+            "check_call_by_phone": "/manager/cabapi_external/api/v1/phones/call_by_id/",
+        }
+
+    async def __aenter__(self) -> "AsyncZvonokManager":
+        """Enter async context."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Close session on context exit."""
+        await self.close()
+
+    async def close(self) -> None:
+        """Close session and all pooled connections."""
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    def __get_session(self) -> aiohttp.ClientSession:
+        """Get session, create it if needed."""
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.__pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.__timeout),
+            )
+        return self.__session
+
+    def __backoff(self, attempt: int) -> float:
+        """
+        Get delay before the retry, same as urllib3 Retry does.
+
+        Arguments:
+            attempt: Number of the failed attempt, starting from 1.
+        """
+        if attempt <= 1:
+            return 0.0
+        return self.__backoff_factor * (2 ** (attempt - 1))
+
+    async def __post(self, method: str, phone: str) -> aiohttp.ClientResponse:
+        """
+        Send request to Zvonok API with retries.
+
+        Requests are not idempotent, so like ZvonokManager only requests the server
+        throttled or could not be sent at all are retried: a retry after a 5xx or a
+        read timeout could dial the phone twice.
+
+        Arguments:
+            method: Key of API method url.
+            phone: Given phone.
+
+        Returns:
+            response: Response with the body already read.
+        """
+        payload = {
+            "public_key": self.__public_api_key,
+            "phone": phone,
+            "campaign_id": self.__campaign_id,
+        }
+        url = self.__api_host + self.__api_urls[method]
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self.__get_session().post(url, data=payload) as response:
+                    await response.read()
+            except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError):
+                if attempt > self.__n_retries:
+                    raise
+                await asyncio.sleep(self.__backoff(attempt))
+                continue
+            if response.status not in AdaptiveRateLimiter.THROTTLE_STATUSES or attempt > self.__n_retries:
+                return response
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            await asyncio.sleep(self.__backoff(attempt) if delay is None else delay)
+
+    @async_check_request
+    async def create_call(self, phone: str) -> aiohttp.ClientResponse:
+        """
+        Create call for phone given.
+
+        Arguments:
+            phone: Given phone to call.
+        """
+        logger.info("Create call for phone = %s", phone)
+        return await self.__post("create_call", phone)
+
+    @async_check_request
+    async def delete_call(self, phone: str) -> aiohttp.ClientResponse:
+        """
+        Delete call for phone given.
+
+        Arguments:
+            phone: Given phone to delete call for.
+        """
+        logger.info("Delete call for phone = %s", phone)
+        return await self.__post("delete_call", phone)
+
+    @async_check_request
+    async def check_call(self, phone: str) -> aiohttp.ClientResponse:
+        """
+        Check call for phone given.
+
+        Arguments:
+            phone: Given phone to check call for.
+        """
+        logger.info("Check call for phone = %s", phone)
+        return await self.__post("check_call_by_phone", phone)
+
+    async def __create_call_result(self, phone: str) -> DialResult:
+        """
+        Create call and catch any error.
+
+        Arguments:
+            phone: Given phone to call.
+        """
+        start = time.monotonic()
+        try:
+            await self.create_call(phone)
+        except Exception as exc:
+            logger.warning("Failed to create call for phone = %s: %s", phone, exc)
+            return DialResult(phone, False, str(exc), time.monotonic() - start)
+        return DialResult(phone, True, None, time.monotonic() - start)
+
+    async def create_calls(self, phones: tp.Iterable[str]) -> WaveReport:
+        """
+        Create calls for all phones given concurrently.
+
+        Arguments:
+            phones: Phones to call.
+
+        Returns:
+            report: Per-phone results of the wave.
+        """
+        start = time.monotonic()
+        results = await asyncio.gather(*(self.__create_call_result(phone) for phone in phones))
+        return WaveReport(list(results), time.monotonic() - start)
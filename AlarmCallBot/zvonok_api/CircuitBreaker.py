@@ -0,0 +1,93 @@
+"""Circuit breaker for Zvonok API requests."""
+import logging
+import threading
+import time
+import typing as tp
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker which fails requests fast while the server is down.
+
+    The circuit is closed while requests succeed. After failure_threshold
+    consecutive failures it opens and allow() returns False for reset_timeout
+    seconds. Then it is half-open: up to half_open_max_calls probe requests are
+    allowed, a successful probe closes the circuit and a failed one opens it again.
+
+    Arguments:
+        failure_threshold: Number of consecutive failures which open the circuit.
+        reset_timeout: Number of seconds the circuit stays open before probing.
+        half_open_max_calls: Maximal number of probe requests in flight while half-open.
+        clock: Function which returns current time in seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1,
+                 clock: tp.Callable[[], float] = time.monotonic) -> None:
+        """Create closed circuit."""
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be greater than 0")
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+        self.__half_open_max_calls = half_open_max_calls
+        self.__clock = clock
+        self.__state = self.CLOSED
+        self.__n_failures = 0
+        self.__opened_at = 0.0
+        self.__n_probes = 0
+        self.__lock = threading.Lock()
+
+    def __update_state(self) -> None:
+        """Make open circuit half-open when reset timeout passes."""
+        if self.__state == self.OPEN and self.__clock() - self.__opened_at >= self.__reset_timeout:
+            self.__state = self.HALF_OPEN
+            self.__n_probes = 0
+
+    @property
+    def state(self) -> str:
+        """Circuit state, one of CLOSED, OPEN and HALF_OPEN."""
+        with self.__lock:
+            self.__update_state()
+            return self.__state
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent.
+
+        Every allowed request should be followed by record_success or record_failure.
+
+        Returns:
+            allowed: False if the request should fail fast.
+        """
+        with self.__lock:
+            self.__update_state()
+            if self.__state == self.CLOSED:
+                return True
+            if self.__state == self.HALF_OPEN and self.__n_probes < self.__half_open_max_calls:
+                self.__n_probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Save successful request and close the circuit."""
+        with self.__lock:
+            if self.__state != self.CLOSED:
+                logger.info("Zvonok api circuit is closed")
+            self.__state = self.CLOSED
+            self.__n_failures = 0
+
+    def record_failure(self) -> None:
+        """Save failed request, open the circuit if there are too many failures or the probe failed."""
+        with self.__lock:
+            self.__n_failures += 1
+            if self.__state == self.HALF_OPEN or (
+                self.__state == self.CLOSED and self.__n_failures >= self.__failure_threshold
+            ):
+                logger.warning("Zvonok api circuit is open after %s failures", self.__n_failures)
+                self.__state = self.OPEN
+                self.__opened_at = self.__clock()
@@ -0,0 +1,121 @@
+"""Concurrent call dispatcher module."""
+import logging
+import time
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DialResult:
+    """
+    Result of a single dial.
+
+    Attributes:
+        phone (str): Dialed phone.
+        ok (bool): True if the call was created.
+        error (str | None): Error description if the call was not created.
+        duration (float): Time spent on the dial in seconds.
+        exception (Exception | None): Exception raised by the dial.
+    """
+
+    phone: str
+    ok: bool
+    error: tp.Optional[str] = None
+    duration: float = 0.0
+    exception: tp.Optional[Exception] = field(default=None, repr=False)
+
+
+@dataclass
+class WaveReport:
+    """
+    Report of a dial wave.
+
+    Attributes:
+        results (list): Dial results in the order the phones were given.
+        duration (float): Time from the wave start to the last finished dial in seconds.
+    """
+
+    results: tp.List[DialResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def succeeded(self) -> tp.List[str]:
+        """Phones which were dialed successfully."""
+        return [result.phone for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> tp.List[str]:
+        """Phones which were not dialed."""
+        return [result.phone for result in self.results if not result.ok]
+
+
+class CallDispatcher:
+    """
+    Bounded concurrent call dispatcher.
+
+    Each phone of a wave is dialed in a separate worker, so one slow or failing
+    number occupies only one worker and does not stall the rest of the wave.
+
+    Arguments:
+        dial: Function which creates call for the phone given, e.g. ZvonokManager.create_call.
+        max_workers: Maximal number of dials in flight.
+    """
+
+    def __init__(self, dial: tp.Callable[[str], tp.Any], max_workers: int = 32) -> None:
+        """Create worker pool."""
+        if max_workers < 1:
+            raise ValueError("max_workers must be greater than 0")
+        self.__dial = dial
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dial")
+
+    def __dial_one(self, phone: str, on_result: tp.Optional[tp.Callable[[DialResult], None]]) -> DialResult:
+        """
+        Dial one phone and catch any error.
+
+        Arguments:
+            phone: Given phone to call.
+            on_result: Function called with the dial result in the worker.
+        """
+        start = time.monotonic()
+        try:
+            self.__dial(phone)
+        except Exception as exc:
+            logger.warning("Failed to create call for phone = %s: %s", phone, exc)
+            result = DialResult(phone, False, str(exc), time.monotonic() - start, exc)
+        else:
+            result = DialResult(phone, True, None, time.monotonic() - start)
+        if on_result is not None:
+            try:
+                on_result(result)
+            except Exception as exc:
+                logger.error("Failed to handle dial result for phone = %s: %s", phone, exc)
+        return result
+
+    def dispatch(self, phones: tp.Iterable[str],
+                 on_result: tp.Optional[tp.Callable[[DialResult], None]] = None) -> WaveReport:
+        """
+        Dial all phones given concurrently and wait for the wave to finish.
+
+        Arguments:
+            phones: Phones to call.
+            on_result: Function called with every dial result as soon as the dial finishes.
+
+        Returns:
+            report: Per-phone results of the wave.
+        """
+        start = time.monotonic()
+        futures = [self.__executor.submit(self.__dial_one, phone, on_result) for phone in phones]
+        results = [future.result() for future in futures]
+        return WaveReport(results, time.monotonic() - start)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop worker pool.
+
+        Arguments:
+            wait: If True, waits for the dials in flight to finish.
+        """
+        self.__executor.shutdown(wait=wait)
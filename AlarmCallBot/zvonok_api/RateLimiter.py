@@ -0,0 +1,128 @@
+"""Rate limiter for Zvonok API requests."""
+import threading
+import time
+import typing as tp
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket rate limiter with AIMD concurrency control.
+
+    Every request takes a token and a concurrency slot with acquire() and returns
+    the slot with release(). Successful responses additively increase the rate
+    and the concurrency limit, throttling responses (429, 503) multiplicatively
+    decrease them, and Retry-After pauses all requests for the delay given.
+
+    Arguments:
+        rate: Initial number of requests per second.
+        min_rate: Minimal number of requests per second.
+        max_rate: Maximal number of requests per second.
+        concurrency: Initial number of requests in flight.
+        min_concurrency: Minimal number of requests in flight.
+        max_concurrency: Maximal number of requests in flight.
+        increase: Requests per second added to the rate per second of successful responses.
+        decrease: Factor to multiply the rate and concurrency by on throttling.
+        decrease_interval: Minimal number of seconds between two decreases, so that
+            one burst of throttled responses is counted once.
+    """
+
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(self, rate: float = 10.0, min_rate: float = 1.0, max_rate: float = 100.0,
+                 concurrency: int = 32, min_concurrency: int = 1, max_concurrency: int = 64,
+                 increase: float = 1.0, decrease: float = 0.5, decrease_interval: float = 1.0) -> None:
+        """Create limiter."""
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("rate must be between min_rate and max_rate")
+        if not 0 < min_concurrency <= concurrency <= max_concurrency:
+            raise ValueError("concurrency must be between min_concurrency and max_concurrency")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.__rate = rate
+        self.__min_rate = min_rate
+        self.__max_rate = max_rate
+        self.__concurrency = float(concurrency)
+        self.__min_concurrency = min_concurrency
+        self.__max_concurrency = max_concurrency
+        self.__increase = increase
+        self.__decrease = decrease
+        self.__decrease_interval = decrease_interval
+
+        self.__tokens = float(concurrency)
+        self.__updated = time.monotonic()
+        self.__paused_until = 0.0
+        self.__last_decrease = float("-inf")
+        self.__in_flight = 0
+        self.__waiting = 0
+        self.__cond = threading.Condition()
+
+    @property
+    def rate(self) -> float:
+        """Current number of requests per second."""
+        return self.__rate
+
+    @property
+    def concurrency(self) -> int:
+        """Current limit of requests in flight."""
+        return int(self.__concurrency)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests in flight."""
+        return self.__in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for the limiter."""
+        return self.__waiting
+
+    def __refill(self, now: float) -> None:
+        """Add tokens accumulated since the last update, the burst is limited by concurrency."""
+        capacity = max(1.0, self.__concurrency)
+        self.__tokens = min(capacity, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+    def acquire(self) -> None:
+        """Wait for a token and a free concurrency slot."""
+        with self.__cond:
+            self.__waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.__refill(now)
+                    if now < self.__paused_until:
+                        timeout: tp.Optional[float] = self.__paused_until - now
+                    elif self.__in_flight >= int(self.__concurrency):
+                        timeout = None
+                    elif self.__tokens < 1:
+                        timeout = (1 - self.__tokens) / self.__rate
+                    else:
+                        self.__tokens -= 1
+                        self.__in_flight += 1
+                        return
+                    self.__cond.wait(timeout)
+            finally:
+                self.__waiting -= 1
+
+    def release(self, status: tp.Optional[int] = None, retry_after: tp.Optional[float] = None) -> None:
+        """
+        Return concurrency slot and adapt limits to the response.
+
+        Arguments:
+            status: Response status code, None if no response was received.
+            retry_after: Delay from Retry-After header in seconds.
+        """
+        with self.__cond:
+            self.__in_flight -= 1
+            now = time.monotonic()
+            if status in self.THROTTLE_STATUSES:
+                if now - self.__last_decrease >= self.__decrease_interval:
+                    self.__last_decrease = now
+                    self.__rate = max(self.__min_rate, self.__rate * self.__decrease)
+                    self.__concurrency = max(self.__min_concurrency, self.__concurrency * self.__decrease)
+                if retry_after is not None:
+                    self.__paused_until = max(self.__paused_until, now + retry_after)
+            elif status is not None and status < 400:
+                self.__rate = min(self.__max_rate, self.__rate + self.__increase / self.__rate)
+                self.__concurrency = min(self.__max_concurrency, self.__concurrency + 1 / self.__concurrency)
+            self.__cond.notify_all()
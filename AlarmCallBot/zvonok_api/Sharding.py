@@ -0,0 +1,170 @@
+"""Zvonok manager which spreads calls across campaigns."""
+import logging
+import threading
+import time
+import typing as tp
+import zlib
+
+import requests
+
+from .. import metrics
+from .Api import ZvonokManager
+from .CircuitBreaker import CircuitBreaker
+from .RateLimiter import AdaptiveRateLimiter
+
+logger = logging.getLogger(__name__)
+
+SHARD_CALLS = metrics.Counter(
+    "zvonok_shard_calls_total", "Zvonok calls created by campaign and result.", ("campaign", "result")
+)
+SHARD_CALL_SECONDS = metrics.Histogram(
+    "zvonok_shard_call_seconds", "Latency of Zvonok create call requests by campaign in seconds.", ("campaign",)
+)
+
+HASH = "hash"
+LEAST_LOADED = "least_loaded"
+STRATEGIES = (HASH, LEAST_LOADED)
+
+
+class ShardedZvonokManager:
+    """
+    Zvonok manager which spreads calls of one wave across several campaigns.
+
+    Zvonok paces dialing per campaign, so a wave spread across N campaigns is
+    dialed up to N times faster. Every campaign has its own manager with its
+    own connection pool. Checks and deletions of a phone go to the campaign it
+    was dialed in.
+
+    With the hash strategy a phone is always dialed in the same campaign, so
+    the campaign of a phone is known after restart too. With the least loaded
+    strategy a phone is dialed in the campaign with the fewest calls being
+    created and the campaign is remembered in memory, campaigns saved before
+    restart are loaded with restore_campaigns(), the hash campaign is used for
+    other phones.
+
+    Arguments:
+        managers: Managers by campaign ID.
+        strategy: Sharding strategy, 'hash' or 'least_loaded'.
+    """
+
+    def __init__(self, managers: tp.Mapping[str, ZvonokManager], strategy: str = HASH) -> None:
+        """Save managers."""
+        if not managers:
+            raise ValueError("At least one campaign is required")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sharding strategy = {strategy}, expected one of {STRATEGIES}")
+        self.__managers = dict(managers)
+        self.__campaigns = list(self.__managers)
+        self.__strategy = strategy
+        self.__in_flight = {campaign: 0 for campaign in self.__campaigns}
+        self.__created = {campaign: 0 for campaign in self.__campaigns}
+        self.__phone_campaigns: tp.Dict[str, str] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def campaigns(self) -> tp.List[str]:
+        """Campaign IDs calls are spread across."""
+        return list(self.__campaigns)
+
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """Limiter requests of the first campaign go through, shared by all campaigns if built by the bot."""
+        return self.__managers[self.__campaigns[0]].rate_limiter
+
+    @property
+    def circuit_breaker(self) -> tp.Optional[CircuitBreaker]:
+        """Circuit breaker of the first campaign, shared by all campaigns if built by the bot."""
+        return self.__managers[self.__campaigns[0]].circuit_breaker
+
+    def hash_campaign(self, phone: str) -> str:
+        """
+        Get campaign of the phone by hash, stable across restarts.
+
+        Arguments:
+            phone: Phone number.
+        """
+        return self.__campaigns[zlib.crc32(phone.encode()) % len(self.__campaigns)]
+
+    def campaign_for(self, phone: str) -> str:
+        """
+        Get campaign the phone was dialed in.
+
+        Arguments:
+            phone: Phone number.
+        """
+        campaign = self.__phone_campaigns.get(phone)
+        return campaign if campaign is not None else self.hash_campaign(phone)
+
+    def restore_campaigns(self, campaigns: tp.Iterable[tp.Tuple[str, str]]) -> None:
+        """
+        Remember campaigns phones were dialed in before restart, unknown campaigns are skipped.
+
+        Arguments:
+            campaigns: Pairs (phone, campaign), a later pair of a phone wins.
+        """
+        with self.__lock:
+            for phone, campaign in campaigns:
+                if campaign in self.__managers:
+                    self.__phone_campaigns[phone] = campaign
+                else:
+                    logger.warning("Phone = %s was dialed in unknown campaign = %s", phone, campaign)
+
+    def __acquire(self, phone: str) -> str:
+        """Choose campaign for a new call and count it as in flight."""
+        with self.__lock:
+            if self.__strategy == HASH:
+                campaign = self.hash_campaign(phone)
+            else:
+                campaign = min(self.__campaigns, key=lambda c: (self.__in_flight[c], self.__created[c]))
+            self.__in_flight[campaign] += 1
+            self.__created[campaign] += 1
+            self.__phone_campaigns[phone] = campaign
+        return campaign
+
+    def __release(self, campaign: str) -> None:
+        """Count call as finished."""
+        with self.__lock:
+            self.__in_flight[campaign] -= 1
+
+    def warm_up(self) -> None:
+        """Open a keep-alive connection of every campaign."""
+        for manager in self.__managers.values():
+            manager.warm_up()
+
+    def create_call(self, phone: str) -> requests.Response:
+        """
+        Create call for phone given in the campaign chosen by the strategy.
+
+        Arguments:
+            phone: Given phone to create call for.
+        """
+        campaign = self.__acquire(phone)
+        start = time.perf_counter()
+        try:
+            response = self.__managers[campaign].create_call(phone)
+        except Exception:
+            SHARD_CALLS.labels(campaign, "error").inc()
+            raise
+        finally:
+            SHARD_CALL_SECONDS.labels(campaign).observe(time.perf_counter() - start)
+            self.__release(campaign)
+        SHARD_CALLS.labels(campaign, "ok").inc()
+        return response
+
+    def delete_call(self, phone: str) -> requests.Response:
+        """
+        Delete call for phone given in the campaign it was dialed in.
+
+        Arguments:
+            phone: Given phone to delete call for.
+        """
+        return self.__managers[self.campaign_for(phone)].delete_call(phone)
+
+    def check_call(self, phone: str) -> requests.Response:
+        """
+        Check call for phone given in the campaign it was dialed in.
+
+        Arguments:
+            phone: Given phone to check call for.
+        """
+        return self.__managers[self.campaign_for(phone)].check_call(phone)
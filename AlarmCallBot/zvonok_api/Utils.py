@@ -1,11 +1,17 @@
 """Utility functions for zvonok manager."""
 import requests
 import logging
+import time
 import typing as tp
+from email.utils import parsedate_to_datetime
 from functools import wraps
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+ANSWERED_CALL_STATUSES = ("compl_finished", "compl_nofinished")
+UNANSWERED_CALL_STATUSES = ("attempts_exc", "expires", "interrupted", "deleted")
+
 
 class ZvonokApiException(Exception):
     """Custom zvonok API exception."""
@@ -13,6 +19,58 @@ class ZvonokApiException(Exception):
     pass
 
 
+class CircuitOpenException(ZvonokApiException):
+    """Request was not sent because Zvonok API circuit is open."""
+
+    pass
+
+
+def parse_retry_after(value: tp.Optional[str]) -> tp.Optional[float]:
+    """
+    Parse Retry-After header value.
+
+    Arguments:
+        value: Header value, either delay in seconds or HTTP date.
+
+    Returns:
+        delay: Number of seconds to wait or None if header is absent or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_call_status(resp_data: tp.Any) -> tp.Optional[bool]:
+    """
+    Parse outcome of the latest call from check call response.
+
+    Arguments:
+        resp_data: Parsed json of check call response, either call info or list of calls of the phone.
+
+    Returns:
+        answered: True if the call was answered, False if it finished without answer, None if it is in progress.
+    """
+    if isinstance(resp_data, dict) and isinstance(resp_data.get("data"), list):
+        resp_data = resp_data["data"]
+    if isinstance(resp_data, list):
+        resp_data = resp_data[-1] if resp_data else {}
+    if not isinstance(resp_data, dict):
+        return None
+    status = resp_data.get("status")
+    if status in ANSWERED_CALL_STATUSES:
+        return True
+    if status in UNANSWERED_CALL_STATUSES:
+        return False
+    return None
+
+
 def check_request(request_func: tp.Callable) -> tp.Callable:
     """Decorate for status checking of zvonok API response."""
     @wraps(request_func)
@@ -32,3 +90,24 @@ def check_request(request_func: tp.Callable) -> tp.Callable:
         return resp_data
 
     return __wrapper
+
+
+def async_check_request(request_func: tp.Callable) -> tp.Callable:
+    """Decorate for status checking of zvonok API response in coroutines."""
+    @wraps(request_func)
+    async def __wrapper(*args, **kwargs):
+        resp = await request_func(*args, **kwargs)
+        if resp.status >= 400:
+            raise ZvonokApiException(
+                f"Api method with url = {resp.url} responded with code = {resp.status}"
+            )
+        try:
+            resp_data = await resp.json(content_type=None)
+        except Exception:
+            raise ZvonokApiException("Failed to parse json from Zvonok api response")
+        if resp_data.get("status") == "error":
+            raise ZvonokApiException(f"Zvonok api responded with error = {resp_data}")
+
+        return resp_data
+
+    return __wrapper
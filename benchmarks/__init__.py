@@ -0,0 +1 @@
+"""Benchmarks of AlarmCallBot hot paths."""
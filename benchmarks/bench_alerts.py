@@ -0,0 +1,129 @@
+"""
+Alert-to-last-dial latency benchmark with N subscribers on duty.
+
+Synthetic alerts are posted by the local Telegram stand-in and handled by
+AlarmCallBot in polling mode, every alert dials all subscribers through the
+local Zvonok stand-in with configurable latency, error and throttling rates.
+Storage engines are compared by running the same load with --storage.
+
+Usage: python -m benchmarks.bench_alerts [--alerts N] [--subscribers N] [--latency SECONDS]
+    [--error-rate P] [--throttle-rate P] [--campaigns N] [--campaign-latency SECONDS] [--sharding STRATEGY]
+    [--storage ENGINE]
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import threading
+import time
+import typing as tp
+
+import telebot
+
+from AlarmCallBot import db
+from AlarmCallBot.bot.Bot import AlarmCallBot
+from AlarmCallBot.configs import Config
+from AlarmCallBot.storage.SQLite import SQLiteStorage
+from AlarmCallBot.storage.Utils import STORAGES
+from AlarmCallBot.zvonok_api.Sharding import HASH, STRATEGIES
+
+from .bench_ingestion import percentile
+from .fake_telegram import FakeTelegram
+from .fake_zvonok import FakeZvonok
+
+CHANNEL_ID = -1001
+
+
+def run(n_alerts: int, n_subscribers: int, zvonok: FakeZvonok, campaign_ids: tp.Sequence[str] = (),
+        sharding: str = "hash", storage: str = "sqlite",
+        db_path: str = "calls.db") -> tp.Tuple[tp.List[float], float]:
+    """
+    Measure alert-to-last-dial latency in milliseconds for every alert.
+
+    Returns:
+        timings: Latency of every alert.
+        duration: Number of seconds from the first alert to the last dial.
+    """
+    telegram = FakeTelegram()
+    telegram.start()
+    zvonok.start()
+    telebot.apihelper.API_URL = telegram.api_url
+
+    config = Config.TestConfig(
+        ZVONOK_API_URI=zvonok.url,
+        ZVONOK_API_TOKEN="fake",
+        CHANNELS_WITH_ALERTS={CHANNEL_ID},
+        ALERT_COALESCE_WINDOW=0,
+        ZVONOK_CAMPAIGN_IDS=list(campaign_ids),
+        ZVONOK_SHARDING=sharding,
+        DB_STORAGE=storage,
+        DB_PATH=db_path,
+    )
+    bot = AlarmCallBot(config=config)
+    now = datetime.datetime.now()
+    for user_id in range(1, n_subscribers + 1):
+        db.add_phone(user_id, f"+7{user_id:010d}")
+        db.add_call(user_id, now, now + datetime.timedelta(hours=1))
+
+    thread = threading.Thread(target=bot.start_polling, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+    timings = []
+    first_start = time.monotonic()
+    for i in range(n_alerts):
+        start = time.monotonic()
+        telegram.push_channel_post(CHANNEL_ID, f"Alert #{i}")
+        if not zvonok.wait_for_calls((i + 1) * n_subscribers):
+            raise RuntimeError(f"Alert #{i} was not dialed to all subscribers")
+        timings.append((zvonok.calls[(i + 1) * n_subscribers - 1] - start) * 1000)
+    duration = zvonok.calls[-1] - first_start
+
+    bot.stop()
+    telegram.release()
+    thread.join()
+    telegram.stop()
+    zvonok.stop()
+    return timings, duration
+
+
+def main() -> None:
+    """Run benchmark and print latency percentiles and request rate."""
+    parser = argparse.ArgumentParser(description="Alert-to-last-dial latency benchmark")
+    parser.add_argument("--alerts", type=int, default=10)
+    parser.add_argument("--subscribers", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.02)
+    parser.add_argument("--campaigns", type=int, default=1)
+    parser.add_argument("--campaign-latency", type=float, default=0.0)
+    parser.add_argument("--sharding", choices=STRATEGIES, default=HASH)
+    parser.add_argument("--storage", choices=sorted(STORAGES), default=SQLiteStorage.NAME)
+    args = parser.parse_args()
+
+    os.environ.setdefault("TELEGRAM_API_TOKEN", "1:fake")
+    zvonok = FakeZvonok(
+        latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        campaign_latency=args.campaign_latency,
+    )
+    campaign_ids = [str(100 + i) for i in range(args.campaigns)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        timings, duration = run(
+            args.alerts, args.subscribers, zvonok, campaign_ids, args.sharding, args.storage,
+            os.path.join(tmp_dir, "calls.db"),
+        )
+        db.close_connection()
+
+    print(f"{args.alerts} alerts, {args.subscribers} subscribers, latency {args.latency * 1000:.0f} ms, "
+          f"{args.error_rate:.0%} errors, {args.throttle_rate:.0%} throttled, {args.storage} storage")
+    print(f"{'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9} {'req/s':>9} {'calls/s':>9} {'500':>5} {'429':>5}")
+    print(
+        f"{percentile(timings, 50):>9.2f} {percentile(timings, 95):>9.2f} {percentile(timings, 99):>9.2f} "
+        f"{len(zvonok.requests) / duration:>9.1f} {len(zvonok.calls) / duration:>9.1f} "
+        f"{zvonok.count(500):>5} {zvonok.count(429):>5}"
+    )
+    print("calls by campaign: " + ", ".join(f"{c}={n}" for c, n in sorted(zvonok.campaign_calls.items())))
+
+
+if __name__ == "__main__":
+    main()
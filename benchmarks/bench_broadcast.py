@@ -0,0 +1,101 @@
+"""
+Alert broadcast benchmark with N users on duty.
+
+One synthetic alert is posted by the local Telegram stand-in and handled by
+AlarmCallBot in polling mode, which sends the alert text to every user on duty
+while dialing them through the local Zvonok stand-in. The Telegram stand-in
+throttles free messages above the rate given like the Bot API does.
+
+Usage: python -m benchmarks.bench_broadcast [--users N] [--rate N] [--paid] [--latency SECONDS]
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import threading
+import time
+import typing as tp
+
+import telebot
+
+from AlarmCallBot import db
+from AlarmCallBot.bot.Bot import AlarmCallBot
+from AlarmCallBot.configs import Config
+
+from .fake_telegram import FakeTelegram
+from .fake_zvonok import FakeZvonok
+
+CHANNEL_ID = -1001
+
+
+def run(n_users: int, telegram: FakeTelegram, zvonok: FakeZvonok, paid: bool,
+        db_path: str) -> tp.Tuple[float, float]:
+    """
+    Measure time from the alert to the last message and to the last dial.
+
+    Returns:
+        broadcast: Number of seconds until the last user got the message.
+        dial: Number of seconds until the last user was dialed.
+    """
+    telegram.start()
+    zvonok.start()
+    telebot.apihelper.API_URL = telegram.api_url
+
+    config = Config.TestConfig(
+        ZVONOK_API_URI=zvonok.url,
+        ZVONOK_API_TOKEN="fake",
+        CHANNELS_WITH_ALERTS={CHANNEL_ID},
+        ALERT_COALESCE_WINDOW=0,
+        TELEGRAM_PAID_BROADCAST=paid,
+        DB_PATH=db_path,
+    )
+    bot = AlarmCallBot(config=config)
+    now = datetime.datetime.now()
+    for user_id in range(1, n_users + 1):
+        db.add_phone(user_id, f"+7{user_id:010d}")
+        db.add_call(user_id, now, now + datetime.timedelta(hours=1))
+
+    thread = threading.Thread(target=bot.start_polling, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+    start = time.monotonic()
+    telegram.push_channel_post(CHANNEL_ID, "Alert")
+    if not telegram.wait_for_sent(n_users, timeout=600):
+        raise RuntimeError("Alert was not sent to all users")
+    broadcast = telegram.sent[n_users - 1][0] - start
+    if not zvonok.wait_for_calls(n_users, timeout=600):
+        raise RuntimeError("Alert was not dialed to all users")
+    dial = zvonok.calls[n_users - 1] - start
+
+    bot.stop()
+    telegram.release()
+    thread.join()
+    telegram.stop()
+    zvonok.stop()
+    return broadcast, dial
+
+
+def main() -> None:
+    """Run benchmark and print time to the last message and to the last dial."""
+    parser = argparse.ArgumentParser(description="Alert broadcast benchmark")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=30, help="free messages per second allowed by Telegram")
+    parser.add_argument("--paid", action="store_true", help="send alerts as paid broadcast")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    os.environ.setdefault("TELEGRAM_API_TOKEN", "1:fake")
+    telegram = FakeTelegram(message_rate=args.rate)
+    zvonok = FakeZvonok(latency=args.latency, error_rate=0, throttle_rate=0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        broadcast, dial = run(args.users, telegram, zvonok, args.paid, os.path.join(tmp_dir, "calls.db"))
+        db.close_connection()
+
+    print(f"{args.users} users, {'paid' if args.paid else 'free'} broadcast, free limit {args.rate:.0f} msg/s")
+    print(f"{'broadcast, s':>13} {'msg/s':>9} {'429':>5} {'last dial, s':>13}")
+    print(f"{broadcast:>13.2f} {args.users / broadcast:>9.1f} {telegram.throttled:>5} {dial:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
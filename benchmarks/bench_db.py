@@ -0,0 +1,99 @@
+"""
+Alert query latency benchmark: legacy schema against the migrated one,
+and phone lookup latency with and without the phone cache.
+
+Usage: python -m benchmarks.bench_db [N_CALLS ...]
+"""
+import datetime
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import typing as tp
+
+from AlarmCallBot import db
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+N_ACTIVE = 200
+N_REPEATS = 20
+
+LEGACY_QUERY = """
+    SELECT DISTINCT phone
+    FROM phones as a
+    JOIN (SELECT * FROM calls WHERE date_expired>?) as b
+    ON a.user_id = b.user_id
+"""
+
+
+def fill_legacy_db(path: str, n_calls: int, now: datetime.datetime) -> None:
+    """Create database with schema before migrations, N_ACTIVE calls of n_calls are not expired."""
+    n_users = max(N_ACTIVE, n_calls // 10)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE calls (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+        "date_created TIMESTAMP, date_expired TIMESTAMP)"
+    )
+    conn.execute("CREATE TABLE phones (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, phone TEXT)")
+    past = str(now - datetime.timedelta(days=30))
+    future = str(now + datetime.timedelta(hours=8))
+    conn.executemany(
+        "INSERT INTO calls (user_id, date_created, date_expired) VALUES (?, ?, ?)",
+        ((i % n_users, past, future if i < N_ACTIVE else past) for i in range(n_calls)),
+    )
+    conn.executemany(
+        "INSERT INTO phones (user_id, phone) VALUES (?, ?)",
+        ((user_id, f"+7{user_id:010d}") for user_id in range(n_users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(query: tp.Callable[[], tp.List[str]]) -> float:
+    """Get median query latency in milliseconds."""
+    timings = []
+    for _ in range(N_REPEATS):
+        start = time.perf_counter()
+        query()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(sizes: tp.List[int]) -> None:
+    """Run benchmark for each number of call rows given."""
+    now = datetime.datetime.now()
+    print(
+        f"{'calls':>10} {'legacy, ms':>12} {'migrated, ms':>13} {'migration, s':>13} "
+        f"{'phone, us':>10} {'cached, us':>11}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_calls in sizes:
+            path = os.path.join(tmp_dir, f"calls_{n_calls}.db")
+            fill_legacy_db(path, n_calls, now)
+
+            conn = sqlite3.connect(path)
+            legacy = measure(lambda: conn.execute(LEGACY_QUERY, (str(now),)).fetchall())
+            conn.close()
+
+            db.DB_PATH = path
+            db.close_connection()
+            start = time.perf_counter()
+            db.init_db()
+            migration = time.perf_counter() - start
+            migrated = measure(lambda: db.get_phones_to_call(now))
+            assert len(db.get_phones_to_call(now)) == N_ACTIVE
+            db.configure_phone_cache(max_size=0)
+            phone = measure(lambda: db.get_phone(N_ACTIVE)) * 1000
+            db.configure_phone_cache()
+            cached = measure(lambda: db.get_phone(N_ACTIVE)) * 1000
+            db.close_connection()
+
+            print(
+                f"{n_calls:>10} {legacy:>12.3f} {migrated:>13.3f} {migration:>13.2f} "
+                f"{phone:>10.1f} {cached:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
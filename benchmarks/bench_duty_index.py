@@ -0,0 +1,40 @@
+"""
+Alert lookup benchmark: SQL query against the in-memory active duty index.
+
+Usage: python -m benchmarks.bench_duty_index [N_CALLS ...]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import typing as tp
+
+from AlarmCallBot import db
+
+from .bench_db import fill_legacy_db, measure
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def main(sizes: tp.List[int]) -> None:
+    """Run benchmark for each number of call rows given."""
+    now = datetime.datetime.now()
+    print(f"{'calls':>10} {'sql, ms':>10} {'index, ms':>10} {'consistent':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_calls in sizes:
+            path = os.path.join(tmp_dir, f"calls_{n_calls}.db")
+            fill_legacy_db(path, n_calls, now)
+            db.DB_PATH = path
+            db.close_connection()
+            db.init_db()
+
+            sql = measure(lambda: db.get_phones_to_call(now))
+            index = measure(lambda: db.get_active_phones(now))
+            consistent = db.check_active_index(now)
+            db.close_connection()
+
+            print(f"{n_calls:>10} {sql:>10.3f} {index:>10.3f} {str(consistent):>11}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
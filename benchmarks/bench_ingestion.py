@@ -0,0 +1,101 @@
+"""
+Update-to-dial latency benchmark: long polling against webhook.
+
+Channel posts are delivered by the local Telegram stand-in, latency is measured
+until the local Zvonok stand-in receives the call request.
+
+Usage: python -m benchmarks.bench_ingestion [N_ALERTS]
+"""
+import datetime
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import typing as tp
+
+import telebot
+
+from AlarmCallBot import db
+from AlarmCallBot.bot.Bot import AlarmCallBot
+from AlarmCallBot.configs import Config
+
+from .fake_telegram import FakeTelegram
+from .fake_zvonok import FakeZvonok
+
+CHANNEL_ID = -1001
+DEFAULT_N_ALERTS = 50
+
+
+def free_port() -> int:
+    """Get free local port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(timings: tp.List[float], q: int) -> float:
+    """Get q-th percentile of timings."""
+    return statistics.quantiles(timings, n=100, method="inclusive")[q - 1]
+
+
+def run(mode: str, n_alerts: int, db_path: str) -> tp.List[float]:
+    """Measure update-to-dial latency in milliseconds for every alert."""
+    telegram = FakeTelegram()
+    zvonok = FakeZvonok()
+    telegram.start()
+    zvonok.start()
+    telebot.apihelper.API_URL = telegram.api_url
+
+    config = Config.TestConfig(
+        ZVONOK_API_URI=zvonok.url,
+        ZVONOK_API_TOKEN="fake",
+        CHANNELS_WITH_ALERTS={CHANNEL_ID},
+        ALERT_COALESCE_WINDOW=0,
+        DB_PATH=db_path,
+    )
+    bot = AlarmCallBot(config=config)
+    now = datetime.datetime.now()
+    db.add_phone(1, "+70000000001")
+    db.add_call(1, now, now + datetime.timedelta(hours=1))
+
+    if mode == "webhook":
+        port = free_port()
+        target: tp.Callable[[], None] = lambda: bot.start_webhook(url=f"http://127.0.0.1:{port}/", port=port)
+    else:
+        target = bot.start_polling
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+    timings = []
+    for i in range(n_alerts):
+        start = time.monotonic()
+        telegram.push_channel_post(CHANNEL_ID, f"Alert #{i}")
+        zvonok.wait_for(i + 1)
+        timings.append((zvonok.requests[i][0] - start) * 1000)
+
+    bot.stop()
+    telegram.release()
+    thread.join()
+    telegram.stop()
+    zvonok.stop()
+    return timings
+
+
+def main(n_alerts: int) -> None:
+    """Run benchmark in both modes."""
+    os.environ.setdefault("TELEGRAM_API_TOKEN", "1:fake")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'mode':>8} {'p50, ms':>9} {'p95, ms':>9} {'max, ms':>9}")
+        for mode in ("polling", "webhook"):
+            db.close_connection()
+            timings = run(mode, n_alerts, os.path.join(tmp_dir, f"{mode}.db"))
+            print(f"{mode:>8} {percentile(timings, 50):>9.2f} {percentile(timings, 95):>9.2f} {max(timings):>9.2f}")
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_N_ALERTS)
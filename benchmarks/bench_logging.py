@@ -0,0 +1,98 @@
+"""
+Handler logging latency benchmark: synchronous file handler against queue handler.
+
+The logging done by the channel post handler for one alert is repeated with
+the previous setup (file handler on the root logger, f-strings, full phone
+list) and with setup_queue_logging (queue handler, %-style args, capped phone list).
+
+Usage: python -m benchmarks.bench_logging [--alerts N] [--phones N] [--disk-latency SECONDS]
+"""
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+import typing as tp
+from logging.handlers import TimedRotatingFileHandler
+
+from AlarmCallBot.logs import LOG_FORMAT, CappedList, setup_queue_logging
+
+from .bench_ingestion import percentile
+
+logger = logging.getLogger("AlarmCallBot.bot.Bot")
+
+
+class _SlowFileHandler(TimedRotatingFileHandler):
+    """File handler which waits before every write to emulate a slow disk."""
+
+    latency = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Wait and write record."""
+        if self.latency:
+            time.sleep(self.latency)
+        super().emit(record)
+
+
+def handle_alert_before(phones: tp.List[str]) -> None:
+    """Log an alert the way the handler did before."""
+    logger.info(f"Setting calls for phones = ({','.join(phones)})")
+    logger.info(f"Calls wave finished in {0.5:.2f}s: {len(phones)} succeeded, {0} failed")
+
+
+def handle_alert_after(phones: tp.List[str]) -> None:
+    """Log an alert the way the handler does now."""
+    logger.info("Setting calls for %s phones = (%s)", len(phones), CappedList(phones))
+    logger.info("Calls wave finished in %.2fs: %s succeeded, %s failed", 0.5, len(phones), 0)
+
+
+def measure(handle: tp.Callable[[tp.List[str]], None], phones: tp.List[str], n_alerts: int) -> tp.List[float]:
+    """Measure logging time of every alert in microseconds."""
+    timings = []
+    for _ in range(n_alerts):
+        start = time.perf_counter()
+        handle(phones)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def reset_root_logger() -> None:
+    """Remove and close all root handlers."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def main() -> None:
+    """Run benchmark and print per-alert logging latency."""
+    parser = argparse.ArgumentParser(description="Handler logging latency benchmark")
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--phones", type=int, default=200)
+    parser.add_argument("--disk-latency", type=float, default=0.0005)
+    args = parser.parse_args()
+    _SlowFileHandler.latency = args.disk_latency
+    phones = [f"+7{i:010d}" for i in range(args.phones)]
+
+    print(f"{args.alerts} alerts, {args.phones} phones, disk latency {args.disk_latency * 1000:.1f} ms per record")
+    print(f"{'setup':>8} {'mean, us':>10} {'p50, us':>10} {'p99, us':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for setup, handle in (("before", handle_alert_before), ("after", handle_alert_after)):
+            handler = _SlowFileHandler(f"{tmp_dir}/{setup}.log", when="midnight")
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            if setup == "before":
+                logging.getLogger().addHandler(handler)
+                logging.getLogger().setLevel(logging.INFO)
+                listener = None
+            else:
+                listener = setup_queue_logging([handler], queue_size=args.alerts * 2)
+            timings = measure(handle, phones, args.alerts)
+            if listener is not None:
+                listener.stop()
+            reset_root_logger()
+            print(f"{setup:>8} {statistics.mean(timings):>10.1f} {percentile(timings, 50):>10.1f} "
+                  f"{percentile(timings, 99):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Cold start benchmark: import time and process start to first dial.
+
+Import time of the bot module is taken from python -X importtime. Cold start
+is measured from spawning a fresh bot process until the local Zvonok stand-in
+receives the call for a channel post which was waiting in getUpdates.
+
+Usage: python -m benchmarks.bench_startup [--runs N] [--top N]
+"""
+import argparse
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as tp
+
+from AlarmCallBot import db
+
+from .fake_telegram import FakeTelegram
+from .fake_zvonok import FakeZvonok
+
+CHANNEL_ID = -1001
+
+CHILD = """
+import sys
+import threading
+import telebot
+from AlarmCallBot.bot.Bot import AlarmCallBot
+from AlarmCallBot.configs import Config
+
+db_path, telebot.apihelper.API_URL, zvonok_url, channel_id = sys.argv[1:]
+config = Config.TestConfig(
+    ZVONOK_API_URI=zvonok_url, CHANNELS_WITH_ALERTS={int(channel_id)}, METRICS_PORT=None, DB_PATH=db_path
+)
+bot = AlarmCallBot(config=config)
+thread = threading.Thread(target=bot.start_polling)
+thread.start()
+sys.stdin.read()
+bot.stop()
+thread.join()
+"""
+
+
+def import_times(module: str) -> tp.List[tp.Tuple[str, int]]:
+    """
+    Get cumulative import time of the module and of its imports in microseconds.
+
+    Returns:
+        times: Pairs (module, time) sorted by time descending.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(cumulative)))
+    return sorted(times, key=lambda item: item[1], reverse=True)
+
+
+def prepare_db(db_path: str) -> None:
+    """Create database with one subscriber on duty."""
+    db.DB_PATH = db_path
+    db.init_db()
+    now = datetime.datetime.now()
+    db.add_phone(1, "+70000000001")
+    db.add_call(1, now, now + datetime.timedelta(hours=1))
+    db.close_connection()
+
+
+def cold_start(db_path: str, zvonok: FakeZvonok) -> float:
+    """Measure milliseconds from spawning the bot until the first call request."""
+    prepare_db(db_path)
+    telegram = FakeTelegram()
+    telegram.start()
+    telegram.push_channel_post(CHANNEL_ID, "Alert")
+    n_calls = len(zvonok.calls)
+    env = dict(os.environ, TELEGRAM_API_TOKEN="1:fake", ZVONOK_API_TOKEN="fake")
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-c", CHILD, db_path, telegram.api_url, zvonok.url, str(CHANNEL_ID)],
+        env=env, stdin=subprocess.PIPE,
+    )
+    try:
+        if not zvonok.wait_for_calls(n_calls + 1, timeout=30):
+            raise RuntimeError("Bot did not dial after start")
+        return (zvonok.calls[n_calls] - start) * 1000
+    finally:
+        process.stdin.close()
+        telegram.release()
+        process.wait()
+        telegram.stop()
+
+
+def main() -> None:
+    """Run benchmark and print import time and cold start latency."""
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    times = import_times("AlarmCallBot.bot.Bot")
+    print(f"{'module':<40} {'cumulative, ms':>15}")
+    for name, cumulative in times[:args.top]:
+        print(f"{name:<40} {cumulative / 1000:>15.1f}")
+
+    zvonok = FakeZvonok(latency=0)
+    zvonok.start()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        timings = [cold_start(os.path.join(tmp_dir, f"calls{i}.db"), zvonok) for i in range(args.runs)]
+    zvonok.stop()
+
+    print(f"\n{args.runs} cold starts to first dial")
+    print(f"{'median, ms':>11} {'min, ms':>9} {'max, ms':>9}")
+    print(f"{statistics.median(timings):>11.1f} {min(timings):>9.1f} {max(timings):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
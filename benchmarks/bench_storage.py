@@ -0,0 +1,69 @@
+"""
+Storage engine benchmark: the same load on every engine.
+
+Every engine gets N users with phones and calls, then answers the lookups of
+chat commands and alerts and runs dial outbox and call status updates of one
+alert wave to every user.
+
+Usage: python -m benchmarks.bench_storage [N_USERS ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import typing as tp
+
+from AlarmCallBot.storage.Base import CALL_ANSWERED, Storage
+from AlarmCallBot.storage.Utils import STORAGES, create_storage
+
+DEFAULT_SIZES = [1_000, 10_000]
+NOW = 1_700_000_000
+
+
+def run(storage: Storage, n_users: int) -> tp.Dict[str, float]:
+    """Get milliseconds per step of the load."""
+    storage.init(force=True)
+    timings = {}
+
+    start = time.perf_counter()
+    for user_id in range(n_users):
+        storage.write([(user_id, NOW, NOW + 3600)], [(user_id, f"+7{user_id:010d}")])
+    timings["write"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in range(n_users):
+        storage.get_phone(user_id)
+    timings["get_phone"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    phones = storage.get_phones_to_call(NOW)
+    timings["phones_to_call"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dials = storage.add_dials("alert", phones, NOW)
+    for dial_id, _ in dials:
+        storage.finish_dial(dial_id, None, 3, NOW)
+    storage.add_tracked_calls("alert", phones, NOW)
+    for phone in phones:
+        storage.update_call_status(phone, CALL_ANSWERED, 1, 0, NOW)
+    timings["wave"] = time.perf_counter() - start
+    return {step: seconds * 1000 for step, seconds in timings.items()}
+
+
+def main(sizes: tp.List[int]) -> None:
+    """Run benchmark for every engine and number of users given."""
+    print(f"{'users':>8} {'engine':>7} {'write, ms':>10} {'get_phone, ms':>14} {'to call, ms':>12} {'wave, ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_users in sizes:
+            for name in STORAGES:
+                storage = create_storage(name, os.path.join(tmp_dir, f"{name}_{n_users}.db"))
+                timings = run(storage, n_users)
+                storage.close()
+                print(
+                    f"{n_users:>8} {name:>7} {timings['write']:>10.1f} {timings['get_phone']:>14.1f} "
+                    f"{timings['phones_to_call']:>12.2f} {timings['wave']:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,77 @@
+"""
+Duty reminder timers benchmark: timing wheel against a heap.
+
+Measures time to schedule N timers spread over the next hours, to replace
+every timer once, as a user extending the duty does, and to fire all of them.
+
+Usage: python -m benchmarks.bench_timers [N_TIMERS ...]
+"""
+import heapq
+import random
+import sys
+import time
+import typing as tp
+
+from AlarmCallBot.timer_wheel import TimerWheel
+
+DEFAULT_SIZES = [10_000, 100_000]
+HORIZON = 12 * 3600
+
+
+def bench_wheel(deadlines: tp.List[float]) -> tp.Tuple[float, float, float]:
+    """Get seconds to schedule, replace and fire timers in the timing wheel."""
+    now = [0.0]
+    wheel = TimerWheel(tick=1.0, clock=lambda: now[0])
+    start = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        wheel.schedule(key, deadline, lambda: None)
+    schedule = time.perf_counter() - start
+    start = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        wheel.schedule(key, deadline + 60, lambda: None)
+    replace = time.perf_counter() - start
+    start = time.perf_counter()
+    fired = 0
+    while fired < len(deadlines):
+        now[0] += 60
+        fired += wheel.fire_due()
+    fire = time.perf_counter() - start
+    return schedule, replace, fire
+
+
+def bench_heap(deadlines: tp.List[float]) -> tp.Tuple[float, float, float]:
+    """Get seconds to schedule, replace and fire timers in a heap with lazy deletion."""
+    heap: tp.List[tp.Tuple[float, int]] = []
+    current: tp.Dict[int, float] = {}
+    start = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        current[key] = deadline
+        heapq.heappush(heap, (deadline, key))
+    schedule = time.perf_counter() - start
+    start = time.perf_counter()
+    for key, deadline in enumerate(deadlines):
+        current[key] = deadline + 60
+        heapq.heappush(heap, (deadline + 60, key))
+    replace = time.perf_counter() - start
+    start = time.perf_counter()
+    while heap:
+        deadline, key = heapq.heappop(heap)
+        if current.get(key) == deadline:
+            del current[key]
+    fire = time.perf_counter() - start
+    return schedule, replace, fire
+
+
+def main(sizes: tp.List[int]) -> None:
+    """Run benchmark for each number of timers given."""
+    print(f"{'timers':>8} {'':>6} {'schedule, us':>13} {'replace, us':>12} {'fire, us':>9}")
+    for n_timers in sizes:
+        rng = random.Random(0)
+        deadlines = [rng.uniform(0, HORIZON) for _ in range(n_timers)]
+        for name, bench in (("wheel", bench_wheel), ("heap", bench_heap)):
+            schedule, replace, fire = (seconds / n_timers * 1e6 for seconds in bench(deadlines))
+            print(f"{n_timers:>8} {name:>6} {schedule:>13.2f} {replace:>12.2f} {fire:>9.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
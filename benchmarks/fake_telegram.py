@@ -0,0 +1,197 @@
+"""Local stand-in for Telegram Bot API server."""
+import itertools
+import json
+import threading
+import time
+import typing as tp
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _TooManyRequests(Exception):
+    """Message is over the rate limit."""
+
+
+class FakeTelegram:
+    """
+    Local Telegram Bot API stand-in.
+
+    Supports getUpdates long polling, webhooks and records sent messages. Point
+    telebot to it with telebot.apihelper.API_URL = fake_telegram.api_url.
+    Messages above message_rate per second are answered 429 like the Bot API
+    does, except paid broadcast ones.
+
+    Arguments:
+        host: Host to listen on.
+        port: Port to listen on, 0 to pick a free one.
+        message_rate: Maximal number of free messages per second, None for no limit.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, message_rate: tp.Optional[float] = None) -> None:
+        """Create server."""
+        self.__message_rate = message_rate
+        self.__free_sent: tp.List[float] = []
+        self.throttled = 0
+        self.__updates: tp.List[dict] = []
+        self.__update_ids = itertools.count(1)
+        self.__message_ids = itertools.count(1)
+        self.__cond = threading.Condition()
+        self.__closed = False
+        self.webhook_url: tp.Optional[str] = None
+        self.sent: tp.List[tp.Tuple[float, str, dict]] = []
+        self.__server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def api_url(self) -> str:
+        """Url template for telebot.apihelper.API_URL."""
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/bot{{0}}/{{1}}"
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        self.__thread.start()
+
+    def release(self) -> None:
+        """Answer pending and further getUpdates at once, so polling bot can stop."""
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self.release()
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def push_update(self, update: dict) -> int:
+        """
+        Deliver update to the bot, by webhook if it is set, otherwise by getUpdates.
+
+        Arguments:
+            update: Update without update_id.
+
+        Returns:
+            update_id: Id assigned to the update.
+        """
+        update = dict(update, update_id=next(self.__update_ids))
+        if self.webhook_url is not None:
+            request = urllib.request.Request(
+                self.webhook_url,
+                data=json.dumps(update).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            urllib.request.urlopen(request).close()
+        else:
+            with self.__cond:
+                self.__updates.append(update)
+                self.__cond.notify_all()
+        return update["update_id"]
+
+    def wait_for_sent(self, n_messages: int, timeout: float = 60.0) -> bool:
+        """
+        Wait until the number of sent messages reaches n_messages.
+
+        Returns:
+            sent: False if timeout passed first.
+        """
+        with self.__cond:
+            return self.__cond.wait_for(lambda: len(self.sent) >= n_messages, timeout)
+
+    def push_channel_post(self, chat_id: int, text: str) -> int:
+        """
+        Deliver new channel post to the bot.
+
+        Arguments:
+            chat_id: Channel id.
+            text: Post text.
+
+        Returns:
+            update_id: Id assigned to the update.
+        """
+        return self.push_update({"channel_post": {
+            "message_id": next(self.__message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "channel", "title": "Alerts"},
+            "text": text,
+        }})
+
+    def __get_updates(self, params: dict) -> tp.List[dict]:
+        """Answer getUpdates, waiting for updates up to the timeout requested."""
+        offset = int(params.get("offset", 0))
+        deadline = time.monotonic() + float(params.get("timeout", 0))
+        with self.__cond:
+            self.__updates = [update for update in self.__updates if update["update_id"] >= offset]
+            while not self.__updates and not self.__closed and time.monotonic() < deadline:
+                self.__cond.wait(deadline - time.monotonic())
+            return list(self.__updates)
+
+    def call_method(self, method: str, params: dict) -> tp.Any:
+        """Run Bot API method."""
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "AlarmCallBot", "username": "AlarmCallBot"}
+        if method == "getUpdates":
+            return self.__get_updates(params)
+        if method == "setWebhook":
+            self.webhook_url = params.get("url")
+            return True
+        if method == "deleteWebhook":
+            self.webhook_url = None
+            return True
+        if method in ("sendMessage", "forwardMessage"):
+            now = time.monotonic()
+            with self.__cond:
+                if self.__message_rate is not None and params.get("allow_paid_broadcast") != "True":
+                    self.__free_sent = [sent_at for sent_at in self.__free_sent if sent_at > now - 1]
+                    if len(self.__free_sent) >= self.__message_rate:
+                        self.throttled += 1
+                        raise _TooManyRequests()
+                    self.__free_sent.append(now)
+                self.sent.append((now, method, params))
+                self.__cond.notify_all()
+            return {
+                "message_id": next(self.__message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+    def __make_handler(self) -> tp.Type[BaseHTTPRequestHandler]:
+        """Create request handler class bound to this server."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Bot API request handler."""
+
+            def __handle(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                params = dict(urllib.parse.parse_qsl(url.query))
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if body:
+                    params.update(urllib.parse.parse_qsl(body.decode()))
+                try:
+                    result = fake.call_method(url.path.rsplit("/", 1)[-1], params)
+                except _TooManyRequests:
+                    status, answer = 429, {
+                        "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                        "parameters": {"retry_after": 1},
+                    }
+                else:
+                    status, answer = 200, {"ok": True, "result": result}
+                data = json.dumps(answer).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = __handle
+            do_POST = __handle
+
+            def log_message(self, format: str, *args: tp.Any) -> None:
+                pass
+
+        return Handler
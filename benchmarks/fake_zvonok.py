@@ -0,0 +1,188 @@
+"""
+Local stand-in for Zvonok API server.
+
+Usage: python -m benchmarks.fake_zvonok [--port PORT] [--latency SECONDS] [--error-rate P] [--throttle-rate P]
+    [--campaign-latency SECONDS]
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+import typing as tp
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CREATE_CALL_PATH = "/manager/cabapi_external/api/v1/phones/call/"
+
+
+class FakeZvonok:
+    """
+    Local Zvonok API stand-in which records every request.
+
+    Every request is answered after latency seconds. A request fails with 500
+    with probability error_rate and is throttled with 429 with probability
+    throttle_rate, other requests succeed, and every call is reported answered.
+    Create call requests of one campaign are answered one by one, every one
+    after campaign_latency seconds more, like the provider paces dialing.
+
+    Arguments:
+        host: Host to listen on.
+        port: Port to listen on, 0 to pick a free one.
+        latency: Number of seconds to wait before answering.
+        error_rate: Probability of 500 response.
+        throttle_rate: Probability of 429 response.
+        retry_after: Value of Retry-After header sent with 429, None to omit it.
+        seed: Seed of random generator choosing failed requests.
+        campaign_latency: Number of seconds a campaign is busy with one create call request.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: tp.Optional[float] = None, seed: int = 0,
+                 campaign_latency: float = 0.0) -> None:
+        """Create server."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.campaign_latency = campaign_latency
+        self.requests: tp.List[tp.Tuple[float, str, str, int]] = []
+        self.calls: tp.List[float] = []
+        self.campaign_calls: tp.Dict[str, int] = collections.Counter()
+        self.__campaign_locks: tp.Dict[str, threading.Lock] = collections.defaultdict(threading.Lock)
+        self.__random = random.Random(seed)
+        self.__cond = threading.Condition()
+        self.__server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self.__server.daemon_threads = True
+        self.__server.request_queue_size = 128
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Server url for ZvonokManager api_host."""
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def wait_for(self, n_requests: int, timeout: float = 10.0) -> bool:
+        """
+        Wait until the number of requests received reaches n_requests.
+
+        Returns:
+            received: False if timeout passed first.
+        """
+        with self.__cond:
+            return self.__cond.wait_for(lambda: len(self.requests) >= n_requests, timeout)
+
+    def wait_for_calls(self, n_calls: int, timeout: float = 60.0) -> bool:
+        """
+        Wait until the number of successfully created calls reaches n_calls.
+
+        Returns:
+            created: False if timeout passed first.
+        """
+        with self.__cond:
+            return self.__cond.wait_for(lambda: len(self.calls) >= n_calls, timeout)
+
+    def count(self, status: int) -> int:
+        """Get number of requests answered with status given."""
+        with self.__cond:
+            return sum(1 for request in self.requests if request[3] == status)
+
+    def respond(self, path: str, params: dict) -> tp.Tuple[int, dict, tp.Dict[str, str]]:
+        """Answer API request with status, json body and headers."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.campaign_latency and path == CREATE_CALL_PATH:
+            with self.__cond:
+                campaign_lock = self.__campaign_locks[params.get("campaign_id", "")]
+            with campaign_lock:
+                time.sleep(self.campaign_latency)
+        with self.__cond:
+            draw = self.__random.random()
+            headers = {}
+            if draw < self.error_rate:
+                status, response = 500, {"status": "error", "data": "Internal error"}
+            elif draw < self.error_rate + self.throttle_rate:
+                status, response = 429, {"status": "error", "data": "Too many requests"}
+                if self.retry_after is not None:
+                    headers["Retry-After"] = str(self.retry_after)
+            elif path == CREATE_CALL_PATH:
+                status, response = 200, {"status": "ok", "data": {"call_id": len(self.requests)}}
+            else:
+                status, response = 200, [{"phone": params.get("phone", ""), "status": "compl_finished"}]
+            now = time.monotonic()
+            self.requests.append((now, path, params.get("phone", ""), status))
+            if status == 200 and path == CREATE_CALL_PATH:
+                self.calls.append(now)
+                self.campaign_calls[params.get("campaign_id", "")] += 1
+            self.__cond.notify_all()
+        return status, response, headers
+
+    def __make_handler(self) -> tp.Type[BaseHTTPRequestHandler]:
+        """Create request handler class bound to this server."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Zvonok API request handler."""
+
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, response, headers = fake.respond(self.path, dict(urllib.parse.parse_qsl(body.decode())))
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_HEAD(self) -> None:
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: tp.Any) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    """Serve fake Zvonok API until interrupted."""
+    parser = argparse.ArgumentParser(description="Local stand-in for Zvonok API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--campaign-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    zvonok = FakeZvonok(
+        args.host, args.port, args.latency, args.error_rate, args.throttle_rate, args.retry_after,
+        campaign_latency=args.campaign_latency,
+    )
+    zvonok.start()
+    print(f"Serving fake Zvonok API on {zvonok.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        zvonok.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,55 @@ def task_test():
     }
 
 
+def task_bench():
+    """Run benchmarks."""
+    yield {
+        'actions': ['python -m benchmarks.bench_db'],
+        'verbosity': 2,
+        'name': 'db'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_duty_index'],
+        'verbosity': 2,
+        'name': 'duty_index'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_ingestion'],
+        'verbosity': 2,
+        'name': 'ingestion'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_alerts'],
+        'verbosity': 2,
+        'name': 'alerts'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_broadcast --paid'],
+        'verbosity': 2,
+        'name': 'broadcast'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_logging'],
+        'verbosity': 2,
+        'name': 'logging'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_startup'],
+        'verbosity': 2,
+        'name': 'startup'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_timers'],
+        'verbosity': 2,
+        'name': 'timers'
+    }
+    yield {
+        'actions': ['python -m benchmarks.bench_storage'],
+        'verbosity': 2,
+        'name': 'storage'
+    }
+
+
 def task_docstyle():
     """Check docstrings against pydocstyle."""
     return {
@@ -69,7 +118,7 @@ def task_check():
 def task_pot():
     """Re-create .pot."""
     return {
-        'actions': ['pybabel extract -o bot.pot AlarmCallBot/bot'],
+        'actions': ['pybabel extract -k _f -o bot.pot AlarmCallBot/bot'],
         'file_dep': glob.glob('AlarmCallBot/*.py'),
         'targets': ['bot.pot'],
     }
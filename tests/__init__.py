@@ -0,0 +1,16 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from AlarmCallBot import db
+from AlarmCallBot.storage.SQLite import SQLiteStorage
+
+
+def use_temp_storage(test_case: TestCase) -> SQLiteStorage:
+    """Switch db module to a new sqlite3 database in a temporary directory until the test ends."""
+    tmp_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmp_dir.cleanup)
+    test_case.addCleanup(db.set_storage, db.get_storage())
+    storage = SQLiteStorage(os.path.join(tmp_dir.name, "calls.db"))
+    db.set_storage(storage)
+    return storage
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from AlarmCallBot.bot.Coalescer import SUPPRESSED_DIALS, AlertCoalescer
+
+
+class TestAlertCoalescerClass(TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.coalescer = AlertCoalescer(60, clock=lambda: self.now)
+
+    def test_burst_is_coalesced(self):
+        suppressed = SUPPRESSED_DIALS.labels().value
+        self.assertEqual(self.coalescer.filter(["+1", "+2"]), ["+1", "+2"])
+        self.now = 10
+        self.assertEqual(self.coalescer.filter(["+1", "+2", "+3"]), ["+3"])
+        self.assertEqual(self.coalescer.suppressed_dials, 2)
+
+        self.now = 60
+        self.assertEqual(self.coalescer.filter(["+1", "+2", "+3"]), ["+1", "+2"])
+        self.assertEqual(len(self.coalescer), 3)
+        self.assertEqual(self.coalescer.suppressed_dials, 3)
+        self.assertEqual(SUPPRESSED_DIALS.labels().value, suppressed + 3)
+
+    def test_expired_cooldowns_are_evicted(self):
+        self.coalescer.filter(["+1", "+2"])
+        self.now = 100
+        self.coalescer.filter([])
+        self.assertEqual(len(self.coalescer), 0)
+
+    def test_release(self):
+        self.coalescer.filter(["+1", "+2"])
+        self.coalescer.release(["+2"])
+        self.assertEqual(self.coalescer.filter(["+1", "+2"]), ["+2"])
+
+    def test_disabled(self):
+        coalescer = AlertCoalescer(0)
+        self.assertEqual(coalescer.filter(["+1"]), ["+1"])
+        self.assertEqual(coalescer.filter(["+1"]), ["+1"])
+        self.assertEqual(coalescer.suppressed_dials, 0)
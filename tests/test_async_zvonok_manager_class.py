@@ -0,0 +1,100 @@
+from unittest import IsolatedAsyncioTestCase
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from AlarmCallBot.configs import Config
+from AlarmCallBot.zvonok_api.AsyncApi import AsyncZvonokManager
+from AlarmCallBot.zvonok_api.Utils import ZvonokApiException
+
+
+class TestAsyncZvonokManagerClass(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.config = Config.TestConfig()
+        self.requests = []
+        self.fail_first = 0
+        self.fail_status = 503
+
+        async def handler(request):
+            data = await request.post()
+            self.requests.append((request.path, dict(data)))
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return web.json_response({}, status=self.fail_status, headers={"Retry-After": "0"})
+            if data["phone"] == "+bad":
+                return web.json_response({"status": "error", "data": "bad phone"})
+            return web.json_response({"status": "ok"})
+
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.zvonok_manager = AsyncZvonokManager(
+            public_api_key=self.config.ZVONOK_API_TOKEN,
+            campaign_id=self.config.ZVONOK_CAMPAIGN_ID,
+            api_host=str(self.server.make_url("")).rstrip("/"),
+            backoff_factor=0,
+        )
+
+    async def asyncTearDown(self):
+        await self.zvonok_manager.close()
+        await self.server.close()
+
+    async def test_async_zvonok_manager_create_call(self):
+        resp = await self.zvonok_manager.create_call("+11111111111")
+        self.assertEqual(resp, {"status": "ok"})
+        self.assertEqual(self.requests, [(
+            "/manager/cabapi_external/api/v1/phones/call/",
+            {
+                "public_key": self.config.ZVONOK_API_TOKEN,
+                "phone": "+11111111111",
+                "campaign_id": self.config.ZVONOK_CAMPAIGN_ID,
+            },
+        )])
+
+    async def test_async_zvonok_manager_delete_and_check_call(self):
+        await self.zvonok_manager.delete_call("+11111111111")
+        await self.zvonok_manager.check_call("+11111111111")
+        self.assertEqual(
+            [path for path, _ in self.requests],
+            [
+                "/manager/cabapi_external/api/v1/phones/remove_call/",
+                "/manager/cabapi_external/api/v1/phones/call_by_id/",
+            ],
+        )
+
+    async def test_async_zvonok_manager_retries(self):
+        self.fail_first = 2
+        await self.zvonok_manager.create_call("+11111111111")
+        self.assertEqual(len(self.requests), 3)
+
+        self.fail_first = 10
+        with self.assertRaises(ZvonokApiException):
+            await self.zvonok_manager.create_call("+11111111111")
+        self.assertEqual(len(self.requests), 7)
+
+    async def test_async_zvonok_manager_does_not_retry_server_errors(self):
+        self.fail_first = 1
+        self.fail_status = 502
+        with self.assertRaises(ZvonokApiException):
+            await self.zvonok_manager.create_call("+11111111111")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_async_zvonok_manager_retries_connection_errors(self):
+        zvonok_manager = AsyncZvonokManager(
+            public_api_key=self.config.ZVONOK_API_TOKEN,
+            campaign_id=self.config.ZVONOK_CAMPAIGN_ID,
+            api_host="http://127.0.0.1:1",
+            n_retries=2,
+            backoff_factor=0,
+        )
+        async with zvonok_manager:
+            with self.assertRaises(aiohttp.ClientConnectorError):
+                await zvonok_manager.create_call("+11111111111")
+
+    async def test_async_zvonok_manager_create_calls(self):
+        report = await self.zvonok_manager.create_calls(["+1", "+bad", "+2"])
+        self.assertEqual(report.succeeded, ["+1", "+2"])
+        self.assertEqual(report.failed, ["+bad"])
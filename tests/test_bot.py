@@ -0,0 +1,33 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from AlarmCallBot import db
+from AlarmCallBot.bot.Bot import AlarmCallBot
+from AlarmCallBot.configs import Config
+
+
+class TestAlarmCallBotClass(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(db.set_storage, db.get_storage())
+        with patch.dict(os.environ, {"TELEGRAM_API_TOKEN": "1:fake"}):
+            self.bot = AlarmCallBot(config=Config.TestConfig(
+                DB_PATH=os.path.join(self.tmp_dir.name, "calls.db"),
+                DB_WRITE_BEHIND=True,
+                METRICS_PORT=None,
+                ZVONOK_API_URI="http://127.0.0.1:1",
+            ))
+
+    def test_write_behind_is_enabled_on_every_start(self):
+        self.assertFalse(db.is_write_behind_enabled())
+        for _ in range(2):
+            self.bot._AlarmCallBot__start_jobs()
+            try:
+                self.assertTrue(db.is_write_behind_enabled())
+            finally:
+                self.bot._AlarmCallBot__stop_jobs()
+            self.assertFalse(db.is_write_behind_enabled())
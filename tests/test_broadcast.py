@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import Future
+from unittest import TestCase
+
+from AlarmCallBot.bot.Broadcast import Broadcaster
+from AlarmCallBot.bot.Sender import ALERT, MessageSender
+
+
+class _FakeSender:
+
+    def __init__(self):
+        self.messages = []
+        self.futures = []
+        self.kwargs = None
+
+    def submit_many(self, messages, priority, **kwargs):
+        self.messages = list(messages)
+        self.priority = priority
+        self.kwargs = kwargs
+        self.futures = [Future() for _ in self.messages]
+        return self.futures
+
+
+class TestBroadcasterClass(TestCase):
+
+    def test_broadcast_report(self):
+        sender = _FakeSender()
+        broadcast = Broadcaster(sender, {"allow_paid_broadcast": True}).broadcast("1:2", [1, 2, 1, 3], "text")
+        self.assertEqual([chat_id for chat_id, _ in sender.messages], [1, 2, 3])
+        self.assertTrue(all(text.endswith("text") for _, text in sender.messages))
+        self.assertEqual(sender.priority, ALERT)
+        self.assertEqual(sender.kwargs, {"allow_paid_broadcast": True})
+        sender.futures[0].set_result(None)
+        sender.futures[1].set_exception(ConnectionError())
+        self.assertIsNone(broadcast.wait(timeout=0))
+        sender.futures[2].cancel()
+        report = broadcast.wait(timeout=0)
+        self.assertEqual(report.alert_id, "1:2")
+        self.assertEqual(report.sent, [1])
+        self.assertEqual(sorted(report.failed), [2, 3])
+        self.assertGreaterEqual(report.duration, 0)
+
+    def test_add_done_callback(self):
+        sender = _FakeSender()
+        broadcast = Broadcaster(sender).broadcast("1:2", [1, 2], "text")
+        reports = []
+        broadcast.add_done_callback(reports.append)
+        sender.futures[0].set_result(None)
+        self.assertEqual(reports, [])
+        sender.futures[1].set_exception(ConnectionError())
+        self.assertEqual([report.failed for report in reports], [[2]])
+        broadcast.add_done_callback(reports.append)
+        self.assertEqual(len(reports), 2)
+
+    def test_empty_broadcast(self):
+        report = Broadcaster(_FakeSender()).broadcast("1:2", [], "text").wait(timeout=0)
+        self.assertEqual((report.sent, report.failed), ([], []))
+
+    def test_broadcast_through_sender(self):
+        sent = []
+        lock = threading.Lock()
+
+        def send(chat_id, text, **kwargs):
+            with lock:
+                sent.append(chat_id)
+
+        sender = MessageSender(send, rate=1000, chat_interval=0)
+        sender.start()
+        report = Broadcaster(sender).broadcast("1:2", list(range(100)), "text").wait(timeout=5)
+        sender.stop()
+        self.assertEqual(sorted(report.sent), list(range(100)))
+        self.assertEqual(sorted(sent), list(range(100)))
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from AlarmCallBot.cache import CACHE_LOOKUPS, TTLCache
+
+
+class _Source:
+
+    def __init__(self, values):
+        self.values = values
+        self.loads = 0
+
+    def __call__(self, key):
+        self.loads += 1
+        return self.values.get(key)
+
+
+class TestTTLCacheClass(TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.source = _Source({1: "a", 2: "b", 3: "c"})
+        self.cache = TTLCache("test", max_size=2, ttl=10, negative_ttl=1, clock=lambda: self.now[0])
+
+    def test_hits_and_misses(self):
+        hits = CACHE_LOOKUPS.labels("test", "hit").value
+        misses = CACHE_LOOKUPS.labels("test", "miss").value
+        self.assertEqual(self.cache.get_or_load(1, self.source), "a")
+        self.assertEqual(self.cache.get_or_load(1, self.source), "a")
+        self.assertEqual(self.source.loads, 1)
+        self.assertEqual(CACHE_LOOKUPS.labels("test", "hit").value, hits + 1)
+        self.assertEqual(CACHE_LOOKUPS.labels("test", "miss").value, misses + 1)
+
+    def test_ttl(self):
+        self.cache.get_or_load(1, self.source)
+        self.cache.get_or_load(4, self.source)
+        self.now[0] = 5
+        self.assertEqual(self.cache.get_or_load(1, self.source), "a")
+        self.assertIsNone(self.cache.get_or_load(4, self.source))
+        self.assertEqual(self.source.loads, 3)
+        self.now[0] = 11
+        self.cache.get_or_load(1, self.source)
+        self.assertEqual(self.source.loads, 4)
+
+    def test_lru_eviction(self):
+        self.cache.get_or_load(1, self.source)
+        self.cache.get_or_load(2, self.source)
+        self.cache.get_or_load(1, self.source)
+        self.cache.get_or_load(3, self.source)
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get_or_load(1, self.source)
+        self.assertEqual(self.source.loads, 3)
+        self.cache.get_or_load(2, self.source)
+        self.assertEqual(self.source.loads, 4)
+
+    def test_invalidate(self):
+        self.cache.get_or_load(1, self.source)
+        self.source.values[1] = "new"
+        self.cache.invalidate(1)
+        self.assertEqual(self.cache.get_or_load(1, self.source), "new")
+
+    def test_value_loaded_during_invalidation_is_not_cached(self):
+        def load(key):
+            self.cache.invalidate(key)
+            return "old"
+
+        self.assertEqual(self.cache.get_or_load(1, load), "old")
+        self.assertEqual(self.cache.get_or_load(1, self.source), "a")
@@ -0,0 +1,56 @@
+import threading
+import time
+from unittest import TestCase
+
+from AlarmCallBot.zvonok_api.Dispatcher import CallDispatcher
+
+
+class TestCallDispatcherClass(TestCase):
+
+    def test_dispatch_reports_per_phone(self):
+        def dial(phone):
+            if phone == "+2":
+                raise RuntimeError("busy")
+
+        dispatcher = CallDispatcher(dial, max_workers=4)
+        report = dispatcher.dispatch(["+1", "+2", "+3"])
+        dispatcher.shutdown()
+
+        self.assertEqual([result.phone for result in report.results], ["+1", "+2", "+3"])
+        self.assertEqual(report.succeeded, ["+1", "+3"])
+        self.assertEqual(report.failed, ["+2"])
+        self.assertEqual(report.results[1].error, "busy")
+
+    def test_slow_phone_does_not_stall_wave(self):
+        finished = []
+
+        def dial(phone):
+            if phone == "+0":
+                time.sleep(0.5)
+            finished.append(phone)
+
+        dispatcher = CallDispatcher(dial, max_workers=4)
+        report = dispatcher.dispatch([f"+{i}" for i in range(20)])
+        dispatcher.shutdown()
+
+        self.assertEqual(finished[-1], "+0")
+        self.assertEqual(len(report.succeeded), 20)
+        self.assertLess(report.duration, 1.0)
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def dial(phone):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+        dispatcher = CallDispatcher(dial, max_workers=3)
+        dispatcher.dispatch([str(i) for i in range(30)])
+        dispatcher.shutdown()
+
+        self.assertLessEqual(in_flight[1], 3)
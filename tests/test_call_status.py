@@ -0,0 +1,107 @@
+import threading
+import time
+from unittest import TestCase
+
+from AlarmCallBot import db
+from AlarmCallBot.call_status import CallStatusTracker
+from AlarmCallBot.zvonok_api.Utils import parse_call_status
+from tests import use_temp_storage
+
+
+class TestCallStatusTrackerClass(TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+        db.init_db(force=True)
+        self.now = 1000.0
+        self.statuses = {}
+        self.checked = []
+        self.redialed = []
+        self.escalated = []
+        self.lock = threading.Lock()
+        self.tracker = self.make_tracker(lambda: self.now)
+
+    def make_tracker(self, clock, initial_delay=10.0):
+        return CallStatusTracker(
+            self.check,
+            redial=lambda alert_id, phone, redial: self.redialed.append((alert_id, phone, redial)),
+            escalate=lambda phone, alert_ids: self.escalated.append((phone, alert_ids)),
+            initial_delay=initial_delay,
+            max_delay=40.0,
+            max_redials=1,
+            escalate_after=100.0,
+            clock=clock,
+        )
+
+    def check(self, phone):
+        with self.lock:
+            self.checked.append(phone)
+        return {"status": self.statuses.get(phone, "in_process")}
+
+    def states(self):
+        with db.get_connection() as conn:
+            return conn.execute("SELECT alert_id, phone, state FROM call_status ORDER BY id").fetchall()
+
+    def test_backoff_and_answer(self):
+        self.tracker.track("1:1", ["+111111111111"])
+        self.assertEqual(self.tracker.check_due(), 0)
+        for delay in (10.0, 10.0, 20.0, 40.0):
+            self.now += delay - 1
+            self.assertEqual(self.tracker.check_due(), 0)
+            self.now += 1
+            self.assertEqual(self.tracker.check_due(), 1)
+        self.statuses["+111111111111"] = "compl_finished"
+        self.now += 40.0
+        self.tracker.check_due()
+        self.assertEqual(len(self.tracker), 0)
+        self.assertEqual(self.states(), [("1:1", "+111111111111", db.CALL_ANSWERED)])
+        self.assertEqual(self.redialed, [])
+        self.assertEqual(self.escalated, [])
+
+    def test_checks_are_coalesced_per_phone(self):
+        self.tracker.track("1:1", ["+111111111111", "+222222222222"])
+        self.tracker.track("1:2", ["+111111111111"])
+        self.now += 10.0
+        self.assertEqual(self.tracker.check_due(), 2)
+        self.assertCountEqual(self.checked, ["+111111111111", "+222222222222"])
+
+    def test_redial_then_escalate(self):
+        self.statuses["+111111111111"] = "attempts_exc"
+        self.tracker.track("1:1", ["+111111111111"])
+        self.tracker.track("1:2", ["+111111111111"])
+        self.now += 10.0
+        self.tracker.check_due()
+        self.assertEqual(self.redialed, [("1:1", "+111111111111", 1)])
+        self.now += 10.0
+        self.tracker.check_due()
+        self.assertEqual(self.redialed, [("1:1", "+111111111111", 1)])
+        self.assertEqual(self.escalated, [("+111111111111", ["1:1", "1:2"])])
+        self.assertEqual(self.states(), [
+            ("1:1", "+111111111111", db.CALL_UNANSWERED),
+            ("1:2", "+111111111111", db.CALL_UNANSWERED),
+        ])
+
+    def test_escalate_after_timeout(self):
+        self.tracker.track("1:1", ["+111111111111"])
+        while not self.escalated:
+            self.now += 40.0
+            self.tracker.check_due()
+        self.assertGreaterEqual(self.now, 1100.0)
+        self.assertEqual(len(self.tracker), 0)
+
+    def test_start_resumes_tracking(self):
+        db.add_tracked_calls("1:1", ["+111111111111"], db.datetime.datetime.now())
+        self.statuses["+111111111111"] = "compl_nofinished"
+        tracker = self.make_tracker(time.time, initial_delay=0.01)
+        tracker.start()
+        deadline = time.monotonic() + 2
+        while len(tracker) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        tracker.stop()
+        self.assertEqual(self.states(), [("1:1", "+111111111111", db.CALL_ANSWERED)])
+
+    def test_parse_call_status(self):
+        self.assertTrue(parse_call_status([{"status": "attempts_exc"}, {"status": "compl_finished"}]))
+        self.assertFalse(parse_call_status({"data": [{"status": "attempts_exc"}]}))
+        self.assertIsNone(parse_call_status({"status": "in_process"}))
+        self.assertIsNone(parse_call_status([]))
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from AlarmCallBot.zvonok_api.CircuitBreaker import CircuitBreaker
+
+
+class TestCircuitBreakerClass(TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=lambda: self.now)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+        self.breaker.record_success()
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now = 10.0
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.now = 20.0
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
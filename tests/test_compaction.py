@@ -0,0 +1,58 @@
+import datetime
+import time
+from unittest import TestCase
+
+from AlarmCallBot import db
+from AlarmCallBot.compaction import CompactionJob
+from tests import use_temp_storage
+
+
+class TestCompactionJobClass(TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+        db.init_db(force=True)
+        self.now = datetime.datetime.now()
+        hour = datetime.timedelta(hours=1)
+        db.add_phone(10, "+111111111111")
+        db.add_phone(20, "+222222222222")
+        for i in range(5):
+            db.add_call(10, self.now - 3 * hour, self.now - hour)
+        db.add_call(10, self.now - hour, self.now + hour)
+        db.add_call(10, self.now, self.now + 2 * hour)
+        db.add_call(20, self.now, self.now + hour)
+
+    def test_run_once(self):
+        stats = CompactionJob(batch_size=2, vacuum_every=1).run_once()
+        self.assertEqual(stats.deleted_rows, 5)
+        self.assertEqual(stats.merged_rows, 1)
+        self.assertGreaterEqual(stats.reclaimed_bytes, 0)
+
+        with db.get_connection() as conn:
+            rows = conn.execute("SELECT user_id, date_created, date_expired FROM calls ORDER BY user_id").fetchall()
+        hour = datetime.timedelta(hours=1)
+        self.assertEqual(rows, [
+            (10, int((self.now - hour).timestamp()), int((self.now + 2 * hour).timestamp())),
+            (20, int(self.now.timestamp()), int((self.now + hour).timestamp())),
+        ])
+        self.assertTrue(db.check_active_index(self.now))
+
+    def test_vacuum_reclaims_bytes(self):
+        conn = db.get_connection()
+        conn.executemany(
+            "INSERT INTO calls (user_id, date_created, date_expired) VALUES (?, ?, ?)",
+            [(i, 0, 1) for i in range(10000)],
+        )
+        conn.commit()
+        stats = CompactionJob(vacuum_every=1, vacuum_pages=10000).run_once()
+        self.assertEqual(stats.deleted_rows, 10005)
+        self.assertGreater(stats.reclaimed_bytes, 100000)
+
+    def test_start_stop(self):
+        job = CompactionJob(interval=0.01)
+        job.start()
+        time.sleep(0.2)
+        job.stop()
+        with db.get_connection() as conn:
+            n_rows = conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+        self.assertEqual(n_rows, 2)
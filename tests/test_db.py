@@ -1,18 +1,22 @@
 import datetime
-import sqlite3
+import threading
 from unittest import TestCase
 
 from AlarmCallBot import db
+from tests import use_temp_storage
 
 
 class TestDataBaseClass(TestCase):
 
+    def setUp(self):
+        use_temp_storage(self)
+
     def test_conncetion(self):
         self.assertIsNotNone(db.get_connection())
 
     def test_init(self):
         db.init_db(force=True)
-        with sqlite3.connect("calls.db") as conn:
+        with db.get_connection() as conn:
             cursor = conn.execute("SELECT * from calls")
             columns = [desc[0] for desc in cursor.description]
             self.assertEqual(columns, ['id', 'user_id', 'date_created', 'date_expired'])
@@ -27,7 +31,7 @@ class TestDataBaseClass(TestCase):
         date_expired = datetime.datetime(2000, 1, 1, 7, 3, 4)
         db.add_call(10, date_created, date_expired)
 
-        with sqlite3.connect("calls.db") as conn:
+        with db.get_connection() as conn:
             cursor = conn.execute("SELECT * from calls")
             n_rows = len(cursor.fetchall())
             self.assertEqual(n_rows, 1)
@@ -36,7 +40,7 @@ class TestDataBaseClass(TestCase):
         db.init_db(force=True)
         db.add_phone(10, "+111111111111")
 
-        with sqlite3.connect("calls.db") as conn:
+        with db.get_connection() as conn:
             cursor = conn.execute("SELECT * from phones")
             n_rows = len(cursor.fetchall())
             self.assertEqual(n_rows, 1)
@@ -47,6 +51,17 @@ class TestDataBaseClass(TestCase):
         phone = db.get_phone(10)
         self.assertEqual(phone, "+111111111111")
 
+    def test_get_phone_cache(self):
+        db.init_db(force=True)
+        self.assertIsNone(db.get_phone(10))
+        db.add_phone(10, "+111111111111")
+        self.assertEqual(db.get_phone(10), "+111111111111")
+        with db.transaction() as c:
+            c.execute("UPDATE phones SET phone = ? WHERE user_id = ?", ("+222222222222", 10))
+        self.assertEqual(db.get_phone(10), "+111111111111")
+        db.add_phone(10, "+333333333333")
+        self.assertEqual(db.get_phone(10), "+333333333333")
+
     def test_phone_to_call(self):
         db.init_db(force=True)
 
@@ -58,3 +73,124 @@ class TestDataBaseClass(TestCase):
         curr_date = datetime.datetime(2000, 1, 1, 5, 3, 4)
         res = db.get_phones_to_call(curr_date)
         self.assertEqual(res, ["+111111111111"])
+
+    def test_add_phone_replaces_saved_phone(self):
+        db.init_db(force=True)
+        db.add_phone(10, "+111111111111")
+        db.add_phone(10, "+222222222222")
+        self.assertEqual(db.get_phone(10), "+222222222222")
+
+    def test_schema_version(self):
+        db.init_db(force=True)
+        self.assertEqual(db.get_schema_version(db.get_connection()), db.SCHEMA_VERSION)
+
+    def test_migrate_legacy_db(self):
+        db.init_db(force=True)
+        conn = db.get_connection()
+        conn.execute("DROP TABLE calls")
+        conn.execute("DROP TABLE phones")
+        conn.execute("DROP TABLE dial_outbox")
+        conn.execute("DROP TABLE call_status")
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute(
+            "CREATE TABLE calls (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "date_created TIMESTAMP, date_expired TIMESTAMP)"
+        )
+        conn.execute("CREATE TABLE phones (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, phone TEXT)")
+        conn.execute(
+            "INSERT INTO calls (user_id, date_created, date_expired) VALUES (?, ?, ?)",
+            (10, "2000-01-01 02:03:04", "2000-01-01 07:03:04.123456"),
+        )
+        conn.execute("INSERT INTO phones (user_id, phone) VALUES (10, '+111111111111')")
+        conn.execute("INSERT INTO phones (user_id, phone) VALUES (10, '+222222222222')")
+        conn.commit()
+
+        db.init_db()
+
+        self.assertEqual(db.get_schema_version(conn), db.SCHEMA_VERSION)
+        self.assertEqual(db.get_phone(10), "+111111111111")
+        date_expired = conn.execute("SELECT date_expired FROM calls").fetchone()[0]
+        self.assertEqual(date_expired, int(datetime.datetime(2000, 1, 1, 7, 3, 4).timestamp()))
+        self.assertEqual(db.get_phones_to_call(datetime.datetime(2000, 1, 1, 5, 3, 4)), ["+111111111111"])
+        self.assertEqual(db.get_phones_to_call(datetime.datetime(2000, 1, 1, 8, 3, 4)), [])
+
+    def test_active_phones(self):
+        db.init_db(force=True)
+        now = datetime.datetime.now()
+        db.add_phone(10, "+111111111111")
+        db.add_phone(20, "+222222222222")
+        db.add_call(10, now, now + datetime.timedelta(hours=1))
+        db.add_call(30, now, now + datetime.timedelta(hours=1))
+
+        self.assertEqual(db.get_active_phones(now), ["+111111111111"])
+        self.assertEqual(db.get_active_users(now), [(10, "+111111111111")])
+        self.assertTrue(db.check_active_index(now))
+
+        db.add_call(20, now, now + datetime.timedelta(hours=2))
+        db.rebuild_active_index()
+        self.assertTrue(db.check_active_index(now))
+        later = now + datetime.timedelta(hours=1, minutes=30)
+        self.assertEqual(db.get_active_phones(later), ["+222222222222"])
+        self.assertTrue(db.check_active_index(later))
+
+    def test_wal_mode(self):
+        mode = db.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_transaction_rollback(self):
+        db.init_db(force=True)
+        with self.assertRaises(RuntimeError):
+            with db.transaction() as c:
+                c.execute("INSERT INTO phones (user_id, phone) VALUES (10, '+111111111111')")
+                raise RuntimeError
+        self.assertIsNone(db.get_phone(10))
+
+    def test_concurrent_access(self):
+        db.init_db(force=True)
+        now = datetime.datetime.now()
+        n_threads, n_calls = 8, 50
+        for user_id in range(n_threads):
+            db.add_phone(user_id, f"+{user_id}")
+        errors = []
+
+        def write(user_id):
+            try:
+                for _ in range(n_calls):
+                    db.add_call(user_id, now, now + datetime.timedelta(hours=1))
+            except Exception as exc:
+                errors.append(exc)
+
+        def read():
+            try:
+                for _ in range(n_calls):
+                    db.get_phones_to_call(now)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=write, args=(user_id,)) for user_id in range(n_threads)]
+        threads += [threading.Thread(target=read) for _ in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with db.get_connection() as conn:
+            n_rows = conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+        self.assertEqual(n_rows, n_threads * n_calls)
+        self.assertEqual(sorted(db.get_phones_to_call(now)), sorted(f"+{i}" for i in range(n_threads)))
+
+    def test_write_behind(self):
+        db.init_db(force=True)
+        now = datetime.datetime.now()
+        db.enable_write_behind(flush_interval=0.5)
+        try:
+            db.add_phone(10, "+111111111111")
+            db.add_call(10, now, now + datetime.timedelta(hours=1))
+            self.assertEqual(db.get_phone(10), "+111111111111")
+            self.assertEqual(db.get_active_phones(now), ["+111111111111"])
+        finally:
+            db.disable_write_behind()
+
+        self.assertEqual(db.get_phone(10), "+111111111111")
+        self.assertEqual(db.get_phones_to_call(now), ["+111111111111"])
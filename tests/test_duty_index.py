@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from AlarmCallBot.duty_index import ActiveDutyIndex
+
+
+class TestActiveDutyIndexClass(TestCase):
+
+    def test_phones_to_call(self):
+        index = ActiveDutyIndex()
+        index.add_phone(1, "+1")
+        index.add_phone(2, "+2")
+        index.add_phone(3, "+3")
+        index.add_call(1, 100)
+        index.add_call(2, 200)
+        index.add_call(4, 300)
+
+        self.assertEqual(sorted(index.get_phones_to_call(50)), ["+1", "+2"])
+        self.assertEqual(index.get_phones_to_call(100), ["+2"])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get_phones_to_call(300), [])
+        self.assertEqual(len(index), 0)
+
+    def test_users_to_call(self):
+        index = ActiveDutyIndex()
+        index.add_phone(1, "+1")
+        index.add_phone(2, "+1")
+        index.add_call(1, 100)
+        index.add_call(2, 200)
+        index.add_call(3, 200)
+        self.assertEqual(sorted(index.get_users_to_call(50)), [(1, "+1"), (2, "+1")])
+        self.assertEqual(index.get_users_to_call(100), [(2, "+1")])
+
+    def test_extended_call(self):
+        index = ActiveDutyIndex()
+        index.add_phone(1, "+1")
+        index.add_call(1, 100)
+        index.add_call(1, 300)
+        index.add_call(1, 200)
+        self.assertEqual(index.get_phones_to_call(250), ["+1"])
+        self.assertEqual(index.get_phones_to_call(300), [])
+
+    def test_rebuild(self):
+        index = ActiveDutyIndex()
+        index.add_phone(1, "+1")
+        index.add_call(1, 100)
+        index.rebuild([(2, 100), (3, 100)], [(2, "+2"), (3, "+2")])
+        self.assertEqual(index.get_phones_to_call(50), ["+2"])
@@ -0,0 +1,50 @@
+import logging
+from unittest import TestCase
+
+from AlarmCallBot.logs import DROPPED_RECORDS, CappedList, setup_queue_logging
+
+
+class _ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class TestLogs(TestCase):
+
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.root_handlers = list(self.root.handlers)
+        self.root_level = self.root.level
+
+    def tearDown(self):
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+        for handler in self.root_handlers:
+            self.root.addHandler(handler)
+        self.root.setLevel(self.root_level)
+
+    def test_capped_list(self):
+        self.assertEqual(str(CappedList(["a", "b"], limit=2)), "a,b")
+        self.assertEqual(str(CappedList(["a", "b", "c", "d"], limit=2)), "a,b,... (2 more)")
+
+    def test_queue_logging(self):
+        handler = _ListHandler()
+        listener = setup_queue_logging([handler])
+        logging.getLogger("test").info("Phones = (%s)", CappedList(["+1", "+2", "+3"], limit=1))
+        logging.getLogger("test").debug("Skipped")
+        listener.stop()
+        self.assertEqual(handler.messages, ["Phones = (+1,... (2 more))"])
+
+    def test_full_queue_drops_records(self):
+        handler = _ListHandler()
+        listener = setup_queue_logging([handler], queue_size=1)
+        listener.stop()
+        dropped = DROPPED_RECORDS.labels().value
+        for i in range(3):
+            logging.getLogger("test").info("Record %s", i)
+        self.assertEqual(DROPPED_RECORDS.labels().value, dropped + 2)
@@ -0,0 +1,69 @@
+import urllib.error
+import urllib.request
+from unittest import TestCase
+
+from AlarmCallBot import metrics
+
+
+class TestMetricsClasses(TestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter(self):
+        counter = metrics.Counter("requests_total", "Requests.", ("status",), registry=self.registry)
+        counter.labels(200).inc()
+        counter.labels(200).inc(2)
+        counter.labels("a\"b").inc()
+        self.assertEqual(self.registry.render(), (
+            "# HELP requests_total Requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{status="200"} 3.0\n'
+            'requests_total{status="a\\"b"} 1.0\n'
+        ))
+
+    def test_histogram(self):
+        histogram = metrics.Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=self.registry)
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(self.registry.render(), (
+            "# HELP latency_seconds Latency.\n"
+            "# TYPE latency_seconds histogram\n"
+            'latency_seconds_bucket{le="0.1"} 2.0\n'
+            'latency_seconds_bucket{le="1.0"} 3.0\n'
+            'latency_seconds_bucket{le="+Inf"} 4.0\n'
+            "latency_seconds_sum 2.65\n"
+            "latency_seconds_count 4.0\n"
+        ))
+
+    def test_timed(self):
+        histogram = metrics.Histogram("handler_seconds", "Handlers.", ("handler",), registry=self.registry)
+
+        @histogram.labels("start").timed
+        def handler(x):
+            """Handler docstring."""
+            return x * 2
+
+        self.assertEqual(handler(2), 4)
+        self.assertEqual(handler.__doc__, "Handler docstring.")
+        self.assertEqual(histogram.labels("start").snapshot()[0][-1], 0)
+        self.assertEqual(sum(histogram.labels("start").snapshot()[0]), 1)
+
+    def test_gauge(self):
+        metrics.Gauge("depth", "Depth.", lambda: 5, registry=self.registry)
+        metrics.Gauge("broken", "Broken.", lambda: 1 / 0, registry=self.registry)
+        self.assertIn("depth 5.0\n", self.registry.render())
+        self.assertIn("broken nan\n", self.registry.render())
+
+    def test_server(self):
+        metrics.Gauge("depth", "Depth.", lambda: 5, registry=self.registry)
+        server = metrics.MetricsServer(self.registry, port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                self.assertIn("depth 5.0", response.read().decode())
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{server.port}/")
+        finally:
+            server.stop()
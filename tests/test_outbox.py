@@ -0,0 +1,120 @@
+import threading
+import time
+from unittest import TestCase
+
+from AlarmCallBot import db
+from AlarmCallBot.outbox import DialOutbox
+from AlarmCallBot.zvonok_api.Dispatcher import CallDispatcher
+from AlarmCallBot.zvonok_api.Utils import CircuitOpenException
+from tests import use_temp_storage
+
+
+class TestDialOutboxClass(TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+        db.init_db(force=True)
+        self.dialed = []
+        self.failing = set()
+        self.circuit_open = False
+        self.lock = threading.Lock()
+        self.outbox = DialOutbox(CallDispatcher(self.dial, max_workers=4), max_attempts=2, retry_interval=0.01)
+
+    def dial(self, phone):
+        with self.lock:
+            self.dialed.append(phone)
+        if self.circuit_open:
+            raise CircuitOpenException("Circuit is open")
+        if phone in self.failing:
+            raise RuntimeError("Failed")
+
+    def states(self):
+        with db.get_connection() as conn:
+            return dict(conn.execute("SELECT phone, state FROM dial_outbox").fetchall())
+
+    def test_submit_wave(self):
+        self.failing.add("+222222222222")
+        report = self.outbox.submit_wave("1:1", ["+111111111111", "+222222222222"])
+        self.assertEqual(report.succeeded, ["+111111111111"])
+        self.assertEqual(report.failed, ["+222222222222"])
+        self.assertEqual(self.states(), {"+111111111111": db.DIAL_DONE, "+222222222222": db.DIAL_PENDING})
+
+    def test_redelivered_alert_is_not_dialed(self):
+        self.outbox.submit_wave("1:1", ["+111111111111"])
+        report = self.outbox.submit_wave("1:1", ["+111111111111"])
+        self.assertEqual(report.results, [])
+        self.assertEqual(self.dialed, ["+111111111111"])
+
+    def test_drain_retries_until_max_attempts(self):
+        self.failing.add("+111111111111")
+        self.outbox.submit_wave("1:1", ["+111111111111"])
+        self.assertEqual(self.outbox.drain().failed, ["+111111111111"])
+        self.assertEqual(self.outbox.drain().results, [])
+        self.assertEqual(self.dialed, ["+111111111111"] * 2)
+        self.assertEqual(self.states(), {"+111111111111": db.DIAL_FAILED})
+
+    def test_start_resumes_interrupted_dials(self):
+        db.add_dials("1:1", ["+111111111111", "+222222222222"])
+        self.outbox.start()
+        deadline = time.monotonic() + 2
+        while len(self.dialed) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.outbox.stop()
+        self.assertCountEqual(self.dialed, ["+111111111111", "+222222222222"])
+        self.assertEqual(self.states(), {"+111111111111": db.DIAL_DONE, "+222222222222": db.DIAL_DONE})
+
+    def test_on_dialed(self):
+        dialed = []
+        outbox = DialOutbox(
+            CallDispatcher(self.dial), on_dialed=lambda alert_id, phone: dialed.append((alert_id, phone))
+        )
+        self.failing.add("+222222222222")
+        outbox.submit_wave("1:1", ["+111111111111", "+222222222222"])
+        self.assertEqual(dialed, [("1:1", "+111111111111")])
+
+    def test_circuit_open_dials_are_deferred(self):
+        self.circuit_open = True
+        for _ in range(3):
+            self.outbox.submit_wave("1:1", ["+111111111111"])
+            self.outbox.drain()
+        self.assertEqual(self.states(), {"+111111111111": db.DIAL_PENDING})
+        self.circuit_open = False
+        self.assertEqual(self.outbox.drain().succeeded, ["+111111111111"])
+        self.assertEqual(self.states(), {"+111111111111": db.DIAL_DONE})
+
+    def test_stale_dials_are_not_dialed(self):
+        db.add_dials("1:1", ["+111111111111", "+222222222222"])
+        db.reset_in_flight_dials()
+        with db.get_connection() as conn:
+            conn.execute("UPDATE dial_outbox SET created_at = created_at - 3600 WHERE phone = ?", ("+111111111111",))
+        outbox = DialOutbox(CallDispatcher(self.dial), max_age=600)
+        self.assertEqual(outbox.drain().succeeded, ["+222222222222"])
+        self.assertEqual(self.dialed, ["+222222222222"])
+        self.assertEqual(self.states(), {"+111111111111": db.DIAL_FAILED, "+222222222222": db.DIAL_DONE})
+
+    def test_track_calls(self):
+        dialed = []
+        outbox = DialOutbox(
+            CallDispatcher(self.dial), track_calls=True, campaign_for=lambda phone: "7",
+            on_dialed=lambda alert_id, phone: dialed.append((alert_id, phone)),
+        )
+        self.failing.add("+222222222222")
+        outbox.submit_wave("1:1", ["+111111111111", "+222222222222"])
+        self.assertEqual([call[:2] for call in db.get_tracked_calls()], [("1:1", "+111111111111")])
+        self.assertEqual(db.get_tracked_campaigns(), [("+111111111111", "7")])
+        self.assertEqual(dialed, [("1:1", "+111111111111")])
+
+    def test_redial(self):
+        dialed = []
+        outbox = DialOutbox(
+            CallDispatcher(self.dial), track_calls=True,
+            on_dialed=lambda alert_id, phone: dialed.append((alert_id, phone)),
+        )
+        self.failing.add("+111111111111")
+        self.assertEqual(outbox.redial("1:1", "+111111111111", 1).failed, ["+111111111111"])
+        self.failing.clear()
+        self.assertEqual(outbox.drain().succeeded, ["+111111111111"])
+        self.assertEqual(outbox.redial("1:1", "+111111111111", 1).results, [])
+        self.assertEqual(self.dialed, ["+111111111111"] * 2)
+        self.assertEqual(db.get_tracked_calls(), [])
+        self.assertEqual(dialed, [])
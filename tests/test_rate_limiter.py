@@ -0,0 +1,50 @@
+import threading
+import time
+from unittest import TestCase
+
+from AlarmCallBot.zvonok_api.RateLimiter import AdaptiveRateLimiter
+
+
+class TestAdaptiveRateLimiterClass(TestCase):
+
+    def test_throttling_decreases_limits(self):
+        limiter = AdaptiveRateLimiter(rate=40, max_rate=40, concurrency=8, max_concurrency=8)
+        limiter.acquire()
+        limiter.release(429)
+        self.assertEqual(limiter.rate, 20)
+        self.assertEqual(limiter.concurrency, 4)
+
+        limiter.acquire()
+        limiter.release(503)
+        self.assertEqual(limiter.rate, 20)
+
+    def test_success_increases_limits(self):
+        limiter = AdaptiveRateLimiter(rate=50, max_rate=60, concurrency=2, max_concurrency=3, increase=100)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(200)
+        self.assertEqual(limiter.rate, 60)
+        self.assertEqual(limiter.concurrency, 3)
+
+    def test_retry_after_pauses_requests(self):
+        limiter = AdaptiveRateLimiter(rate=100, max_rate=100)
+        limiter.acquire()
+        limiter.release(429, retry_after=0.2)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        limiter.release(200)
+
+    def test_concurrency_limit_and_queue_depth(self):
+        limiter = AdaptiveRateLimiter(rate=100, max_rate=100, concurrency=1, max_concurrency=1)
+        limiter.acquire()
+        waiter = threading.Thread(target=limiter.acquire)
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(limiter.queue_depth, 1)
+        self.assertEqual(limiter.in_flight, 1)
+
+        limiter.release(200)
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(limiter.queue_depth, 0)
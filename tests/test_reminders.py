@@ -0,0 +1,69 @@
+import datetime
+from unittest import TestCase
+
+from AlarmCallBot import db
+from AlarmCallBot.bot.Reminders import DutyReminders
+from tests import use_temp_storage
+
+
+class _FakeSender:
+
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestDutyRemindersClass(TestCase):
+
+    def setUp(self):
+        use_temp_storage(self)
+        db.init_db(force=True)
+        self.now = [datetime.datetime(2030, 1, 1, 12).timestamp()]
+        self.sender = _FakeSender()
+        self.reminders = DutyReminders(self.sender, remind_before=600, clock=lambda: self.now[0])
+
+    def advance(self, seconds):
+        self.now[0] += seconds
+        return self.reminders.fire_due()
+
+    def test_warning_and_end(self):
+        start = datetime.datetime.fromtimestamp(self.now[0])
+        db.add_call(10, start, start + datetime.timedelta(hours=1))
+        self.reminders.schedule(10, start + datetime.timedelta(hours=1))
+        self.assertEqual(len(self.reminders), 2)
+        self.assertEqual(self.advance(2999), 0)
+        self.assertEqual(self.advance(2), 1)
+        self.assertEqual(self.sender.sent, [(10, "Your duty ends in 10 minutes")])
+        self.assertEqual(self.advance(601), 1)
+        self.assertEqual(self.sender.sent[-1][0], 10)
+        self.assertEqual(db.get_duty_ends(start), [])
+        with db.transaction() as c:
+            c.execute("SELECT COUNT(*) FROM calls")
+            self.assertEqual(c.fetchone()[0], 0)
+
+    def test_extended_duty(self):
+        start = datetime.datetime.fromtimestamp(self.now[0])
+        self.reminders.schedule(10, start + datetime.timedelta(minutes=30))
+        self.reminders.schedule(10, start + datetime.timedelta(minutes=60))
+        self.reminders.schedule(10, start + datetime.timedelta(minutes=45))
+        self.assertEqual(self.advance(45 * 60 + 1), 0)
+        self.assertEqual(self.advance(20 * 60), 2)
+        self.assertEqual(len(self.sender.sent), 2)
+
+    def test_short_duty_has_no_warning(self):
+        start = datetime.datetime.fromtimestamp(self.now[0])
+        self.reminders.schedule(10, start + datetime.timedelta(minutes=5))
+        self.assertEqual(len(self.reminders), 1)
+
+    def test_rebuild_skips_passed_reminders(self):
+        start = datetime.datetime.fromtimestamp(self.now[0])
+        db.add_call(10, start, start + datetime.timedelta(hours=1))
+        db.add_call(11, start, start + datetime.timedelta(minutes=5))
+        db.add_call(12, start - datetime.timedelta(hours=2), start - datetime.timedelta(hours=1))
+        self.reminders.start()
+        self.reminders.stop()
+        self.assertEqual(len(self.reminders), 3)
+        self.assertEqual(self.advance(1), 0)
+        self.assertEqual(self.sender.sent, [])
@@ -0,0 +1,102 @@
+import threading
+import time
+from unittest import TestCase
+
+import telebot
+
+from AlarmCallBot.bot.Sender import ALERT, MessageSender, TokenBucket, get_retry_after
+
+
+def _api_error(code, parameters=None):
+    result = {"ok": False, "error_code": code, "description": "error"}
+    if parameters is not None:
+        result["parameters"] = parameters
+    return telebot.apihelper.ApiTelegramException("sendMessage", None, result)
+
+
+class _FakeSend:
+
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+        self.lock = threading.Lock()
+
+    def __call__(self, chat_id, text, **kwargs):
+        with self.lock:
+            errors = self.errors.get(text)
+            if errors:
+                raise errors.pop(0)
+            self.sent.append((time.monotonic(), chat_id, text))
+        return text
+
+
+class TestTokenBucket(TestCase):
+
+    def test_take(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0])
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.5)
+        now[0] = 0.5
+        self.assertEqual(bucket.take(), 0)
+
+
+class TestMessageSenderClass(TestCase):
+
+    def test_alerts_go_first(self):
+        send = _FakeSend()
+        sender = MessageSender(send, rate=100, n_workers=1, chat_interval=0)
+        sender.submit(1, "reply 1")
+        sender.submit(2, "reply 2")
+        sender.submit(3, "alert", priority=ALERT)
+        sender.start()
+        sender.stop()
+        self.assertEqual([text for _, _, text in send.sent], ["alert", "reply 1", "reply 2"])
+
+    def test_chat_pacing_does_not_block_other_chats(self):
+        send = _FakeSend()
+        sender = MessageSender(send, rate=100, chat_interval=0.2)
+        sender.start()
+        futures = [sender.submit(1, "first"), sender.submit(1, "second"), sender.submit(2, "other")]
+        for future in futures:
+            future.result(timeout=2)
+        sender.stop()
+        times = {text: sent_at for sent_at, _, text in send.sent}
+        self.assertEqual([text for _, chat_id, text in send.sent if chat_id == 1], ["first", "second"])
+        self.assertGreaterEqual(times["second"] - times["first"], 0.19)
+        self.assertLess(times["other"], times["second"])
+
+    def test_global_rate(self):
+        send = _FakeSend()
+        sender = MessageSender(send, rate=20, burst=1, chat_interval=0)
+        sender.start()
+        futures = [sender.submit(chat_id, "text") for chat_id in range(6)]
+        for future in futures:
+            future.result(timeout=2)
+        sender.stop()
+        self.assertGreaterEqual(send.sent[-1][0] - send.sent[0][0], 0.24)
+
+    def test_retry_after_throttling(self):
+        send = _FakeSend({"text": [_api_error(429, {"retry_after": 0.2})]})
+        sender = MessageSender(send, rate=100, chat_interval=0, max_attempts=1)
+        sender.start()
+        start = time.monotonic()
+        self.assertEqual(sender.submit(1, "text").result(timeout=2), "text")
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        self.assertEqual(sender.submit(2, "other").result(timeout=2), "other")
+        sender.stop()
+
+    def test_failures(self):
+        send = _FakeSend({"network": [ConnectionError(), ConnectionError()], "blocked": [_api_error(403)]})
+        sender = MessageSender(send, rate=100, chat_interval=0.01, max_attempts=3)
+        sender.start()
+        self.assertEqual(sender.submit(1, "network").result(timeout=2), "network")
+        with self.assertRaises(telebot.apihelper.ApiTelegramException):
+            sender.submit(2, "blocked").result(timeout=2)
+        sender.stop()
+
+    def test_get_retry_after(self):
+        self.assertEqual(get_retry_after(_api_error(429, {"retry_after": 3})), 3)
+        self.assertIsNone(get_retry_after(_api_error(400)))
+        self.assertIsNone(get_retry_after(ConnectionError()))
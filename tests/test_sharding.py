@@ -0,0 +1,77 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from AlarmCallBot.zvonok_api.Sharding import LEAST_LOADED, SHARD_CALLS, ShardedZvonokManager
+from AlarmCallBot.zvonok_api.Utils import ZvonokApiException
+
+
+class TestShardedZvonokManagerClass(TestCase):
+
+    def setUp(self):
+        self.managers = {campaign: MagicMock() for campaign in ("1", "2", "3")}
+
+    def test_hash_sharding(self):
+        manager = ShardedZvonokManager(self.managers)
+        phones = [f"+7{i:010d}" for i in range(30)]
+        campaigns = [manager.hash_campaign(phone) for phone in phones]
+        self.assertEqual(set(campaigns), {"1", "2", "3"})
+        for phone, campaign in zip(phones, campaigns):
+            manager.create_call(phone)
+            self.managers[campaign].create_call.assert_called_with(phone)
+            self.assertEqual(ShardedZvonokManager(self.managers).campaign_for(phone), campaign)
+        self.assertEqual(sum(m.create_call.call_count for m in self.managers.values()), len(phones))
+
+    def test_least_loaded_sharding(self):
+        manager = ShardedZvonokManager(self.managers, strategy=LEAST_LOADED)
+        for i in range(6):
+            manager.create_call(f"+7{i:010d}")
+        for campaign_manager in self.managers.values():
+            self.assertEqual(campaign_manager.create_call.call_count, 2)
+
+    def test_least_loaded_skips_busy_campaign(self):
+        manager = ShardedZvonokManager(self.managers, strategy=LEAST_LOADED)
+        campaigns = []
+
+        def create_call(phone):
+            campaigns.append(manager.campaign_for(phone))
+            if len(campaigns) == 1:
+                manager.create_call("+70000000002")
+                manager.create_call("+70000000003")
+
+        for campaign_manager in self.managers.values():
+            campaign_manager.create_call.side_effect = create_call
+        manager.create_call("+70000000001")
+        self.assertEqual(campaigns, ["1", "2", "3"])
+
+    def test_check_and_delete_go_to_dial_campaign(self):
+        manager = ShardedZvonokManager(self.managers, strategy=LEAST_LOADED)
+        manager.create_call("+70000000001")
+        manager.create_call("+70000000002")
+        manager.check_call("+70000000002")
+        manager.delete_call("+70000000002")
+        self.managers["2"].check_call.assert_called_with("+70000000002")
+        self.managers["2"].delete_call.assert_called_with("+70000000002")
+        self.managers["1"].check_call.assert_not_called()
+
+    def test_restored_campaigns(self):
+        manager = ShardedZvonokManager(self.managers, strategy=LEAST_LOADED)
+        phone = "+70000000001"
+        campaign = next(c for c in ("1", "2", "3") if c != manager.hash_campaign(phone))
+        manager.restore_campaigns([(phone, campaign), ("+70000000002", "9")])
+        manager.check_call(phone)
+        self.managers[campaign].check_call.assert_called_with(phone)
+        self.assertEqual(manager.campaign_for("+70000000002"), manager.hash_campaign("+70000000002"))
+
+    def test_failed_call_counted(self):
+        manager = ShardedZvonokManager({"9": self.managers["1"]})
+        self.managers["1"].create_call.side_effect = ZvonokApiException("error")
+        errors = SHARD_CALLS.labels("9", "error").value
+        with self.assertRaises(ZvonokApiException):
+            manager.create_call("+70000000001")
+        self.assertEqual(SHARD_CALLS.labels("9", "error").value, errors + 1)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ShardedZvonokManager({})
+        with self.assertRaises(ValueError):
+            ShardedZvonokManager(self.managers, strategy="random")
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import TestCase
+
+from AlarmCallBot.storage.Base import CALL_ANSWERED, CALL_TRACKING, DIAL_DONE, DIAL_FAILED, DIAL_PENDING
+from AlarmCallBot.storage.Memory import MemoryStorage
+from AlarmCallBot.storage.SQLite import SQLiteStorage
+from AlarmCallBot.storage.Utils import create_storage
+
+
+class _StorageTests:
+    """Behaviour every storage engine should share."""
+
+    def create_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = self.create_storage()
+        self.storage.init(force=True)
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_calls_and_phones(self):
+        self.storage.write([(1, 0, 100), (1, 0, 200), (2, 0, 50), (3, 0, 300)], [(1, "+1"), (2, "+2")])
+        self.storage.write([], [(1, "+11"), (4, "+11")])
+        self.assertEqual(self.storage.get_phone(1), "+11")
+        self.assertIsNone(self.storage.get_phone(3))
+        self.assertEqual(self.storage.get_user_id("+11"), 1)
+        self.assertIsNone(self.storage.get_user_id("+3"))
+        self.assertEqual(sorted(self.storage.get_phones()), [(1, "+11"), (2, "+2"), (4, "+11")])
+        self.assertEqual(sorted(self.storage.get_phones_to_call(60)), ["+11"])
+        self.assertEqual(sorted(self.storage.get_duty_ends(60)), [(1, 200), (3, 300)])
+
+    def test_delete_and_merge_calls(self):
+        self.storage.write([(1, 0, 100), (1, 10, 200), (1, 20, 150), (2, 0, 50), (2, 0, 250)], [])
+        self.assertEqual(self.storage.merge_active_calls(120), 1)
+        self.assertEqual(sorted(self.storage.get_duty_ends(120)), [(1, 200), (2, 250)])
+        self.assertEqual(self.storage.delete_expired_user_calls(2, 120), 1)
+        self.assertEqual(self.storage.delete_expired_calls(220, batch_size=1), 2)
+        self.assertEqual(self.storage.get_duty_ends(0), [(2, 250)])
+
+    def test_dial_outbox(self):
+        dials = self.storage.add_dials("a", ["+1", "+2"], 10)
+        self.assertEqual([phone for _, phone in dials], ["+1", "+2"])
+        self.assertEqual(self.storage.add_dials("a", ["+1"], 10), [])
+        self.assertEqual(self.storage.reset_in_flight_dials(), 2)
+        self.assertEqual(self.storage.count_dials(DIAL_PENDING), 2)
+        claimed = self.storage.claim_pending_dials(1, 20)
+        self.assertEqual(claimed, [(dials[0][0], "a", "+1")])
+        self.storage.finish_dial(dials[0][0], None, 3, 30)
+        self.storage.finish_dial(dials[1][0], "error", 1, 30)
+        self.assertEqual(self.storage.count_dials(DIAL_DONE), 1)
+        self.assertEqual(self.storage.count_dials(DIAL_FAILED), 1)
+        self.storage.defer_dial(dials[1][0], 40)
+        self.assertEqual(self.storage.delete_finished_dials(35), 1)
+        self.assertEqual(self.storage.count_dials(DIAL_PENDING), 1)
+
+    def test_expire_pending_dials(self):
+        self.storage.add_dials("a", ["+1"], 10)
+        dials = self.storage.add_dials("b", ["+2"], 100)
+        self.storage.reset_in_flight_dials()
+        self.assertEqual(self.storage.expire_pending_dials(50, 120), 1)
+        self.assertEqual(self.storage.count_dials(DIAL_FAILED), 1)
+        self.assertEqual(self.storage.claim_pending_dials(10, 120), [(dials[0][0], "b", "+2")])
+
+    def test_finish_dial_tracks_call(self):
+        dials = self.storage.add_dials("a", ["+1", "+2"], 10)
+        self.storage.finish_dial(dials[0][0], None, 3, 20, tracked_alert_id="a")
+        self.storage.finish_dial(dials[1][0], "error", 3, 20, tracked_alert_id="a")
+        self.assertEqual(self.storage.get_tracked_calls(), [("a", "+1", 20, 0, 0)])
+        self.assertEqual(self.storage.get_tracked_campaigns(), [])
+
+    def test_tracked_campaigns(self):
+        dials = self.storage.add_dials("a", ["+1", "+2"], 10)
+        self.storage.finish_dial(dials[0][0], None, 3, 20, tracked_alert_id="a", campaign="1")
+        self.storage.finish_dial(dials[1][0], None, 3, 20, tracked_alert_id="a", campaign="2")
+        redials = self.storage.add_dials("a/redial/1", ["+1"], 30)
+        self.storage.finish_dial(redials[0][0], None, 3, 40, campaign="3")
+        self.storage.update_call_status("+2", CALL_ANSWERED, 1, 0, 50)
+        self.assertEqual(self.storage.get_tracked_campaigns(), [("+1", "3")])
+
+    def test_call_status(self):
+        self.storage.add_tracked_calls("a", ["+1", "+2"], 10)
+        self.storage.add_tracked_calls("b", ["+1"], 20)
+        self.storage.add_tracked_calls("a", ["+1"], 30)
+        self.assertEqual(
+            self.storage.get_tracked_calls(), [("a", "+1", 10, 0, 0), ("a", "+2", 10, 0, 0), ("b", "+1", 20, 0, 0)]
+        )
+        self.storage.update_call_status("+2", CALL_TRACKING, 1, 0, 40)
+        self.storage.update_call_status("+1", CALL_ANSWERED, 2, 1, 40)
+        self.assertEqual(self.storage.get_tracked_calls(), [("a", "+2", 10, 1, 0)])
+        self.assertEqual(self.storage.delete_finished_call_statuses(41), 2)
+
+    def test_init_force(self):
+        self.storage.write([(1, 0, 100)], [(1, "+1")])
+        self.storage.init()
+        self.assertEqual(self.storage.get_phone(1), "+1")
+        self.storage.init(force=True)
+        self.assertIsNone(self.storage.get_phone(1))
+
+
+class TestSQLiteStorageClass(_StorageTests, TestCase):
+
+    def create_storage(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        return SQLiteStorage(os.path.join(self.tmp_dir.name, "calls.db"))
+
+    def test_old_database_is_rebuilt_by_vacuum_only(self):
+        path = os.path.join(self.tmp_dir.name, "old.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE t (x)")
+        storage = SQLiteStorage(path)
+        self.addCleanup(storage.close)
+        storage.init()
+        auto_vacuum = "PRAGMA auto_vacuum"
+        self.assertEqual(storage.get_connection().execute(auto_vacuum).fetchone()[0], 0)
+        with self.assertLogs("AlarmCallBot.storage.SQLite", level="WARNING"):
+            storage.incremental_vacuum()
+        self.assertEqual(storage.get_connection().execute(auto_vacuum).fetchone()[0], 2)
+        self.assertEqual(self.storage.get_connection().execute(auto_vacuum).fetchone()[0], 2)
+
+    def test_connections_of_exited_threads_are_closed(self):
+        self.storage.get_phone(1)
+        connections = []
+        for _ in range(5):
+            thread = threading.Thread(target=lambda: connections.append(self.storage.get_connection()))
+            thread.start()
+            thread.join()
+        self.assertEqual(self.storage.n_connections, 2)
+        for conn in connections[:-1]:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+class TestMemoryStorageClass(_StorageTests, TestCase):
+
+    def create_storage(self):
+        return MemoryStorage()
+
+    def test_create_storage(self):
+        self.assertIsInstance(create_storage("memory"), MemoryStorage)
+        self.assertIsInstance(create_storage("sqlite", "calls.db"), SQLiteStorage)
+        with self.assertRaises(ValueError):
+            create_storage("redis")
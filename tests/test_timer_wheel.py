@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from AlarmCallBot.timer_wheel import TimerWheel
+
+
+class TestTimerWheelClass(TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        self.fired = []
+        self.wheel = TimerWheel(tick=1.0, n_slots=8, clock=lambda: self.now[0])
+
+    def schedule(self, key, deadline):
+        self.wheel.schedule(key, deadline, lambda: self.fired.append(key))
+
+    def test_fire_in_deadline_order(self):
+        self.schedule("b", 102.5)
+        self.schedule("a", 102.2)
+        self.schedule("c", 105.0)
+        self.now[0] = 102.9
+        self.assertEqual(self.wheel.fire_due(), 0)
+        self.now[0] = 103.0
+        self.assertEqual(self.wheel.fire_due(), 2)
+        self.assertEqual(self.fired, ["a", "b"])
+        self.assertEqual(len(self.wheel), 1)
+
+    def test_timer_after_several_turns(self):
+        self.schedule("far", 130.0)
+        for second in range(101, 130):
+            self.now[0] = second
+            self.wheel.fire_due()
+        self.assertEqual(self.fired, [])
+        self.now[0] = 131.0
+        self.wheel.fire_due()
+        self.assertEqual(self.fired, ["far"])
+
+    def test_long_pause(self):
+        self.schedule("a", 103.0)
+        self.schedule("b", 150.0)
+        self.now[0] = 1000.0
+        self.assertEqual(self.wheel.fire_due(), 2)
+        self.assertEqual(self.fired, ["a", "b"])
+
+    def test_replace_and_cancel(self):
+        self.schedule("a", 101.0)
+        self.schedule("a", 104.0)
+        self.schedule("b", 101.0)
+        self.assertEqual(self.wheel.deadline("a"), 104.0)
+        self.assertTrue(self.wheel.cancel("b"))
+        self.assertFalse(self.wheel.cancel("b"))
+        self.now[0] = 102.0
+        self.wheel.fire_due()
+        self.assertEqual(self.fired, [])
+        self.now[0] = 105.0
+        self.wheel.fire_due()
+        self.assertEqual(self.fired, ["a"])
+
+    def test_passed_deadline_fires_next_tick(self):
+        self.schedule("late", 50.0)
+        self.now[0] = 100.5
+        self.wheel.fire_due()
+        self.assertEqual(self.fired, [])
+        self.now[0] = 101.0
+        self.wheel.fire_due()
+        self.assertEqual(self.fired, ["late"])
+
+    def test_failed_callback_does_not_stop_others(self):
+        self.wheel.schedule("bad", 101.0, lambda: 1 / 0)
+        self.schedule("good", 101.0)
+        self.now[0] = 102.0
+        self.assertEqual(self.wheel.fire_due(), 2)
+        self.assertEqual(self.fired, ["good"])
@@ -0,0 +1,105 @@
+import os
+import struct
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+from AlarmCallBot.bot.Translations import Translator
+
+
+def _write_mo(path, messages):
+    """Write GNU gettext catalog with messages given."""
+    messages = dict(messages)
+    messages[""] = "Content-Type: text/plain; charset=UTF-8\n"
+    keys = sorted(messages)
+    ids = b"".join(key.encode() + b"\0" for key in keys)
+    strs = b"".join(messages[key].encode() + b"\0" for key in keys)
+    ids_start = 7 * 4 + 16 * len(keys)
+    strs_start = ids_start + len(ids)
+    offsets, id_offset, str_offset = [], 0, 0
+    for key in keys:
+        offsets.append((len(key.encode()), ids_start + id_offset, len(messages[key].encode()), strs_start + str_offset))
+        id_offset += len(key.encode()) + 1
+        str_offset += len(messages[key].encode()) + 1
+    header = struct.pack("<7I", 0x950412de, 0, len(keys), 7 * 4, 7 * 4 + 8 * len(keys), 0, 0)
+    with open(path, "wb") as mo_file:
+        mo_file.write(header)
+        for id_length, id_start, _, _ in offsets:
+            mo_file.write(struct.pack("<2I", id_length, id_start))
+        for _, _, str_length, str_start in offsets:
+            mo_file.write(struct.pack("<2I", str_length, str_start))
+        mo_file.write(ids + strs)
+
+
+class TestTranslator(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        catalog_dir = os.path.join(self.tmp_dir.name, "ru_RU.UTF-8", "LC_MESSAGES")
+        os.makedirs(catalog_dir)
+        _write_mo(os.path.join(catalog_dir, "bot.mo"), {
+            "Send phone number": "Отправить номер телефона",
+            "New alert:\n{}": "Новая тревога:\n{}",
+        })
+        self.translator = Translator(
+            locale_dir=self.tmp_dir.name, default_language="en", max_users=2, max_formatted=2
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_translate(self):
+        self.assertEqual(self.translator.gettext("Send phone number", "ru"), "Отправить номер телефона")
+        self.assertEqual(self.translator.gettext("Send phone number", "ru"), "Отправить номер телефона")
+        self.assertEqual(self.translator.gettext("Send phone number", "en"), "Send phone number")
+        self.assertEqual(self.translator.gettext("Unknown message", "ru"), "Unknown message")
+
+    def test_format(self):
+        self.assertEqual(self.translator.format("New alert:\n{}", "ru", "text"), "Новая тревога:\ntext")
+        self.assertIs(
+            self.translator.format("New alert:\n{}", "ru", "text"),
+            self.translator.format("New alert:\n{}", "ru", "text"),
+        )
+        self.assertEqual(self.translator.format("New alert:\n{}", "en", "text"), "New alert:\ntext")
+        self.assertEqual(self.translator.format("New alert:\n{}", None, "other"), "New alert:\nother")
+        self.assertEqual(len(self.translator._Translator__formatted), 2)
+
+    def test_catalogs_loaded_on_first_use(self):
+        translator = Translator(locale_dir=os.path.join(self.tmp_dir.name, "late"), default_language="ru")
+        catalog_dir = os.path.join(self.tmp_dir.name, "late", "ru", "LC_MESSAGES")
+        os.makedirs(catalog_dir)
+        _write_mo(os.path.join(catalog_dir, "bot.mo"), {"Send phone number": "Отправить номер телефона"})
+        self.assertEqual(translator.gettext("Send phone number"), "Отправить номер телефона")
+
+    def test_resolve(self):
+        self.assertEqual(self.translator.languages, ["en", "ru", "ru_RU"])
+        self.assertEqual(self.translator.resolve("ru"), "ru")
+        self.assertEqual(self.translator.resolve("ru-RU"), "ru_RU")
+        self.assertEqual(self.translator.resolve("ru-UA"), "ru")
+        self.assertEqual(self.translator.resolve("pt-br"), "en")
+        self.assertEqual(self.translator.resolve(None), "en")
+
+    def test_unknown_language_falls_back(self):
+        self.assertEqual(self.translator.gettext("Send phone number", "pt_BR"), "Send phone number")
+        translator = Translator(locale_dir=self.tmp_dir.name, default_language="ru-RU")
+        self.assertEqual(translator.gettext("Send phone number", "de"), "Отправить номер телефона")
+
+    def test_missing_locale_dir(self):
+        translator = Translator(locale_dir=os.path.join(self.tmp_dir.name, "missing"), default_language="ru")
+        self.assertEqual(translator.default_language, "en")
+        self.assertEqual(translator.gettext("Send phone number"), "Send phone number")
+
+    def test_user_language(self):
+        self.assertEqual(self.translator.language_for(SimpleNamespace(id=1, language_code="ru")), "ru")
+        self.assertEqual(self.translator.language_for(None), "en")
+        self.assertEqual(self.translator.user_language(1), "ru")
+        self.assertEqual(self.translator.user_language(2), "en")
+
+    def test_user_language_lru(self):
+        self.translator.remember(1, "ru")
+        self.translator.remember(2, "ru")
+        self.translator.user_language(1)
+        self.translator.remember(3, "ru")
+        self.assertEqual(self.translator.user_language(1), "ru")
+        self.assertEqual(self.translator.user_language(2), "en")
+        self.assertEqual(self.translator.user_language(3), "ru")
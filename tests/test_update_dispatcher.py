@@ -0,0 +1,90 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import telebot
+
+from AlarmCallBot.bot.Dispatcher import DispatchingTeleBot, UpdateDispatcher, get_update_user_id
+
+
+def _message(update_id, user_id, text):
+    return telebot.types.Update.de_json({"update_id": update_id, "message": {
+        "message_id": update_id,
+        "date": 0,
+        "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+        "chat": {"id": user_id, "type": "private"},
+        "text": text,
+    }})
+
+
+def _channel_post(update_id):
+    return telebot.types.Update.de_json({"update_id": update_id, "channel_post": {
+        "message_id": update_id,
+        "date": 0,
+        "chat": {"id": -1001, "type": "channel", "title": "Alerts"},
+        "text": "Alert",
+    }})
+
+
+class TestUpdateDispatcherClass(TestCase):
+
+    def test_user_id(self):
+        self.assertEqual(get_update_user_id(_message(1, 42, "/call 8")), 42)
+        self.assertIsNone(get_update_user_id(_channel_post(2)))
+
+    def test_user_updates_in_order(self):
+        processed = []
+        lock = threading.Lock()
+
+        def process(update):
+            if update.message.text == "/number":
+                time.sleep(0.05)
+            with lock:
+                processed.append((update.message.from_user.id, update.message.text))
+
+        dispatcher = UpdateDispatcher(process, n_workers=4)
+        dispatcher.start()
+        for i, user_id in enumerate((1, 2, 3)):
+            for j, text in enumerate(("/number", "contact", "/call 8")):
+                dispatcher.submit(_message(i * 3 + j, user_id, text))
+        dispatcher.stop()
+        for user_id in (1, 2, 3):
+            self.assertEqual(
+                [text for user, text in processed if user == user_id], ["/number", "contact", "/call 8"]
+            )
+        self.assertEqual(len(processed), 9)
+
+    def test_channel_posts_not_blocked_by_users(self):
+        release = threading.Event()
+        alerted = threading.Event()
+
+        def process(update):
+            if update.channel_post is not None:
+                alerted.set()
+            else:
+                release.wait(5)
+
+        dispatcher = UpdateDispatcher(process, n_workers=1, queue_size=10)
+        dispatcher.start()
+        for i in range(5):
+            dispatcher.submit(_message(i, i, "/start"))
+        dispatcher.submit(_channel_post(10))
+        self.assertTrue(alerted.wait(1))
+        self.assertGreater(dispatcher.queue_depth, 0)
+        release.set()
+        dispatcher.stop()
+        self.assertEqual(dispatcher.queue_depth, 0)
+
+    def test_full_lane_rejects(self):
+        dispatcher = UpdateDispatcher(lambda update: None, n_workers=1, queue_size=1)
+        self.assertTrue(dispatcher.submit(_message(1, 1, "/start"), block=False))
+        self.assertFalse(dispatcher.submit(_message(2, 1, "/start"), block=False))
+
+    def test_bot_passes_updates_to_dispatcher(self):
+        bot = DispatchingTeleBot("1:token", n_workers=2)
+        with patch.object(bot.dispatcher, "submit") as submit:
+            bot.process_new_updates([_message(5, 1, "/start"), _message(7, 2, "/start")])
+        self.assertEqual(submit.call_count, 2)
+        self.assertEqual(bot.last_update_id, 7)
+        self.assertFalse(bot.threaded)
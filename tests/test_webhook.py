@@ -0,0 +1,58 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest import TestCase
+
+from AlarmCallBot.bot.Webhook import WebhookServer
+
+
+class TestWebhookServerClass(TestCase):
+
+    def setUp(self):
+        self.processed = []
+        self.cond = threading.Condition()
+
+        def process(update):
+            with self.cond:
+                self.processed.append(update.update_id)
+                self.cond.notify_all()
+
+        self.server = WebhookServer(process, port=0, secret_token="secret", n_workers=1)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def post(self, update, secret_token="secret"):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{self.server.port}/",
+            data=json.dumps(update).encode(),
+            headers={"X-Telegram-Bot-Api-Secret-Token": secret_token},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+    def test_update_is_processed_once(self):
+        self.assertEqual(self.post({"update_id": 1}), 200)
+        self.assertEqual(self.post({"update_id": 1}), 200)
+        self.assertEqual(self.post({"update_id": 2}), 200)
+        with self.cond:
+            self.assertTrue(self.cond.wait_for(lambda: len(self.processed) == 2, 1))
+        self.assertEqual(self.processed, [1, 2])
+
+    def test_wrong_secret_token(self):
+        self.assertEqual(self.post({"update_id": 1}, secret_token="wrong"), 403)
+        self.assertEqual(self.post([1]), 400)
+
+    def test_full_queue(self):
+        server = WebhookServer(lambda update: None, port=0, queue_size=1)
+        self.assertEqual(server.receive(None, b'{"update_id": 1}'), 200)
+        self.assertEqual(server.receive(None, b'{"update_id": 2}'), 503)
+        self.assertEqual(server.queue_depth, 1)
+        server.start()
+        server.stop()
+        self.assertEqual(server.receive(None, b'{"update_id": 2}'), 200)
@@ -0,0 +1,92 @@
+import threading
+from unittest import TestCase
+
+from AlarmCallBot.write_behind import WriteBehindQueue
+
+
+class TestWriteBehindQueueClass(TestCase):
+
+    def test_batches(self):
+        batches = []
+        write_behind = WriteBehindQueue(batches.append, batch_size=10, flush_interval=0.05)
+        for i in range(25):
+            write_behind.put(("call", (i,)))
+        write_behind.start()
+        write_behind.flush()
+        write_behind.stop()
+
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual([values[0] for batch in batches for _, values in batch], list(range(25)))
+
+    def test_stop_writes_queued_records(self):
+        written = []
+        event = threading.Event()
+
+        def write(batch):
+            event.wait()
+            written.extend(batch)
+
+        write_behind = WriteBehindQueue(write, batch_size=1, flush_interval=0.01)
+        write_behind.start()
+        for i in range(5):
+            write_behind.put(("call", (i,)))
+        event.set()
+        write_behind.stop()
+        self.assertEqual(len(written), 5)
+
+    def test_failed_batch_is_retried(self):
+        written = []
+        failures = [RuntimeError("locked")]
+
+        def write(batch):
+            if failures:
+                raise failures.pop()
+            written.extend(batch)
+
+        write_behind = WriteBehindQueue(write, flush_interval=0.01, retry_interval=0.01)
+        write_behind.start()
+        write_behind.put(("phone", (1, "+1")))
+        write_behind.flush()
+        write_behind.stop()
+        self.assertEqual(written, [("phone", (1, "+1"))])
+
+    def test_batch_failed_during_stop_is_retried(self):
+        written = []
+        event = threading.Event()
+        failures = [RuntimeError("locked")]
+
+        def write(batch):
+            event.wait()
+            if failures:
+                raise failures.pop()
+            written.extend(batch)
+
+        write_behind = WriteBehindQueue(write, batch_size=2, flush_interval=0.01, retry_interval=0.01)
+        write_behind.start()
+        for i in range(5):
+            write_behind.put(("call", (i,)))
+        timer = threading.Timer(0.05, event.set)
+        timer.start()
+        write_behind.stop()
+        timer.join()
+        self.assertEqual([values[0] for _, values in written], list(range(5)))
+
+    def test_records_are_lost_after_stop_retries(self):
+        event = threading.Event()
+
+        def write(batch):
+            event.wait()
+            raise RuntimeError("disk I/O error")
+
+        write_behind = WriteBehindQueue(write, batch_size=2, flush_interval=0.01, retry_interval=0.01, stop_retries=2)
+        for i in range(5):
+            write_behind.put(("call", (i,)))
+        write_behind.start()
+        timer = threading.Timer(0.05, event.set)
+        timer.start()
+        with self.assertLogs("AlarmCallBot.write_behind", level="ERROR") as logs:
+            write_behind.stop()
+        timer.join()
+        self.assertEqual(len([line for line in logs.output if "Failed to write batch" in line]), 3)
+        self.assertIn("Lost 5 records", logs.output[-1])
+        self.assertEqual(write_behind.depth, 0)
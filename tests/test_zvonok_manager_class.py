@@ -2,6 +2,9 @@ from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
 from AlarmCallBot.zvonok_api.Api import ZvonokManager
+from AlarmCallBot.zvonok_api.CircuitBreaker import CircuitBreaker
+from AlarmCallBot.zvonok_api.RateLimiter import AdaptiveRateLimiter
+from AlarmCallBot.zvonok_api.Utils import CircuitOpenException, ZvonokApiException
 from AlarmCallBot.configs import Config
 
 
@@ -31,6 +34,15 @@ class TestZvonokManagerClass(TestCase):
                 }
             )
 
+    def test_zvonok_manager_warm_up(self):
+        self.assertIsNone(self.zvonok_manager._ZvonokManager__requests_session)
+        session = MagicMock()
+        with patch.object(self.zvonok_manager, "_ZvonokManager__requests_session", session):
+            self.zvonok_manager.warm_up()
+            session.head.assert_called_with("http://127.0.0.1:8080")
+            session.head.side_effect = ConnectionError
+            self.zvonok_manager.warm_up()
+
     def test_zvonok_manager_delete_call(self):
         session = MagicMock()
         response = MagicMock()
@@ -62,3 +74,44 @@ class TestZvonokManagerClass(TestCase):
                     "campaign_id": self.config.ZVONOK_CAMPAIGN_ID,
                 }
             )
+
+    def test_zvonok_manager_retries_throttled_request(self):
+        rate_limiter = AdaptiveRateLimiter(rate=20.0)
+        zvonok_manager = ZvonokManager(
+            public_api_key=self.config.ZVONOK_API_TOKEN,
+            campaign_id=self.config.ZVONOK_CAMPAIGN_ID,
+            api_host=self.config.ZVONOK_API_URI,
+            rate_limiter=rate_limiter,
+        )
+        session = MagicMock()
+        throttled = MagicMock()
+        throttled.status_code = 429
+        throttled.headers = {"Retry-After": "0"}
+        response = MagicMock()
+        response.status_code = 200
+        session.post = MagicMock(side_effect=[throttled, response])
+        with patch.object(zvonok_manager, "_ZvonokManager__requests_session", session):
+            zvonok_manager.create_call("+11111111111")
+            self.assertEqual(session.post.call_count, 2)
+            self.assertIs(zvonok_manager.rate_limiter, rate_limiter)
+            self.assertLess(rate_limiter.rate, 20.0)
+
+    def test_zvonok_manager_fails_fast_when_circuit_is_open(self):
+        zvonok_manager = ZvonokManager(
+            public_api_key=self.config.ZVONOK_API_TOKEN,
+            campaign_id=self.config.ZVONOK_CAMPAIGN_ID,
+            api_host=self.config.ZVONOK_API_URI,
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0),
+        )
+        session = MagicMock()
+        response = MagicMock()
+        response.status_code = 500
+        session.post = MagicMock(return_value=response)
+        with patch.object(zvonok_manager, "_ZvonokManager__requests_session", session):
+            for _ in range(2):
+                with self.assertRaises(ZvonokApiException):
+                    zvonok_manager.create_call("+11111111111")
+            with self.assertRaises(CircuitOpenException):
+                zvonok_manager.create_call("+11111111111")
+            self.assertEqual(session.post.call_count, 2)
+            self.assertEqual(zvonok_manager.circuit_breaker.state, CircuitBreaker.OPEN)